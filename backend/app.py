@@ -1,17 +1,24 @@
 from fastapi import FastAPI, HTTPException, Depends, Request, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from pydantic import BaseModel
+from starlette.background import BackgroundTask
 from typing import List, Dict, Any, Optional
 import uvicorn
+import asyncio
+import json
+import logging
 import os
 
-from config import API_HOST, API_PORT, DATA_PATH
-from rag.embeddings import EmbeddingModel
-from rag.vector_store import VectorStore
-from rag.llm import LLMService
-from rag.article_ingestion import ArticleIngestion
-from services.session_service import SessionService
-from services.chat_service import ChatService
+from config import API_HOST, API_PORT, SESSION_SWEEP_INTERVAL, FEED_STATE_PATH
+from rag.dates import parse_published
+from rag.feed_scheduler import read_feed_stats
+from rag.filters import build_where
+from services.admission import Overloaded, Ticket
+from services.components import Components
+from services.request_context import RequestContextMiddleware
+from services.warmup import WarmupState
 
 # Create FastAPI app
 app = FastAPI(title="NewsChat API")
@@ -23,26 +30,19 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID", "Retry-After"],
 )
 
-# Initialize components
-embedding_model = EmbeddingModel()
-vector_store = VectorStore()
-llm_service = LLMService()
-session_service = SessionService()
-
-# Initialize services
-article_ingestion = ArticleIngestion(
-    embedding_model=embedding_model,
-    vector_store=vector_store,
-    data_path=DATA_PATH
-)
-chat_service = ChatService(
-    embedding_model=embedding_model,
-    vector_store=vector_store,
-    llm_service=llm_service,
-    session_service=session_service
-)
+# Added last so it wraps everything and times the full request
+app.add_middleware(RequestContextMiddleware)
+
+# Sampled request traces are logged through the standard logging module
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Components are built on first use so the API starts serving immediately
+components = Components()
+warmup = WarmupState()
 
 # Request/response models
 class SessionResponse(BaseModel):
@@ -50,6 +50,9 @@ class SessionResponse(BaseModel):
 
 class MessageRequest(BaseModel):
     message: str
+    sources: Optional[List[str]] = None  # Only search articles from these sources
+    published_after: Optional[str] = None  # ISO 8601 or RFC 822 date
+    published_before: Optional[str] = None  # ISO 8601 or RFC 822 date
 
 class MessageResponse(BaseModel):
     response: str
@@ -61,10 +64,54 @@ class StatusResponse(BaseModel):
     status: str
     message: str
     articles_count: int
+    warmup: Optional[Dict[str, Any]] = None
+
+def message_filter(request: MessageRequest) -> Optional[Dict[str, Any]]:
+    """Build the retrieval filter requested with a message."""
+    bounds = {}
+    for field in ("published_after", "published_before"):
+        value = getattr(request, field)
+        if value:
+            bounds[field] = parse_published(value)
+            if bounds[field] is None:
+                raise HTTPException(status_code=400, detail=f"Invalid date for {field}: {value}")
+    return build_where(sources=request.sources, **bounds)
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+    """Turn shed requests into 429/503 responses with Retry-After."""
+    logger.warning("%s %s shed: %s (Retry-After %ss)",
+                   request.method, request.url.path, exc, exc.retry_after)
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+async def admit_chat(session_id: str) -> Optional[Ticket]:
+    """Wait for a chat slot, or shed the request if the service is overloaded."""
+    if components.admission is None:
+        return None
+    return await components.admission.admit_chat(session_id)
+
+def release(ticket: Optional[Ticket]):
+    """Release an admission ticket, if any."""
+    if ticket is not None:
+        ticket.release()
+
+def schedule_ingest(background_tasks: BackgroundTasks, job, *args):
+    """Queue an ingestion job behind admission control."""
+    admission = components.admission
+    if admission is None:
+        background_tasks.add_task(job, *args)
+        return
+    ticket = admission.admit_ingest()
+    background_tasks.add_task(admission.run_ingest, ticket, job, *args)
 
 # Dependency to check if session exists
 async def validate_session(session_id: str):
-    if not session_service.session_exists(session_id):
+    session_service = components.session_service
+    if not await session_service.acall(session_service.session_exists, session_id):
         raise HTTPException(status_code=404, detail="Session not found")
     return session_id
 
@@ -72,71 +119,220 @@ async def validate_session(session_id: str):
 @app.post("/sessions", response_model=SessionResponse)
 async def create_session():
     """Create a new chat session."""
-    session_id = session_service.create_session()
+    session_service = components.session_service
+    session_id = await session_service.acall(session_service.create_session)
     return {"session_id": session_id}
 
 @app.get("/sessions/{session_id}", response_model=ChatHistoryResponse, dependencies=[Depends(validate_session)])
 async def get_session_history(session_id: str):
     """Get chat history for a session."""
-    history = chat_service.get_chat_history(session_id)
+    chat_service = await components.aget("chat_service")
+    history = await components.session_service.acall(chat_service.get_chat_history, session_id)
     return {"history": history}
 
 @app.delete("/sessions/{session_id}", response_model=StatusResponse, dependencies=[Depends(validate_session)])
 async def clear_session(session_id: str):
     """Clear a chat session."""
-    chat_service.clear_chat_history(session_id)
+    chat_service = await components.aget("chat_service")
+    await components.session_service.acall(chat_service.clear_chat_history, session_id)
     return {
         "status": "success",
         "message": "Session cleared",
-        "articles_count": vector_store.get_collection_count()
+        "articles_count": await asyncio.to_thread(components.vector_store.get_collection_count)
     }
 
 @app.post("/sessions/{session_id}/messages", response_model=MessageResponse, dependencies=[Depends(validate_session)])
 async def send_message(session_id: str, request: MessageRequest):
     """Send a message to the chatbot."""
-    response = chat_service.process_message(session_id, request.message)
+    where = message_filter(request)
+    chat_service = await components.aget("chat_service")
+    ticket = await admit_chat(session_id)
+    try:
+        response = await chat_service.aprocess_message(
+            session_id, request.message, where=where
+        )
+    finally:
+        release(ticket)
     return {"response": response}
 
+@app.post("/sessions/{session_id}/messages/stream", dependencies=[Depends(validate_session)])
+async def stream_message(session_id: str, request: MessageRequest):
+    """Send a message and stream the response as Server-Sent Events.
+    
+    Emits a "sources" event with the retrieved articles, one "token" event
+    per chunk of the answer and a final "done" event with the full text.
+    """
+    where = message_filter(request)
+    chat_service = await components.aget("chat_service")
+    # Admitted before streaming starts, so shed requests get a proper status
+    ticket = await admit_chat(session_id)
+    
+    async def event_stream():
+        try:
+            async for event, data in chat_service.astream_message(
+                session_id, request.message, where=where
+            ):
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        except Exception as e:
+            logger.exception("Error streaming response for session %s", session_id)
+            yield f"event: error\ndata: {json.dumps(str(e))}\n\n"
+        finally:
+            release(ticket)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Covers responses whose stream never started
+        background=BackgroundTask(release, ticket)
+    )
+
 @app.get("/status", response_model=StatusResponse)
 async def get_status():
-    """Get system status."""
+    """Get system status, including warm-up progress."""
+    progress = warmup.to_dict()
+    if warmup.ready:
+        status, message = "online", "System is operational"
+    elif progress["status"] == WarmupState.FAILED:
+        status, message = "degraded", f"Warm-up failed: {progress['error']}"
+    else:
+        status, message = "warming", "Indexing articles, answers may be incomplete"
+    
+    articles_count = progress["articles_indexed"]
+    if components.is_built("vector_store"):
+        # Waits for the store's lock while ingestion writes or compacts it
+        articles_count = await asyncio.to_thread(components.vector_store.get_collection_count)
+    
+    return {
+        "status": status,
+        "message": message,
+        "articles_count": articles_count,
+        "warmup": progress
+    }
+
+@app.get("/healthz")
+async def liveness():
+    """Liveness probe: the process is up and serving requests."""
+    return {"status": "alive"}
+
+@app.get("/readyz")
+async def readiness():
+    """Readiness probe: fails until the startup warm-up has finished."""
+    progress = warmup.to_dict()
+    if not warmup.ready:
+        raise HTTPException(status_code=503, detail=progress)
+    return progress
+
+@app.get("/admission/stats")
+async def get_admission_stats():
+    """Get admission queue depths and shed counts."""
+    if components.admission is None:
+        return {"enabled": False}
+    return {"enabled": True, **components.admission.stats()}
+
+@app.get("/metrics")
+async def metrics():
+    """Expose Prometheus metrics."""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+@app.get("/cache/stats")
+async def get_cache_stats():
+    """Get embedding and answer cache counters."""
+    embedding_model = await components.aget("embedding_model")
     return {
-        "status": "online",
-        "message": "System is operational",
-        "articles_count": vector_store.get_collection_count()
+        # Counting the disk tier is a SQLite query
+        "embedding_cache": await asyncio.to_thread(embedding_model.cache.stats),
+        "answer_cache": (
+            components.answer_cache.stats()
+            if components.answer_cache is not None else None
+        )
     }
 
 @app.post("/ingest/file", response_model=StatusResponse)
-async def ingest_from_file(background_tasks: BackgroundTasks):
+async def ingest_from_file(background_tasks: BackgroundTasks, prune_missing: bool = False):
     """Ingest articles from file."""
+    ingestion = await components.aget("article_ingestion")
     # Run ingestion in background
-    background_tasks.add_task(article_ingestion.ingest_from_file)
+    schedule_ingest(background_tasks, ingestion.ingest_from_file, prune_missing)
     
     return {
         "status": "processing",
         "message": "Started ingesting articles from file",
-        "articles_count": vector_store.get_collection_count()
+        "articles_count": await asyncio.to_thread(components.vector_store.get_collection_count)
     }
 
 @app.post("/ingest/rss", response_model=StatusResponse)
-async def ingest_from_rss(rss_url: str, background_tasks: BackgroundTasks):
+async def ingest_from_rss(rss_url: str, background_tasks: BackgroundTasks, prune_missing: bool = False):
     """Ingest articles from RSS feed."""
+    ingestion = await components.aget("article_ingestion")
     # Run ingestion in background
-    background_tasks.add_task(article_ingestion.ingest_from_rss, rss_url)
+    schedule_ingest(background_tasks, ingestion.ingest_from_rss, rss_url, prune_missing)
     
     return {
         "status": "processing",
         "message": f"Started ingesting articles from RSS: {rss_url}",
-        "articles_count": vector_store.get_collection_count()
+        "articles_count": await asyncio.to_thread(components.vector_store.get_collection_count)
     }
 
+@app.get("/ingest/feeds")
+async def get_feed_stats():
+    """Get per-feed polling stats from the ingestion daemon."""
+    stats = read_feed_stats(FEED_STATE_PATH)
+    if stats is None:
+        raise HTTPException(status_code=404, detail="Ingestion daemon has not run yet")
+    return {"feeds": stats}
+
 # Startup event
 @app.on_event("startup")
 async def startup_event():
     """Run on application startup."""
-    # Load articles from file on startup
-    article_count = article_ingestion.ingest_from_file()
-    print(f"Loaded {article_count} articles from file")
+    # Heavy components are built by warm-up or on worker threads; build
+    # the cheap ones now so requests never construct them on the loop
+    components.build_light()
+    
+    # Reap idle sessions even if nobody touches them again
+    asyncio.create_task(sweep_sessions())
+    
+    # Index articles in the background instead of delaying startup
+    asyncio.create_task(warm_up())
+
+async def warm_up():
+    """Build the clients and index the article log off the event loop."""
+    warmup.start()
+    loop = asyncio.get_running_loop()
+    try:
+        article_count = await loop.run_in_executor(
+            None,
+            lambda: components.article_ingestion.ingest_from_file(progress=warmup.progress)
+        )
+        # Build the remaining clients before reporting ready
+        await loop.run_in_executor(None, lambda: components.chat_service)
+    except Exception as e:
+        logger.exception("Error warming up")
+        warmup.finish(e)
+        return
+    warmup.finish()
+    logger.info("Warm-up finished, indexed %d articles from the article log", article_count)
+
+async def sweep_sessions():
+    """Periodically remove expired sessions."""
+    while True:
+        await asyncio.sleep(SESSION_SWEEP_INTERVAL)
+        try:
+            session_service = components.session_service
+            removed = await session_service.acall(session_service.sweep_expired)
+            if removed:
+                logger.info("Expired %d idle sessions", removed)
+        except Exception as e:
+            logger.exception("Error sweeping sessions")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release pooled connections and worker processes on shutdown."""
+    if components.is_built("embedding_model"):
+        await components.embedding_model.aclose()
+    if components.is_built("article_ingestion"):
+        await asyncio.to_thread(components.article_ingestion.fetcher.close)
 
 # Main entry point
 if __name__ == "__main__":
@@ -0,0 +1,365 @@
+"""End-to-end load test of the API against offline stand-ins.
+
+Boots the API with uvicorn in a subprocess, pointed at the stub embedding
+server, a stub RSS feed server and the fake LLM backend, with all state in
+a temporary directory. Workers then drive a weighted mix of
+create-session, send-message, stream-message and ingest requests at each
+concurrency level, and throughput plus p50/p95/p99 latency per endpoint
+are reported. Streamed messages also report time to first token.
+
+Ingest requests are answered once the job is queued, so their latency
+is that of the API call; the ingestion itself competes with chat for the
+embedding server and the CPU in the background.
+
+Usage:
+    python benchmarks/load_test.py --concurrency 1,8,32 --duration 30
+    python benchmarks/load_test.py --llm-latency 0.5 --token-delay 0.03 --output load.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from xml.sax.saxutils import escape
+
+import httpx
+import numpy as np
+
+from stub_embedding_server import serve as serve_embeddings
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+QUERIES = [
+    "What happened in the markets today?",
+    "Any news about the election results?",
+    "What are the latest developments in climate policy?",
+    "Tell me about recent technology acquisitions",
+    "What did the central bank decide on interest rates?",
+    "Summarize the sports headlines",
+    "What is going on with energy prices?",
+    "Are there updates on the trade negotiations?",
+]
+
+WORDS = (
+    "government market report officials announced company shares growth policy "
+    "election energy climate technology investors analysts minister agreement "
+    "economy prices league season court ruling health research study quarter"
+).split()
+
+
+def free_port() -> int:
+    """Pick an unused local TCP port."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def make_feed_handler(items: int, seed: int):
+    """Build a handler serving RSS feeds whose stories change on every request.
+
+    Descriptions are long enough that ingestion does not fetch article pages.
+    """
+    rng = random.Random(seed)
+    lock = threading.Lock()
+    counter = [0]
+
+    class StubFeedHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            with lock:
+                counter[0] += 1
+                request = counter[0]
+                bodies = [" ".join(rng.choice(WORDS) for _ in range(150)) for _ in range(items)]
+
+            entries = []
+            for index, body in enumerate(bodies):
+                link = f"http://stub.invalid/{self.path.strip('/')}/{request}/{index}"
+                entries.append(
+                    f"<item><title>Story {request}-{index}</title><link>{link}</link>"
+                    f"<guid>{link}</guid><pubDate>{time.strftime('%a, %d %b %Y %H:%M:%S +0000', time.gmtime())}</pubDate>"
+                    f"<description>{escape(body)}</description></item>"
+                )
+            encoded = (
+                f"<?xml version=\"1.0\"?><rss version=\"2.0\"><channel>"
+                f"<title>Stub {escape(self.path)}</title>{''.join(entries)}</channel></rss>"
+            ).encode("utf-8")
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/rss+xml")
+            self.send_header("Content-Length", str(len(encoded)))
+            self.end_headers()
+            self.wfile.write(encoded)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubFeedHandler
+
+
+def start_server(server: ThreadingHTTPServer):
+    """Run a server on a daemon thread."""
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start_api(port: int, embedding_url: str, data_dir: str, args) -> subprocess.Popen:
+    """Start the API in a subprocess with all state under data_dir."""
+    env = {
+        **os.environ,
+        "JINA_API_URL": embedding_url,
+        "JINA_API_KEY": "stub",
+        "LLM_BACKEND": "fake",
+        "FAKE_LLM_LATENCY": str(args.llm_latency),
+        "FAKE_LLM_TOKEN_DELAY": str(args.token_delay),
+        "VECTOR_STORE_BACKEND": "numpy",
+        "SESSION_BACKEND": "memory",
+        "NUMPY_STORE_PATH": os.path.join(data_dir, "vector_index"),
+        "DATA_PATH": os.path.join(data_dir, "articles.json"),
+        "ARTICLE_LOG_PATH": os.path.join(data_dir, "articles.jsonl"),
+        "KEYWORD_INDEX_PATH": os.path.join(data_dir, "keyword_index.jsonl"),
+        "DEDUPE_INDEX_PATH": os.path.join(data_dir, "dedupe_index.jsonl"),
+        "EMBEDDING_CACHE_PATH": os.path.join(data_dir, "embedding_cache.db"),
+        "FEED_STATE_PATH": os.path.join(data_dir, "feed_state.json"),
+        "TRACE_SAMPLE_RATE": "0",
+        # Workers reuse their session, so per-session limits would dominate
+        "SESSION_RATE_LIMIT": str(args.session_rate_limit),
+    }
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1",
+         "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL if not args.verbose else None,
+    )
+
+
+async def wait_ready(client: httpx.AsyncClient, process: subprocess.Popen, timeout: float = 120):
+    """Wait until /readyz succeeds."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"API exited with code {process.returncode}")
+        try:
+            if (await client.get("/readyz")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise TimeoutError("API did not become ready")
+
+
+class Recorder:
+    """Collect latencies and errors per endpoint."""
+
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+
+    def record(self, endpoint: str, seconds: float, ok: bool):
+        if ok:
+            self.latencies.setdefault(endpoint, []).append(seconds)
+        else:
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def summary(self, elapsed: float) -> dict:
+        endpoints = {}
+        for endpoint in sorted(set(self.latencies) | set(self.errors)):
+            samples = np.array(self.latencies.get(endpoint, []))
+            entry = {
+                "requests": int(len(samples)),
+                "errors": self.errors.get(endpoint, 0),
+                "throughput_rps": len(samples) / elapsed,
+            }
+            if len(samples):
+                p50, p95, p99 = np.percentile(samples, [50, 95, 99]) * 1000
+                entry.update(p50_ms=p50, p95_ms=p95, p99_ms=p99, mean_ms=samples.mean() * 1000)
+            endpoints[endpoint] = entry
+        total = sum(len(samples) for endpoint, samples in self.latencies.items()
+                    if endpoint != "stream_message_first_token")
+        return {
+            "elapsed_s": elapsed,
+            "throughput_rps": total / elapsed,
+            "errors": sum(self.errors.values()),
+            "endpoints": endpoints,
+        }
+
+
+async def create_session(client, recorder) -> str:
+    started = time.perf_counter()
+    response = await client.post("/sessions")
+    recorder.record("create_session", time.perf_counter() - started, response.status_code == 200)
+    return response.json()["session_id"] if response.status_code == 200 else None
+
+
+async def send_message(client, recorder, session_id: str):
+    started = time.perf_counter()
+    response = await client.post(f"/sessions/{session_id}/messages",
+                                 json={"message": random.choice(QUERIES)})
+    recorder.record("send_message", time.perf_counter() - started, response.status_code == 200)
+
+
+async def stream_message(client, recorder, session_id: str):
+    started = time.perf_counter()
+    first_token = None
+    failed = False
+    async with client.stream("POST", f"/sessions/{session_id}/messages/stream",
+                             json={"message": random.choice(QUERIES)}) as response:
+        async for line in response.aiter_lines():
+            if first_token is None and line == "event: token":
+                first_token = time.perf_counter() - started
+            failed = failed or line == "event: error"
+    ok = response.status_code == 200 and not failed
+    recorder.record("stream_message", time.perf_counter() - started, ok)
+    if ok and first_token is not None:
+        recorder.record("stream_message_first_token", first_token, True)
+
+
+async def ingest(client, recorder, feed_url: str):
+    started = time.perf_counter()
+    response = await client.post("/ingest/rss", params={"rss_url": feed_url})
+    recorder.record("ingest", time.perf_counter() - started, response.status_code == 200)
+
+
+async def worker(client, recorder, mix, feed_url: str, stop_at: float):
+    """Issue requests back to back until stop_at."""
+    session_id = None
+    operations, weights = zip(*mix.items())
+    while time.monotonic() < stop_at:
+        operation = random.choices(operations, weights)[0]
+        try:
+            if operation == "create_session" or session_id is None:
+                session_id = await create_session(client, recorder)
+            elif operation == "send_message":
+                await send_message(client, recorder, session_id)
+            elif operation == "stream_message":
+                await stream_message(client, recorder, session_id)
+            else:
+                await ingest(client, recorder, feed_url)
+        except httpx.HTTPError:
+            recorder.record(operation, 0.0, False)
+
+
+async def run_level(base_url: str, concurrency: int, duration: float, mix: dict, feed_url: str) -> dict:
+    """Run one concurrency level and summarize it."""
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        started = time.monotonic()
+        stop_at = started + duration
+        await asyncio.gather(*(
+            worker(client, recorder, mix, feed_url, stop_at) for _ in range(concurrency)
+        ))
+        elapsed = time.monotonic() - started
+    return {"concurrency": concurrency, **recorder.summary(elapsed)}
+
+
+async def run(args) -> dict:
+    mix = {
+        "create_session": args.session_weight,
+        "send_message": args.message_weight,
+        "stream_message": args.stream_weight,
+        "ingest": args.ingest_weight,
+    }
+    mix = {operation: weight for operation, weight in mix.items() if weight > 0}
+
+    embeddings = start_server(serve_embeddings(
+        port=free_port(), dim=args.dim, latency=args.embedding_latency,
+        per_item_latency=args.embedding_per_item_latency
+    ))
+    feeds = start_server(ThreadingHTTPServer(("127.0.0.1", free_port()),
+                                             make_feed_handler(args.feed_items, args.seed)))
+    embedding_url = f"http://127.0.0.1:{embeddings.server_port}/v1/embeddings"
+    feed_url = f"http://127.0.0.1:{feeds.server_port}/feed.xml"
+
+    api_port = free_port()
+    base_url = f"http://127.0.0.1:{api_port}"
+    with tempfile.TemporaryDirectory() as data_dir:
+        process = start_api(api_port, embedding_url, data_dir, args)
+        try:
+            async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+                await wait_ready(client, process)
+                # Seed the index so retrieval has something to search
+                for _ in range(args.seed_feeds):
+                    await client.post("/ingest/rss", params={"rss_url": feed_url})
+                await asyncio.sleep(args.warmup)
+
+            levels = []
+            for concurrency in args.concurrency:
+                print(f"Running concurrency {concurrency} for {args.duration}s...", file=sys.stderr)
+                levels.append(await run_level(base_url, concurrency, args.duration, mix, feed_url))
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+            embeddings.shutdown()
+            feeds.shutdown()
+
+    return {
+        "benchmark": "load_test",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "revision": git_revision(),
+        "config": {
+            "duration_s": args.duration,
+            "mix": mix,
+            "llm_latency_s": args.llm_latency,
+            "llm_token_delay_s": args.token_delay,
+            "embedding_latency_s": args.embedding_latency,
+            "embedding_per_item_latency_s": args.embedding_per_item_latency,
+            "dim": args.dim,
+            "feed_items": args.feed_items,
+        },
+        "levels": levels,
+    }
+
+
+def git_revision():
+    """Current commit of the repository, if available."""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--concurrency", type=lambda value: [int(v) for v in value.split(",")],
+                        default=[1, 8, 32], help="Comma-separated worker counts")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds per concurrency level")
+    parser.add_argument("--session-weight", type=float, default=1)
+    parser.add_argument("--message-weight", type=float, default=6)
+    parser.add_argument("--stream-weight", type=float, default=2)
+    parser.add_argument("--ingest-weight", type=float, default=1)
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Fake LLM seconds to first token")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="Fake LLM seconds between tokens")
+    parser.add_argument("--embedding-latency", type=float, default=0.02, help="Stub embedding seconds per request")
+    parser.add_argument("--embedding-per-item-latency", type=float, default=0.0)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--feed-items", type=int, default=20, help="Stories per stub feed response")
+    parser.add_argument("--seed-feeds", type=int, default=5, help="Feeds ingested before measuring")
+    parser.add_argument("--warmup", type=float, default=5, help="Seconds to let seeding finish")
+    parser.add_argument("--session-rate-limit", type=float, default=0,
+                        help="Messages per minute per session (0 disables)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true", help="Show the API's output")
+    parser.add_argument("--output", help="Write the report to this JSON file")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    report = asyncio.run(run(args))
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
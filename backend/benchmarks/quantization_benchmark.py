@@ -0,0 +1,151 @@
+"""Compare compact scan settings of the NumPy vector store.
+
+Indexes a corpus once, then opens the store with each quantization and
+truncation setting and reports the memory scanned by the first search
+pass, query latency percentiles and recall@k against exact brute-force
+search. The corpus is synthetic by default; pass --corpus with a .npy
+matrix of real embeddings to pick settings for an actual deployment,
+since truncation only preserves recall for models trained for it.
+
+Settings are written as quantization[:truncate_dim], e.g. "int8:256".
+
+Usage:
+    python benchmarks/quantization_benchmark.py --documents 100000 --dim 768
+    python benchmarks/quantization_benchmark.py --corpus embeddings.npy --settings none,int8,int8:384
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vector_store_benchmark import exact_neighbours, make_corpus
+
+
+def load_corpus(path: str, queries: int, seed: int):
+    """Split a matrix of real embeddings into a corpus and held-out queries."""
+    vectors = np.load(path).astype(np.float32)
+    vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    order = np.random.default_rng(seed).permutation(len(vectors))
+    return vectors[order[queries:]], vectors[order[:queries]]
+
+
+def parse_setting(setting: str):
+    """Split "int8:256" into ("int8", 256)."""
+    quantization, _, truncate_dim = setting.partition(":")
+    return quantization, int(truncate_dim or 0)
+
+
+def run_setting(directory: str, setting: str, queries: np.ndarray, truth: np.ndarray,
+                top_k: int, rescore_factor: int) -> dict:
+    """Open the indexed store with one setting and measure it."""
+    from rag.numpy_store import NumpyVectorStore
+
+    quantization, truncate_dim = parse_setting(setting)
+    started = time.perf_counter()
+    store = NumpyVectorStore(directory, quantization=quantization,
+                             truncate_dim=truncate_dim, rescore_factor=rescore_factor)
+    load_seconds = time.perf_counter() - started
+
+    rows = store.get_collection_count()
+    if store.compact_scan:
+        scan_bytes = store._codes[:rows].nbytes
+        if quantization == "int8":
+            scan_bytes += store._scales[:rows].nbytes
+    else:
+        scan_bytes = rows * store.dim * 4
+
+    # Warm caches before timing
+    store.search(queries[0], top_k=top_k)
+
+    latencies = []
+    hits = 0
+    for query, expected in zip(queries, truth):
+        started = time.perf_counter()
+        results = store.search(query, top_k=top_k)
+        latencies.append(time.perf_counter() - started)
+        found = {int(doc_id.split("_")[1]) for doc_id in results["ids"][0]}
+        hits += len(found & set(expected.tolist()))
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "quantization": quantization,
+        "truncate_dim": truncate_dim or store.dim,
+        "rescore_factor": rescore_factor,
+        "scan_bytes": int(scan_bytes),
+        "bytes_per_vector": scan_bytes / rows,
+        "compression": rows * store.dim * 4 / scan_bytes,
+        "load_seconds": load_seconds,
+        "latency_ms": {
+            "p50": float(np.percentile(latencies_ms, 50)),
+            "p95": float(np.percentile(latencies_ms, 95)),
+            "p99": float(np.percentile(latencies_ms, 99)),
+            "mean": float(latencies_ms.mean())
+        },
+        f"recall_at_{top_k}": hits / (len(queries) * top_k)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--corpus", help="Load embeddings from this .npy file instead of generating them")
+    parser.add_argument("--documents", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--topics", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=12)
+    parser.add_argument("--rescore-factor", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--settings", default="none,float16,int8,float16:384,int8:384,int8:256")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the report to this JSON file")
+    args = parser.parse_args()
+
+    if args.corpus:
+        corpus, queries = load_corpus(args.corpus, args.queries, args.seed)
+    else:
+        corpus, queries = make_corpus(args.documents, args.queries, args.dim, args.topics, args.seed)
+    truth = exact_neighbours(corpus, queries, args.top_k)
+
+    report = {
+        "documents": len(corpus),
+        "queries": len(queries),
+        "dim": corpus.shape[1],
+        "top_k": args.top_k,
+        "settings": {}
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        from rag.numpy_store import NumpyVectorStore
+
+        print(f"Indexing {len(corpus)} vectors...", file=sys.stderr)
+        store = NumpyVectorStore(directory)
+        ids = [f"doc_{i}" for i in range(len(corpus))]
+        for start in range(0, len(corpus), args.batch_size):
+            end = start + args.batch_size
+            store.upsert_documents(
+                documents=ids[start:end],
+                embeddings=corpus[start:end],
+                metadatas=[{} for _ in ids[start:end]],
+                ids=ids[start:end]
+            )
+
+        for setting in args.settings.split(","):
+            print(f"Benchmarking {setting}...", file=sys.stderr)
+            report["settings"][setting] = run_setting(
+                directory, setting, queries, truth, args.top_k, args.rescore_factor
+            )
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Local stand-in for the Jina embeddings API.
+
+Returns deterministic pseudo-random unit vectors derived from each input
+text, so the same text always gets the same embedding. Latency, batch
+limits and transient failures can be configured to exercise the client's
+batching and retry logic offline.
+
+Usage:
+    python benchmarks/stub_embedding_server.py --port 8081 --latency 0.05
+    JINA_API_URL=http://localhost:8081/v1/embeddings JINA_API_KEY=stub python app.py
+"""
+import argparse
+import hashlib
+import json
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+
+def stub_embedding(text: str, dim: int) -> list:
+    """Build a deterministic unit vector for a text."""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(dim)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+def make_handler(dim: int, latency: float, per_item_latency: float,
+                 max_batch_size: int, failure_rate: float):
+    """Build a request handler class bound to the given settings."""
+
+    class StubEmbeddingHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            texts = payload.get("input", [])
+            if isinstance(texts, str):
+                texts = [texts]
+
+            if failure_rate and random.random() < failure_rate:
+                self._send(429, {"detail": "rate limited"}, {"Retry-After": "0.1"})
+                return
+
+            if max_batch_size and len(texts) > max_batch_size:
+                self._send(413, {"detail": f"batch larger than {max_batch_size}"})
+                return
+
+            time.sleep(latency + per_item_latency * len(texts))
+            data = [
+                {"object": "embedding", "index": i, "embedding": stub_embedding(text, dim)}
+                for i, text in enumerate(texts)
+            ]
+            self._send(200, {
+                "model": payload.get("model", "stub"),
+                "object": "list",
+                "data": data,
+                "usage": {"total_tokens": sum(len(text.split()) for text in texts)}
+            })
+
+        def _send(self, status, body, headers=None):
+            encoded = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(encoded)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(encoded)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubEmbeddingHandler
+
+
+def serve(host: str = "127.0.0.1", port: int = 8081, dim: int = 768,
+          latency: float = 0.0, per_item_latency: float = 0.0,
+          max_batch_size: int = 0, failure_rate: float = 0.0) -> ThreadingHTTPServer:
+    """Create a stub embedding server; call serve_forever() to run it."""
+    handler = make_handler(dim, latency, per_item_latency, max_batch_size, failure_rate)
+    return ThreadingHTTPServer((host, port), handler)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds per request")
+    parser.add_argument("--per-item-latency", type=float, default=0.0, help="Extra seconds per input text")
+    parser.add_argument("--max-batch-size", type=int, default=0, help="Reject larger batches with 413 (0 = unlimited)")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    args = parser.parse_args()
+
+    server = serve(args.host, args.port, args.dim, args.latency,
+                   args.per_item_latency, args.max_batch_size, args.failure_rate)
+    print(f"Stub embedding server listening on http://{args.host}:{args.port}/v1/embeddings")
+    server.serve_forever()
@@ -0,0 +1,134 @@
+"""Compare the Chroma and NumPy vector store backends.
+
+Indexes the same synthetic corpus into both backends and reports insert
+throughput, query latency percentiles and recall@k against exact
+brute-force search. Vectors are drawn around random topic centroids so
+neighbourhoods resemble those of real news embeddings.
+
+Usage:
+    python benchmarks/vector_store_benchmark.py --documents 100000 --dim 1024
+    python benchmarks/vector_store_benchmark.py --backends numpy --output report.json
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def make_corpus(documents: int, queries: int, dim: int, topics: int, seed: int):
+    """Build clustered unit vectors for the corpus and the queries."""
+    rng = np.random.default_rng(seed)
+    centroids = rng.standard_normal((topics, dim)).astype(np.float32)
+
+    def sample(count):
+        vectors = centroids[rng.integers(0, topics, count)]
+        vectors = vectors + 0.6 * rng.standard_normal((count, dim)).astype(np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    return sample(documents), sample(queries)
+
+
+def exact_neighbours(corpus: np.ndarray, queries: np.ndarray, top_k: int) -> np.ndarray:
+    """Ground-truth top k rows for every query."""
+    scores = queries @ corpus.T
+    return np.argsort(-scores, axis=1)[:, :top_k]
+
+
+def build_store(backend: str, directory: str):
+    """Create an empty store of the given backend in directory."""
+    if backend == "numpy":
+        from rag.numpy_store import NumpyVectorStore
+        return NumpyVectorStore(directory)
+    import rag.vector_store as vector_store
+    vector_store.VECTOR_DB_PATH = directory
+    return vector_store.VectorStore(collection_name="benchmark")
+
+
+def run_backend(backend: str, corpus: np.ndarray, queries: np.ndarray,
+                truth: np.ndarray, top_k: int, batch_size: int) -> dict:
+    """Index the corpus into one backend and measure it."""
+    ids = [f"doc_{i}" for i in range(len(corpus))]
+    with tempfile.TemporaryDirectory() as directory:
+        store = build_store(backend, directory)
+
+        started = time.perf_counter()
+        for start in range(0, len(corpus), batch_size):
+            end = start + batch_size
+            store.upsert_documents(
+                documents=ids[start:end],
+                embeddings=corpus[start:end].tolist(),
+                metadatas=[{"fingerprint": doc_id} for doc_id in ids[start:end]],
+                ids=ids[start:end]
+            )
+        insert_seconds = time.perf_counter() - started
+
+        # Warm caches before timing
+        store.search(queries[0].tolist(), top_k=top_k)
+
+        latencies = []
+        hits = 0
+        for query, expected in zip(queries, truth):
+            started = time.perf_counter()
+            results = store.search(query.tolist(), top_k=top_k)
+            latencies.append(time.perf_counter() - started)
+            found = {int(doc_id.split("_")[1]) for doc_id in results["ids"][0]}
+            hits += len(found & set(expected.tolist()))
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "insert_seconds": insert_seconds,
+        "insert_per_second": len(corpus) / insert_seconds,
+        "latency_ms": {
+            "p50": float(np.percentile(latencies_ms, 50)),
+            "p95": float(np.percentile(latencies_ms, 95)),
+            "p99": float(np.percentile(latencies_ms, 99)),
+            "mean": float(latencies_ms.mean())
+        },
+        f"recall_at_{top_k}": hits / (len(queries) * top_k)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--documents", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--topics", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=12)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--backends", default="chroma,numpy")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the report to this JSON file")
+    args = parser.parse_args()
+
+    corpus, queries = make_corpus(args.documents, args.queries, args.dim, args.topics, args.seed)
+    truth = exact_neighbours(corpus, queries, args.top_k)
+
+    report = {
+        "documents": args.documents,
+        "queries": args.queries,
+        "dim": args.dim,
+        "top_k": args.top_k,
+        "backends": {}
+    }
+    for backend in args.backends.split(","):
+        print(f"Benchmarking {backend}...", file=sys.stderr)
+        report["backends"][backend] = run_backend(
+            backend, corpus, queries, truth, args.top_k, args.batch_size
+        )
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
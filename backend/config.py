@@ -13,19 +13,100 @@ REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
 REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
 REDIS_DB = int(os.getenv("REDIS_DB", "0"))
 REDIS_TTL = int(os.getenv("REDIS_TTL", "86400"))  # 24 hours default TTL
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
 
 # Vector DB Configuration
 VECTOR_DB_PATH = os.getenv("VECTOR_DB_PATH", "./chroma_db")
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "chroma")  # "chroma" or "numpy" (in-process exact search)
+NUMPY_STORE_PATH = os.getenv("NUMPY_STORE_PATH", "./data/vector_index")  # Directory of the numpy backend's files
+NUMPY_QUANTIZATION = os.getenv("NUMPY_QUANTIZATION", "none")  # "none", "float16" or "int8" for the first search pass
+NUMPY_TRUNCATE_DIM = int(os.getenv("NUMPY_TRUNCATE_DIM", "0"))  # Leading dimensions scanned in the first pass (0 = all)
+NUMPY_RESCORE_FACTOR = int(os.getenv("NUMPY_RESCORE_FACTOR", "4"))  # Candidates rescored at full precision per result
 
 # LLM Configuration
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-1.5-pro")
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "2000"))  # Tokens of recent history sent per turn
+HISTORY_SUMMARY_MAX_CHARS = int(os.getenv("HISTORY_SUMMARY_MAX_CHARS", "600"))  # Summary of older turns
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")  # "gemini" or "fake" for offline use
+FAKE_LLM_LATENCY = float(os.getenv("FAKE_LLM_LATENCY", "0.2"))  # Seconds to first token
+FAKE_LLM_TOKEN_DELAY = float(os.getenv("FAKE_LLM_TOKEN_DELAY", "0.02"))  # Seconds between tokens
 
 # RAG Configuration
 TOP_K = int(os.getenv("TOP_K", "3"))  # Number of passages to retrieve
-DATA_PATH = os.getenv("DATA_PATH", "./data/articles.json")
+RECENCY_WEIGHT = float(os.getenv("RECENCY_WEIGHT", "0.2"))  # Share of the ranking score given to freshness (0 disables)
+RECENCY_HALF_LIFE_HOURS = float(os.getenv("RECENCY_HALF_LIFE_HOURS", "72"))  # Age at which freshness has halved
+DATA_PATH = os.getenv("DATA_PATH", "./data/articles.json")  # Legacy JSON file, imported into the article log
+ARTICLE_LOG_PATH = os.getenv("ARTICLE_LOG_PATH", "./data/articles.jsonl")  # Append-only article log
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "256"))  # Articles processed per batch on replay
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "256"))  # Estimated tokens per indexed chunk
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "48"))  # Tokens repeated between chunks
+CHUNK_OVERFETCH = int(os.getenv("CHUNK_OVERFETCH", "4"))  # Chunks retrieved per article slot
+CONTEXT_MAX_CHUNKS = int(os.getenv("CONTEXT_MAX_CHUNKS", "8"))  # Chunks kept after MMR diversification
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "0.5"))  # Relevance (1) vs diversity (0) trade-off
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))  # Estimated tokens of passages per prompt
+HYBRID_SEARCH = os.getenv("HYBRID_SEARCH", "true").lower() == "true"  # Fuse BM25 keyword hits with vector hits
+KEYWORD_INDEX_PATH = os.getenv("KEYWORD_INDEX_PATH", "./data/keyword_index.jsonl")  # BM25 index log
+RRF_K = int(os.getenv("RRF_K", "60"))  # Rank offset for reciprocal rank fusion
+DEDUPE_ENABLED = os.getenv("DEDUPE_ENABLED", "true").lower() == "true"  # Index one copy of syndicated stories
+DEDUPE_INDEX_PATH = os.getenv("DEDUPE_INDEX_PATH", "./data/dedupe_index.jsonl")  # Near-duplicate cluster log
+DEDUPE_THRESHOLD = float(os.getenv("DEDUPE_THRESHOLD", "0.8"))  # Estimated Jaccard similarity of duplicates
+DEDUPE_NUM_PERM = int(os.getenv("DEDUPE_NUM_PERM", "128"))  # MinHash signature length
+DEDUPE_BANDS = int(os.getenv("DEDUPE_BANDS", "16"))  # LSH bands; must divide DEDUPE_NUM_PERM
+RSS_FETCH_WORKERS = int(os.getenv("RSS_FETCH_WORKERS", "16"))  # Concurrent page fetches
+RSS_FETCH_PER_HOST = int(os.getenv("RSS_FETCH_PER_HOST", "4"))  # Concurrent fetches per host
+RSS_FETCH_TIMEOUT = float(os.getenv("RSS_FETCH_TIMEOUT", "10"))  # Seconds per request
+RSS_FETCH_BUDGET = float(os.getenv("RSS_FETCH_BUDGET", "30"))  # Seconds for all pages of a feed
+RSS_PARSE_WORKERS = int(os.getenv("RSS_PARSE_WORKERS", "2"))  # HTML parsing processes
+FEEDS_PATH = os.getenv("FEEDS_PATH", "./data/feeds.json")  # Feed registry for ingest_daemon.py
+FEED_STATE_PATH = os.getenv("FEED_STATE_PATH", "./data/feed_state.json")
+FEED_DEFAULT_INTERVAL = int(os.getenv("FEED_DEFAULT_INTERVAL", "900"))  # Seconds between polls
+FEED_BACKOFF_FACTOR = float(os.getenv("FEED_BACKOFF_FACTOR", "1.5"))  # Interval growth when a feed is unchanged
+SEARCH_WORKERS = int(os.getenv("SEARCH_WORKERS", "8"))  # Threads for blocking vector queries
+
+# Answer Cache Configuration
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "1000"))  # 0 disables the cache
+ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", "900"))  # Seconds
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))  # Minimum query cosine similarity
+SINGLE_FLIGHT_ENABLED = os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() == "true"  # Share generation between identical concurrent first messages
 
 # Session Configuration
 SESSION_EXPIRY = int(os.getenv("SESSION_EXPIRY", "3600"))  # 1 hour
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory")  # "memory" or "redis"
+SESSION_MAX_COUNT = int(os.getenv("SESSION_MAX_COUNT", "10000"))  # Live in-memory sessions
+SESSION_MAX_MESSAGES = int(os.getenv("SESSION_MAX_MESSAGES", "200"))  # Messages kept per session
+SESSION_SWEEP_INTERVAL = int(os.getenv("SESSION_SWEEP_INTERVAL", "60"))  # Seconds between expiry sweeps
 
 # Jina Configuration
-JINA_API_KEY = os.getenv("JINA_API_KEY", "")
\ No newline at end of file
+JINA_API_KEY = os.getenv("JINA_API_KEY", "")
+JINA_API_URL = os.getenv("JINA_API_URL", "https://api.jina.ai/v1/embeddings")
+
+# Embedding Batching Configuration
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))  # Texts per request
+EMBEDDING_BATCH_MAX_BYTES = int(os.getenv("EMBEDDING_BATCH_MAX_BYTES", "200000"))  # UTF-8 bytes per request
+EMBEDDING_MAX_WORKERS = int(os.getenv("EMBEDDING_MAX_WORKERS", "4"))  # Concurrent requests
+EMBEDDING_MAX_RETRIES = int(os.getenv("EMBEDDING_MAX_RETRIES", "5"))
+EMBEDDING_TIMEOUT = float(os.getenv("EMBEDDING_TIMEOUT", "30"))  # Seconds per request
+QUERY_BATCH_WINDOW_MS = float(os.getenv("QUERY_BATCH_WINDOW_MS", "5"))  # Wait for concurrent queries to share a request (0 disables)
+QUERY_BATCH_MAX_SIZE = int(os.getenv("QUERY_BATCH_MAX_SIZE", "32"))  # Queries that close a batch early
+
+# Embedding Cache Configuration
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "./data/embedding_cache.db")  # Empty disables the disk tier
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "10000"))  # In-memory LRU entries
+
+# Admission Control Configuration
+ADMISSION_CONTROL = os.getenv("ADMISSION_CONTROL", "true").lower() == "true"  # Bound concurrency and shed load
+CHAT_MAX_CONCURRENCY = int(os.getenv("CHAT_MAX_CONCURRENCY", "32"))  # Chat requests processed at once
+CHAT_QUEUE_SIZE = int(os.getenv("CHAT_QUEUE_SIZE", "64"))  # Chat requests waiting for a slot before shedding
+CHAT_QUEUE_TIMEOUT = float(os.getenv("CHAT_QUEUE_TIMEOUT", "10"))  # Seconds a chat request may wait for slots
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))  # Concurrent LLM calls
+EMBEDDING_QUERY_MAX_CONCURRENCY = int(os.getenv("EMBEDDING_QUERY_MAX_CONCURRENCY", "8"))  # Concurrent query embedding calls
+SESSION_RATE_LIMIT = float(os.getenv("SESSION_RATE_LIMIT", "20"))  # Messages per minute per session (0 disables)
+SESSION_RATE_BURST = int(os.getenv("SESSION_RATE_BURST", "5"))  # Messages a session may send back to back
+INGEST_MAX_PENDING = int(os.getenv("INGEST_MAX_PENDING", "4"))  # Ingestion jobs running or queued before shedding
+INGEST_MAX_CONCURRENCY = int(os.getenv("INGEST_MAX_CONCURRENCY", "1"))  # Ingestion jobs running at once
+INGEST_YIELD_MAX = float(os.getenv("INGEST_YIELD_MAX", "5"))  # Longest pause of an ingestion batch for queued chat
+
+# Observability Configuration
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.01"))  # Fraction of requests whose stage timings are logged
+INGEST_METRICS_PORT = int(os.getenv("INGEST_METRICS_PORT", "9101"))  # Prometheus port of ingest_daemon.py; 0 disables
@@ -0,0 +1,71 @@
+"""Out-of-process feed ingestion daemon.
+
+Polls every feed in FEEDS_PATH on its own schedule and indexes new entries
+into the shared vector store, so ingestion never competes with chat
+requests for the API process's CPU and network. Per-feed state and stats
+are kept in FEED_STATE_PATH and served by the API at GET /ingest/feeds.
+Ingestion metrics are recorded in this process, so it serves its own
+Prometheus endpoint on INGEST_METRICS_PORT for scraping alongside the
+API's /metrics.
+
+Usage:
+    python ingest_daemon.py
+"""
+import logging
+import signal
+import sys
+
+from prometheus_client import start_http_server
+
+from config import (
+    DATA_PATH, FEEDS_PATH, FEED_STATE_PATH, FEED_DEFAULT_INTERVAL, FEED_BACKOFF_FACTOR,
+    HYBRID_SEARCH, KEYWORD_INDEX_PATH, DEDUPE_ENABLED, INGEST_METRICS_PORT
+)
+from rag.embeddings import EmbeddingModel
+from rag.vector_store import create_vector_store
+from rag.article_ingestion import ArticleIngestion
+from rag.keyword_index import KeywordIndex
+from rag.dedupe import create_duplicate_detector
+from rag.feed_scheduler import FeedScheduler, load_feed_registry
+
+logger = logging.getLogger("ingest_daemon")
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    feeds = load_feed_registry(FEEDS_PATH, FEED_DEFAULT_INTERVAL)
+    if not feeds:
+        logger.error("No feeds registered in %s", FEEDS_PATH)
+        return 1
+    
+    article_ingestion = ArticleIngestion(
+        embedding_model=EmbeddingModel(),
+        vector_store=create_vector_store(),
+        data_path=DATA_PATH,
+        keyword_index=KeywordIndex(KEYWORD_INDEX_PATH) if HYBRID_SEARCH else None,
+        duplicate_detector=create_duplicate_detector() if DEDUPE_ENABLED else None
+    )
+    scheduler = FeedScheduler(
+        article_ingestion,
+        feeds,
+        state_path=FEED_STATE_PATH,
+        backoff_factor=FEED_BACKOFF_FACTOR
+    )
+    
+    # Exit cleanly on SIGTERM; state is saved after every poll
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    
+    if INGEST_METRICS_PORT:
+        start_http_server(INGEST_METRICS_PORT)
+        logger.info("Serving ingestion metrics on port %d", INGEST_METRICS_PORT)
+    
+    logger.info("Polling %d feeds", len(feeds))
+    try:
+        scheduler.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        article_ingestion.fetcher.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
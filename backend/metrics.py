@@ -0,0 +1,124 @@
+"""Prometheus metrics and request-scoped tracing.
+
+Metrics are module-level so any component can record them; the API serves
+them at GET /metrics. A request's ID and, for sampled requests, its trace
+of stage timings live in context variables set by RequestContextMiddleware.
+"""
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional, Tuple
+
+from prometheus_client import Counter, Gauge, Histogram
+
+trace_logger = logging.getLogger("newschat.trace")
+
+# Latency buckets in seconds, from cache hits to slow LLM generations
+_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+STAGE_SECONDS = Histogram(
+    "newschat_stage_seconds",
+    "Time spent in each stage of a chat turn or ingest batch",
+    ["stage"],
+    buckets=_LATENCY_BUCKETS
+)
+REQUEST_SECONDS = Histogram(
+    "newschat_http_request_seconds",
+    "HTTP request latency, including streamed bodies",
+    ["method", "route", "status"],
+    buckets=_LATENCY_BUCKETS
+)
+CACHE_EVENTS = Counter(
+    "newschat_cache_events_total",
+    "Cache lookups by cache and result",
+    ["cache", "result"]
+)
+LLM_TOKENS = Counter(
+    "newschat_llm_tokens_total",
+    "Estimated LLM tokens by direction",
+    ["direction"]
+)
+INGESTED_ARTICLES = Counter(
+    "newschat_ingested_articles_total",
+    "Articles seen by ingestion, by outcome",
+    ["outcome"]
+)
+INGESTED_CHUNKS = Counter(
+    "newschat_ingested_chunks_total",
+    "Chunks embedded and written to the vector store"
+)
+QUERY_BATCH_SIZE = Histogram(
+    "newschat_query_embedding_batch_size",
+    "Distinct query texts per coalesced embedding request",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128)
+)
+QUERY_BATCH_FLUSHES = Counter(
+    "newschat_query_embedding_batches_total",
+    "Coalesced query embedding batches by what closed them",
+    ["reason"]
+)
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "newschat_admission_queue_depth",
+    "Requests waiting for a slot, by lane",
+    ["lane"]
+)
+ADMISSION_IN_FLIGHT = Gauge(
+    "newschat_admission_in_flight",
+    "Requests holding a slot, by lane",
+    ["lane"]
+)
+SHED_REQUESTS = Counter(
+    "newschat_shed_requests_total",
+    "Requests rejected by admission control, by lane and reason",
+    ["lane", "reason"]
+)
+UPSTREAM_ERRORS = Counter(
+    "newschat_upstream_errors_total",
+    "Errors from upstream services",
+    ["upstream", "kind"]
+)
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+trace_var: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("trace", default=None)
+
+
+def observe_stage(stage: str, seconds: float):
+    """Record a stage duration in the histogram and the request trace.
+
+    Args:
+        stage: Stage name, used as the histogram label
+        seconds: Duration in seconds
+    """
+    STAGE_SECONDS.labels(stage).observe(seconds)
+    trace = trace_var.get()
+    if trace is not None:
+        trace.append((stage, seconds))
+
+
+@contextmanager
+def stage_timer(stage: str):
+    """Time a block as a stage.
+
+    Args:
+        stage: Stage name, used as the histogram label
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - started)
+
+
+@contextmanager
+def count_errors(upstream: str):
+    """Count exceptions raised by a block against an upstream, then re-raise.
+
+    Args:
+        upstream: Upstream service name, used as the counter label
+    """
+    try:
+        yield
+    except Exception as e:
+        UPSTREAM_ERRORS.labels(upstream, type(e).__name__).inc()
+        raise
@@ -0,0 +1,204 @@
+import fcntl
+import json
+import os
+from contextlib import contextmanager
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+class AppendLog:
+    """Append-only JSON Lines log shared by several processes.
+
+    Writers append whole lines under an exclusive file lock. A reader
+    remembers how far it has replayed and applies only the records past
+    that offset, so refreshing is cheap when little has changed.
+
+    rewrite() replaces the file atomically with a compacted copy that
+    starts with a header record carrying a generation number one higher
+    than the previous file's. A reader tells a rewritten log from a longer
+    one by the file's inode and header generation, not its size, and then
+    replays the new file from the start instead of resuming at an offset
+    into unrelated records.
+
+    The log is not thread-safe; callers serialize access with their own
+    lock.
+    """
+
+    def __init__(self, path: str, lock_path: Optional[str] = None):
+        """Initialize the log.
+
+        Args:
+            path: Path of the JSON Lines file
+            lock_path: Path of the lock file. Defaults to path + ".lock".
+        """
+        self.path = path
+        self.lock_path = lock_path or f"{path}.lock"
+        self.offset = 0
+        self._inode = None
+        self._generation = 0
+        self._mtime = None
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @contextmanager
+    def lock(self):
+        """Hold the exclusive lock shared with other processes using the log."""
+        with open(self.lock_path, 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def append(self, records: List[Dict[str, Any]], replayed: bool = False):
+        """Append records. Caller holds the lock.
+
+        Args:
+            records: Records to write
+            replayed: The caller has replayed the log since taking the lock
+                      and already applied these records itself, so the
+                      replay offset moves past them
+        """
+        if not records:
+            return
+        lines = "".join(json.dumps(record) + "\n" for record in records).encode("utf-8")
+        # A single write in append mode keeps the batch contiguous
+        with open(self.path, 'ab') as f:
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+            if replayed:
+                self._remember(os.fstat(f.fileno()), self._generation, f.tell())
+
+    def replay(self, apply: Callable[[Dict[str, Any], int], None], reset: Callable[[], None]):
+        """Apply records written since the last replay, by any process.
+
+        Args:
+            apply: Called with each new record and its byte offset
+            reset: Called before replaying from the start when the log was
+                   rewritten since the last replay
+        """
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            if self.offset:
+                reset()
+                self._remember(None, 0, 0)
+            return
+
+        with f:
+            stat = os.fstat(f.fileno())
+            if (stat.st_ino == self._inode and stat.st_mtime_ns == self._mtime
+                    and stat.st_size == self.offset):
+                return
+
+            generation = self._read_generation(f)
+            if (stat.st_ino != self._inode or generation != self._generation
+                    or stat.st_size < self.offset):
+                if self.offset:
+                    reset()
+                self.offset = 0
+
+            offset = self.offset
+            for record, line_offset, offset in self._scan(f, self.offset):
+                if record is not None:
+                    apply(record, line_offset)
+            self._remember(stat, generation, offset)
+
+    def open(self) -> Optional[BinaryIO]:
+        """Open the log for reading records at replayed offsets.
+
+        Returns:
+            Binary file object, or None if the log was rewritten since the
+            last replay and offsets no longer apply
+        """
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            return None
+        if os.fstat(f.fileno()).st_ino != self._inode or self._read_generation(f) != self._generation:
+            f.close()
+            return None
+        return f
+
+    def rewrite(self, records: Iterable[Dict[str, Any]]):
+        """Atomically replace the log with records. Caller holds the lock.
+
+        The next replay, in this or any other process, starts over.
+
+        Args:
+            records: Records of the new log, in order
+        """
+        generation = 0
+        if os.path.exists(self.path):
+            with open(self.path, 'rb') as f:
+                generation = self._read_generation(f)
+
+        tmp_path = f"{self.path}.compact"
+        with open(tmp_path, 'w') as f:
+            f.write(json.dumps({"generation": generation + 1}) + "\n")
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    @classmethod
+    def read(cls, f: BinaryIO, start: int = 0,
+             end: Optional[int] = None) -> Iterator[Tuple[Dict[str, Any], int]]:
+        """Stream complete records from an open log file.
+
+        Args:
+            f: Log file opened in binary mode
+            start: Offset of the first line to read
+            end: Offset to stop at; defaults to the end of the file
+
+        Yields:
+            (record, offset of its line) tuples
+        """
+        for record, line_offset, offset in cls._scan(f, start):
+            if end is not None and offset > end:
+                break
+            if record is not None:
+                yield record, line_offset
+
+    @staticmethod
+    def _scan(f: BinaryIO, start: int) -> Iterator[Tuple[Optional[Dict[str, Any]], int, int]]:
+        """Yield (record or None, line offset, next offset) for each complete line."""
+        f.seek(start)
+        offset = start
+        for line in f:
+            if not line.endswith(b"\n"):
+                # Partially written record; pick it up next time
+                break
+            line_offset = offset
+            offset += len(line)
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            if not isinstance(record, dict) or (line_offset == 0 and _is_header(record)):
+                record = None
+            yield record, line_offset, offset
+
+    def _read_generation(self, f: BinaryIO) -> int:
+        """Read the generation of the header at the start of f, 0 if none."""
+        f.seek(0)
+        line = f.readline()
+        if line.startswith(b'{"generation"'):
+            try:
+                return int(json.loads(line)["generation"])
+            except (ValueError, KeyError, TypeError):
+                pass
+        return 0
+
+    def _remember(self, stat, generation: int, offset: int):
+        self._inode = stat.st_ino if stat is not None else None
+        self._mtime = stat.st_mtime_ns if stat is not None else None
+        self._generation = generation
+        self.offset = offset
+
+
+def _is_header(record: Dict[str, Any]) -> bool:
+    return list(record) == ["generation"]
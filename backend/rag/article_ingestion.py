@@ -1,87 +1,236 @@
-import json
 import feedparser
-import requests
-from bs4 import BeautifulSoup
-from typing import List, Dict, Any, Optional
+from typing import Callable, List, Dict, Any, Optional, Set, Tuple
+import json
+import logging
 import os
-import uuid
 from .embeddings import EmbeddingModel
-from .vector_store import VectorStore
+from .vector_store import BaseVectorStore
+from .fingerprints import article_id, content_fingerprint
+from .chunking import chunk_id, chunk_text, parent_id
+from .fetcher import ContentFetcher
+from .article_store import ArticleStore
+from .keyword_index import KeywordIndex
+from .dedupe import DuplicateDetector
+from .dates import parse_published
+from metrics import INGESTED_ARTICLES, INGESTED_CHUNKS, stage_timer
+from config import (
+    CHUNK_MAX_TOKENS, CHUNK_OVERLAP_TOKENS, RSS_FETCH_BUDGET, RSS_FETCH_WORKERS,
+    RSS_FETCH_PER_HOST, RSS_FETCH_TIMEOUT, RSS_PARSE_WORKERS, ARTICLE_LOG_PATH,
+    INGEST_BATCH_SIZE
+)
+
+logger = logging.getLogger(__name__)
 
 class ArticleIngestion:
     """Service for ingesting news articles."""
     
     def __init__(self, 
                  embedding_model: EmbeddingModel,
-                 vector_store: VectorStore,
-                 data_path: str = "./data/articles.json"):
+                 vector_store: BaseVectorStore,
+                 data_path: str = "./data/articles.json",
+                 fetcher: Optional[ContentFetcher] = None,
+                 article_store: Optional[ArticleStore] = None,
+                 keyword_index: Optional[KeywordIndex] = None,
+                 duplicate_detector: Optional[DuplicateDetector] = None,
+                 throttle: Optional[Callable[[], None]] = None):
         """Initialize the article ingestion service.
         
         Args:
             embedding_model: Embedding model
             vector_store: Vector store
-            data_path: Path to save/load articles
+            data_path: Path of a legacy JSON article file, imported into the
+                       article log the first time the log is empty
+            fetcher: HTTP fetcher for feeds and article pages. Defaults to
+                     one built from the RSS_FETCH_* settings.
+            article_store: Append-only article log. Defaults to one at
+                           ARTICLE_LOG_PATH.
+            keyword_index: Optional BM25 index kept in step with the
+                           vector store
+            duplicate_detector: Optional near-duplicate detector; only the
+                                canonical article of each cluster is indexed
+            throttle: Optional callable run before each embedding batch; it
+                      may block to let interactive traffic go first
         """
         self.embedding_model = embedding_model
         self.vector_store = vector_store
+        self.keyword_index = keyword_index
+        self.duplicate_detector = duplicate_detector
+        self.throttle = throttle
         self.data_path = data_path
+        if article_store is None:
+            article_store = ArticleStore(ARTICLE_LOG_PATH)
+        self.article_store = article_store
+        if fetcher is None:
+            fetcher = ContentFetcher(
+                max_workers=RSS_FETCH_WORKERS,
+                per_host_limit=RSS_FETCH_PER_HOST,
+                timeout=RSS_FETCH_TIMEOUT,
+                parse_workers=RSS_PARSE_WORKERS
+            )
+        self.fetcher = fetcher
+        self.change_listeners = []
+    
+    def add_change_listener(self, listener: Callable[[List[str]], None]):
+        """Register a callback run with the IDs of changed or deleted documents.
+        
+        Args:
+            listener: Function taking a list of document IDs
+        """
+        self.change_listeners.append(listener)
     
-    def ingest_from_file(self) -> int:
-        """Ingest articles from a local JSON file.
+    def _notify_changed(self, ids: List[str]):
+        """Tell listeners which documents were changed or deleted.
         
+        Args:
+            ids: Document IDs
+        """
+        if not ids:
+            return
+        for listener in self.change_listeners:
+            listener(ids)
+    
+    def ingest_from_file(self, prune_missing: bool = False,
+                         progress: Optional[Callable[[int, int], None]] = None) -> int:
+        """Ingest articles from the local article log.
+        
+        The log is streamed in batches of INGEST_BATCH_SIZE, so memory use
+        does not grow with the size of the corpus.
+        
+        Args:
+            prune_missing: Delete stored articles no longer in the log
+            progress: Called after each batch with the number of articles
+                      read so far and the number embedded and written so far
+            
         Returns:
             Number of articles ingested
         """
-        # Check if file exists
-        if not os.path.exists(self.data_path):
-            return 0
-            
-        # Load articles from file
-        with open(self.data_path, 'r') as f:
-            articles = json.load(f)
-            
-        # Process and add articles
-        return self.process_articles(articles)
+        # Seed the log from the legacy JSON file on first run
+        if self.article_store.count() == 0 and os.path.exists(self.data_path):
+            imported = self.article_store.import_json(self.data_path)
+            logger.info("Imported %d articles from %s", imported, self.data_path)
+        
+        processed = 0
+        seen = 0
+        batch = []
+        current_ids = set()
+        sources = set()
+        
+        for article in self.article_store.iter_articles():
+            batch.append(article)
+            seen += 1
+            if prune_missing:
+                current_ids.add(article["id"])
+                sources.add(article.get("source", ""))
+            if len(batch) >= INGEST_BATCH_SIZE:
+                processed += self.process_articles(batch)
+                batch = []
+                if progress:
+                    progress(seen, processed)
+        
+        if batch:
+            processed += self.process_articles(batch)
+        if progress:
+            progress(seen, processed)
+        
+        if prune_missing:
+            self._prune_missing(current_ids, sources)
+        
+        self._compact_article_log()
+        
+        return processed
     
-    def ingest_from_rss(self, rss_url: str) -> int:
+    def ingest_from_rss(self, rss_url: str, prune_missing: bool = False) -> int:
         """Ingest articles from an RSS feed.
         
         Args:
             rss_url: URL of the RSS feed
+            prune_missing: Delete stored articles from this feed's source
+                           that are no longer listed in it
             
         Returns:
             Number of articles ingested
         """
+        articles = self.fetch_feed(rss_url)
+        if articles is None:
+            logger.info("RSS feed not modified: %s", rss_url)
+            return 0
+        
+        return self.ingest_articles(articles, prune_missing=prune_missing)
+    
+    def ingest_articles(self, articles: List[Dict[str, Any]], 
+                        prune_missing: bool = False) -> int:
+        """Log new or changed articles and index them.
+        
+        Articles identical to their logged version are not appended
+        again, so repeated polls of a feed do not grow the article log.
+        
+        Args:
+            articles: List of article dictionaries
+            prune_missing: See process_articles
+            
+        Returns:
+            Number of articles embedded and written
+        """
+        if self.article_store.append_changed(articles):
+            self._compact_article_log()
+        return self.process_articles(articles, prune_missing=prune_missing)
+    
+    def _compact_article_log(self):
+        """Reclaim space once superseded records outnumber live ones."""
+        stats = self.article_store.stats()
+        if stats["records"] > 2 * stats["articles"]:
+            removed = self.article_store.compact()
+            logger.info("Compacted article log, removed %d superseded records", removed)
+    
+    def fetch_feed(self, rss_url: str, 
+                   skip_guids: Optional[Set[str]] = None) -> Optional[List[Dict[str, Any]]]:
+        """Fetch an RSS feed and the full text of its short entries.
+        
+        The feed is fetched with a conditional GET, and article pages are
+        fetched concurrently within RSS_FETCH_BUDGET seconds.
+        
+        Args:
+            rss_url: URL of the RSS feed
+            skip_guids: GUIDs of entries to leave out, e.g. ones already seen
+            
+        Returns:
+            List of article dictionaries (each with the entry's "guid"), or
+            None if the feed has not changed since it was last fetched
+        """
+        result = self.fetcher.fetch(rss_url)
+        if result.not_modified:
+            return None
+        if result.status != 200:
+            raise Exception(f"Error fetching RSS feed {rss_url}: HTTP {result.status}")
+        
         # Parse the RSS feed
-        feed = feedparser.parse(rss_url)
+        feed = feedparser.parse(result.body)
         
         # Extract articles
         articles = []
         for entry in feed.entries[:50]:  # Limit to 50 articles
-            article = {
+            guid = entry.get("id") or entry.get("link", "")
+            if skip_guids and guid in skip_guids:
+                continue
+            articles.append({
+                "guid": guid,
                 "title": entry.title,
                 "content": entry.get("summary", ""),
                 "url": entry.link,
                 "published": entry.get("published", ""),
-                "source": feed.feed.title
-            }
-            
-            # Try to get full content if only summary is available
-            if len(article["content"]) < 500 and article["url"]:
-                try:
-                    full_content = self._fetch_article_content(article["url"])
-                    if full_content:
-                        article["content"] = full_content
-                except Exception as e:
-                    print(f"Error fetching content for {article['url']}: {e}")
-            
-            articles.append(article)
+                "source": feed.feed.get("title", "")
+            })
         
-        # Save articles to file
-        self._save_articles(articles)
+        # Try to get full content if only summary is available
+        short = [a["url"] for a in articles if len(a["content"]) < 500 and a["url"]]
+        full_contents = self.fetcher.fetch_articles(short, budget=RSS_FETCH_BUDGET)
+        for article in articles:
+            full_content = full_contents.get(article["url"])
+            if full_content and len(article["content"]) < 500:
+                article["content"] = full_content
         
-        # Process and add articles
-        return self.process_articles(articles)
+        self.fetcher.remember(rss_url, result)
+        return articles
     
     def _fetch_article_content(self, url: str) -> Optional[str]:
         """Fetch article content from URL.
@@ -92,76 +241,260 @@ class ArticleIngestion:
         Returns:
             Article content or None if failed
         """
-        try:
-            response = requests.get(url, timeout=10)
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'html.parser')
-                
-                # Extract main content (this is a simple implementation)
-                # For real use, you'd need more sophisticated extraction
-                paragraphs = soup.find_all('p')
-                content = ' '.join([p.get_text() for p in paragraphs])
-                
-                return content
-        except Exception as e:
-            print(f"Error fetching {url}: {e}")
-            
-        return None
+        return self.fetcher.fetch_articles([url], budget=RSS_FETCH_BUDGET).get(url)
     
-    def _save_articles(self, articles: List[Dict[str, Any]]):
-        """Save articles to file.
+    def process_articles(self, articles: List[Dict[str, Any]], 
+                         prune_missing: bool = False) -> int:
+        """Process articles and add new or changed ones to the vector store.
+        
+        Each article is split into overlapping chunks that are embedded and
+        stored separately, with the parent article in their metadata.
+        Document IDs are derived from the article itself, so re-ingesting an
+        unchanged feed costs no embedding calls and no index writes.
         
         Args:
             articles: List of article dictionaries
+            prune_missing: If True, delete stored documents from the same
+                           sources that are no longer present in articles
+            
+        Returns:
+            Number of articles embedded and written
         """
-        # Create directory if it doesn't exist
-        os.makedirs(os.path.dirname(self.data_path), exist_ok=True)
+        # Fingerprint each article, keeping the last copy of any article
+        # that appears twice in the batch
+        pending = {}
         
-        # Save articles
-        with open(self.data_path, 'w') as f:
-            json.dump(articles, f)
+        for article in articles:
+            # Create document by combining title and content
+            document = f"{article['title']}\n\n{article['content']}"
+            pending[article_id(article)] = (article, content_fingerprint(document))
+        
+        current_ids = set(pending)
+        sources = {article.get("source", "") for article, _ in pending.values()}
+        
+        # Replace syndicated copies with the canonical article of their cluster
+        if self.duplicate_detector is not None:
+            pending, duplicates = self._collapse_duplicates(pending)
+            INGESTED_ARTICLES.labels("duplicate").inc(len(duplicates))
+            current_ids.update(pending)
+            self._delete_articles(duplicates)
+        
+        if prune_missing:
+            self._prune_missing(current_ids, sources)
+        
+        # Skip articles whose stored fingerprint is unchanged. Every chunk
+        # carries the article fingerprint, so the first chunk is enough.
+        stored = self.vector_store.get_fingerprints([chunk_id(aid, 0) for aid in pending])
+        changed = [
+            aid for aid, (_, fingerprint) in pending.items()
+            if stored.get(chunk_id(aid, 0)) != fingerprint
+        ]
+        INGESTED_ARTICLES.labels("unchanged").inc(len(pending) - len(changed))
+        
+        # Backfill the keyword index for unchanged articles it is missing;
+        # chunking is deterministic, so no embeddings are needed
+        if self.keyword_index is not None:
+            unchanged = set(pending) - set(changed)
+            missing = [aid for aid in unchanged if not self.keyword_index.contains(chunk_id(aid, 0))]
+            for aid in missing:
+                _, texts, _, ids = self._chunk_article(aid, *pending[aid])
+                self.keyword_index.upsert(ids, texts)
+        
+        if not changed:
+            return 0
+        
+        documents = []
+        texts = []
+        metadatas = []
+        ids = []
+        
+        for aid in changed:
+            chunk_documents, chunk_texts, chunk_metadatas, chunk_ids = self._chunk_article(
+                aid, *pending[aid]
+            )
+            documents.extend(chunk_documents)
+            texts.extend(chunk_texts)
+            metadatas.extend(chunk_metadatas)
+            ids.extend(chunk_ids)
+        
+        # Generate embeddings
+        if self.throttle is not None:
+            self.throttle()
+        with stage_timer("ingest_embed"):
+            embeddings = self.embedding_model._get_embeddings(texts)
+        
+        # Add to vector store
+        with stage_timer("ingest_write"):
+            self.vector_store.upsert_documents(
+                documents=documents,
+                embeddings=embeddings,
+                metadatas=metadatas,
+                ids=ids
+            )
+        
+        # Drop chunks left over from a longer previous version and
+        # unchunked documents written by older releases
+        current = set(ids)
+        stale = [
+            doc_id for doc_id in self.vector_store.get_ids(where={"article_id": {"$in": changed}})
+            if doc_id not in current
+        ]
+        stale.extend(changed)
+        self.vector_store.delete_documents(stale)
+        if self.keyword_index is not None:
+            self.keyword_index.upsert(ids, texts)
+            self.keyword_index.delete(stale)
+        self._notify_changed(ids + stale)
+        
+        INGESTED_ARTICLES.labels("embedded").inc(len(changed))
+        INGESTED_CHUNKS.inc(len(ids))
+        logger.info("Indexed %d of %d articles as %d chunks, removed %d stale documents",
+                    len(changed), len(pending), len(ids), len(stale))
+        return len(changed)
     
-    def process_articles(self, articles: List[Dict[str, Any]]) -> int:
-        """Process articles and add to vector store.
+    def _collapse_duplicates(self, pending: Dict[str, Tuple[Dict[str, Any], str]]):
+        """Map a batch onto the canonical articles of its duplicate clusters.
+        
+        Every canonical article with a member in the batch is returned,
+        loaded from the article log if it is not in the batch itself, with
+        the other members of its cluster as "alternates". The alternates
+        are part of its fingerprint, so a new syndicated copy rewrites the
+        canonical article's metadata; its embeddings come from the cache.
         
         Args:
-            articles: List of article dictionaries
+            pending: Mapping of article ID to (article, fingerprint)
+            
+        Returns:
+            Tuple of (mapping of canonical article ID to (article,
+            fingerprint), IDs of articles that are duplicates)
+        """
+        assignments = self.duplicate_detector.assign(
+            [(aid, article) for aid, (article, _) in pending.items()]
+        )
+        
+        collapsed = {}
+        duplicates = []
+        for aid, canonical in assignments.items():
+            if canonical == aid:
+                article = pending[aid][0]
+            else:
+                article = pending[canonical][0] if canonical in pending else self.article_store.get(canonical)
+                if article is None:
+                    # The canonical article was never logged here; keep the copy
+                    collapsed[aid] = pending[aid]
+                    continue
+                duplicates.append(aid)
+            if canonical in collapsed:
+                continue
+            
+            alternates = [
+                {key: member[key] for key in ("source", "url", "title")}
+                for member in self.duplicate_detector.alternates(canonical)
+            ]
+            document = f"{article['title']}\n\n{article['content']}"
+            if alternates:
+                article = {**article, "alternates": alternates}
+                document += "\n\n" + json.dumps(alternates, sort_keys=True)
+            collapsed[canonical] = (article, content_fingerprint(document))
+        
+        return collapsed, duplicates
+    
+    def _delete_articles(self, article_ids: List[str]):
+        """Delete every stored chunk of the given articles.
+        
+        Args:
+            article_ids: Article IDs
+        """
+        if not article_ids:
+            return
+        stale = self.vector_store.get_ids(where={"article_id": {"$in": article_ids}})
+        if not stale:
+            return
+        self.vector_store.delete_documents(stale)
+        if self.keyword_index is not None:
+            self.keyword_index.delete(stale)
+        self._notify_changed(stale)
+    
+    def _chunk_article(self, aid: str, article: Dict[str, Any], fingerprint: str):
+        """Split an article into the chunks stored for it.
+        
+        Args:
+            aid: Article ID
+            article: Article dictionary
+            fingerprint: Content fingerprint of the article
             
         Returns:
-            Number of articles processed
+            Tuple of (chunk texts, texts to embed and index, metadatas, IDs)
         """
-        # Prepare documents, metadata, and IDs
+        chunks = chunk_text(article["content"], CHUNK_MAX_TOKENS, CHUNK_OVERLAP_TOKENS)
+        if not chunks:
+            chunks = [("", 0)]
+        # Sortable publication time for date filters and recency
+        # ranking; 0 when the date is missing or unparseable
+        published_ts = parse_published(article.get("published", "")) or 0.0
+        
         documents = []
+        texts = []
         metadatas = []
         ids = []
         
-        for article in articles:
-            # Create document by combining title and content
-            document = f"{article['title']}\n\n{article['content']}"
-            documents.append(document)
+        for index, (chunk, overlap_chars) in enumerate(chunks):
+            documents.append(chunk)
+            # The title gives every chunk the article's topic for embedding
+            texts.append(f"{article['title']}\n\n{chunk}")
             
             # Create metadata (exclude content to save space)
-            metadata = {
+            metadatas.append({
                 "title": article["title"],
                 "url": article.get("url", ""),
                 "published": article.get("published", ""),
-                "source": article.get("source", "")
-            }
-            metadatas.append(metadata)
-            
-            # Generate ID
-            doc_id = f"doc_{uuid.uuid4()}"
-            ids.append(doc_id)
+                "published_ts": published_ts,
+                "source": article.get("source", ""),
+                "fingerprint": fingerprint,
+                "article_id": aid,
+                "chunk_index": index,
+                "chunk_count": len(chunks),
+                "overlap_chars": overlap_chars,
+                # Other sources that published the same story
+                "alternates": json.dumps(article.get("alternates", []))
+            })
+            ids.append(chunk_id(aid, index))
         
-        # Generate embeddings
-        embeddings = self.embedding_model._get_embeddings(documents)
+        return documents, texts, metadatas, ids
+    
+    def _prune_missing(self, current_ids, sources):
+        """Delete stored documents from the given sources that are not current.
         
-        # Add to vector store
-        self.vector_store.add_documents(
-            documents=documents,
-            embeddings=embeddings,
-            metadatas=metadatas,
-            ids=ids
-        )
+        A pruned article may be the canonical copy of a story other
+        sources still publish. Its cluster is dissolved and the surviving
+        copies are ingested again, so one of them takes over the story.
+        
+        Args:
+            current_ids: IDs of the articles in the latest batch
+            sources: Sources covered by the latest batch
+        """
+        current_ids = set(current_ids)
+        pruned = set()
+        for source in sources:
+            stale = [
+                doc_id for doc_id in self.vector_store.get_ids(where={"source": source})
+                if parent_id(doc_id) not in current_ids
+            ]
+            self.vector_store.delete_documents(stale)
+            if self.keyword_index is not None:
+                self.keyword_index.delete(stale)
+            self._notify_changed(stale)
+            pruned.update(parent_id(doc_id) for doc_id in stale)
         
-        return len(documents)
\ No newline at end of file
+        if self.duplicate_detector is None or not pruned:
+            return
+        orphans = self.duplicate_detector.remove(sorted(pruned))
+        survivors = [
+            self.article_store.get(member["id"]) for member in orphans
+            # Copies from the pruned sources are gone along with the original
+            if member["source"] not in sources or member["id"] in current_ids
+        ]
+        survivors = [article for article in survivors if article is not None]
+        if survivors:
+            logger.info("Re-indexing %d surviving copies of pruned articles", len(survivors))
+            self.process_articles(survivors)
@@ -0,0 +1,204 @@
+import json
+import os
+import threading
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from .append_log import AppendLog
+from .fingerprints import article_id
+
+
+class ArticleStore:
+    """Append-only article log in JSON Lines format.
+
+    Every ingest appends one record per article, tagged with its stable
+    article ID, so nothing already stored is ever rewritten or dropped. An
+    in-memory index maps each article ID to the byte offset of its latest
+    record; it holds IDs and offsets only, never article content. Readers
+    stream the log line by line, and compact() rewrites it keeping only
+    the latest record per article.
+
+    Appends and compaction take an exclusive file lock, so the API process
+    and the ingestion daemon can share one log.
+    """
+
+    def __init__(self, path: str):
+        """Initialize the article store.
+
+        Args:
+            path: Path of the JSON Lines log
+        """
+        self.path = path
+        self._log = AppendLog(path)
+        self._offsets = {}
+        self._records = 0
+        self._lock = threading.Lock()
+
+    def append(self, articles: List[Dict[str, Any]]) -> int:
+        """Append articles to the log.
+
+        Args:
+            articles: List of article dictionaries
+
+        Returns:
+            Number of records written
+        """
+        if not articles:
+            return 0
+
+        records = [{"id": article_id(article), **article} for article in articles]
+        with self._lock, self._log.lock():
+            self._log.append(records)
+
+        return len(articles)
+
+    def append_changed(self, articles: List[Dict[str, Any]]) -> int:
+        """Append the articles that are new or differ from their logged version.
+
+        Re-fetching an unchanged feed writes nothing, so polling does not
+        grow the log.
+
+        Args:
+            articles: List of article dictionaries
+
+        Returns:
+            Number of records written
+        """
+        records = {}
+        for article in articles:
+            record = {"id": article_id(article), **article}
+            records[record["id"]] = record
+
+        with self._lock, self._log.lock():
+            # Holding the file lock, the log cannot be compacted under us
+            self._log.replay(self._index, self._reset)
+            stored = {}
+            f = self._log.open()
+            if f is not None:
+                with f:
+                    for doc_id in records:
+                        if doc_id in self._offsets:
+                            for record, _ in AppendLog.read(f, self._offsets[doc_id]):
+                                stored[doc_id] = record
+                                break
+
+            changed = [record for doc_id, record in records.items() if stored.get(doc_id) != record]
+            self._log.append(changed)
+
+        return len(changed)
+
+    def iter_articles(self) -> Iterator[Dict[str, Any]]:
+        """Stream the latest version of every article in log order.
+
+        Yields:
+            Article dictionaries, including their "id"
+        """
+        f, offsets, end = self._open_indexed()
+        if f is None:
+            return
+
+        with f:
+            for record, offset in AppendLog.read(f, end=end):
+                if offsets.get(record.get("id")) == offset:
+                    yield record
+
+    def get(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        """Read the latest version of one article.
+
+        Args:
+            doc_id: Article ID
+
+        Returns:
+            Article dictionary, or None if the article is unknown
+        """
+        f, offsets, _ = self._open_indexed()
+        if f is None or doc_id not in offsets:
+            if f is not None:
+                f.close()
+            return None
+        with f:
+            for record, _ in AppendLog.read(f, offsets[doc_id]):
+                return record if record.get("id") == doc_id else None
+        return None
+
+    def count(self) -> int:
+        """Get the number of distinct articles in the log."""
+        self.refresh_index()
+        return len(self._offsets)
+
+    def stats(self) -> Dict[str, int]:
+        """Get log size counters.
+
+        Returns:
+            Dictionary with distinct articles, total records and bytes
+        """
+        self.refresh_index()
+        return {
+            "articles": len(self._offsets),
+            "records": self._records,
+            "bytes": self._log.offset
+        }
+
+    def refresh_index(self):
+        """Index records appended since the last refresh, by any process."""
+        with self._lock:
+            self._log.replay(self._index, self._reset)
+
+    def compact(self) -> int:
+        """Rewrite the log keeping only the latest record of each article.
+
+        Returns:
+            Number of superseded records removed
+        """
+        with self._lock, self._log.lock():
+            self._log.replay(self._index, self._reset)
+            f = self._log.open()
+            if f is None:
+                return 0
+
+            offsets, records = self._offsets, self._records
+            with f:
+                self._log.rewrite(
+                    record for record, offset in AppendLog.read(f, end=self._log.offset)
+                    if offsets.get(record.get("id")) == offset
+                )
+            self._log.replay(self._index, self._reset)
+
+        return records - len(offsets)
+
+    def import_json(self, path: str) -> int:
+        """Append the articles of a legacy JSON array file.
+
+        Args:
+            path: Path of a JSON file holding a list of articles
+
+        Returns:
+            Number of articles imported
+        """
+        with open(path, 'r') as f:
+            articles = json.load(f)
+        return self.append(articles)
+
+    def _open_indexed(self) -> Tuple[Optional[BinaryIO], Dict[str, int], int]:
+        """Refresh the index and open the log it describes.
+
+        Returns:
+            Tuple of (open log file or None if there is no log, offsets of
+            the latest records, end of the indexed part of the log)
+        """
+        while True:
+            with self._lock:
+                self._log.replay(self._index, self._reset)
+                f = self._log.open()
+                if f is not None or not os.path.exists(self.path):
+                    return f, self._offsets, self._log.offset
+            # Compacted by another process between the refresh and the open
+
+    def _index(self, record: Dict[str, Any], offset: int):
+        if "id" in record:
+            self._offsets[record["id"]] = offset
+            self._records += 1
+
+    def _reset(self):
+        # A new dictionary, so readers of the old log keep consistent offsets
+        self._offsets = {}
+        self._records = 0
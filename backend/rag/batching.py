@@ -0,0 +1,323 @@
+import asyncio
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncContextManager, Awaitable, Callable, ContextManager, List, Optional
+
+import numpy as np
+
+from metrics import QUERY_BATCH_FLUSHES, QUERY_BATCH_SIZE, UPSTREAM_ERRORS
+
+
+class TransientEmbeddingError(Exception):
+    """Raised by a batch sender for failures worth retrying (429, 5xx, timeouts)."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class EmbeddingBatcher:
+    """Split embedding inputs into bounded batches and send them concurrently.
+
+    Batches are limited by item count and by UTF-8 byte size, sent through
+    a bounded thread pool, retried with exponential backoff on transient
+    errors and reassembled in input order.
+    """
+
+    def __init__(self,
+                 send_batch: Callable[[List[str]], List[np.ndarray]],
+                 asend_batch: Optional[Callable[[List[str]], Awaitable[List[np.ndarray]]]] = None,
+                 max_batch_size: int = 64,
+                 max_batch_bytes: int = 200000,
+                 max_workers: int = 4,
+                 max_retries: int = 5,
+                 backoff_base: float = 0.5,
+                 backoff_max: float = 30.0,
+                 async_limit: Optional[Callable[[], AsyncContextManager]] = None,
+                 sync_limit: Optional[Callable[[], ContextManager]] = None):
+        """Initialize the batcher.
+
+        Args:
+            send_batch: Function embedding one batch of texts
+            asend_batch: Coroutine function embedding one batch, used by aembed()
+            max_batch_size: Maximum number of texts per batch
+            max_batch_bytes: Maximum total UTF-8 size of a batch
+            max_workers: Maximum number of batches in flight
+            max_retries: Retries per batch after a transient error
+            backoff_base: Initial backoff delay in seconds
+            backoff_max: Upper bound for a single backoff delay
+            async_limit: Optional factory of a context manager held around
+                         each batch sent by aembed(), e.g. a shared
+                         concurrency limit
+            sync_limit: Optional factory of a context manager held around
+                        each batch sent by embed()
+        """
+        self.send_batch = send_batch
+        self.asend_batch = asend_batch
+        self.max_batch_size = max_batch_size
+        self.max_batch_bytes = max_batch_bytes
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.async_limit = async_limit
+        self.sync_limit = sync_limit
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="embedding-batch"
+        )
+
+    def split(self, texts: List[str]) -> List[List[int]]:
+        """Group text indices into batches that respect both budgets.
+
+        A single text larger than the byte budget gets a batch of its own.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            List of batches, each a list of indices into texts
+        """
+        batches = []
+        current = []
+        current_bytes = 0
+
+        for index, text in enumerate(texts):
+            size = len(text.encode("utf-8"))
+            if current and (len(current) >= self.max_batch_size
+                            or current_bytes + size > self.max_batch_bytes):
+                batches.append(current)
+                current = []
+                current_bytes = 0
+            current.append(index)
+            current_bytes += size
+
+        if current:
+            batches.append(current)
+
+        return batches
+
+    def embed(self, texts: List[str]) -> List[np.ndarray]:
+        """Embed texts batch by batch.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            List of embeddings in input order
+        """
+        batches = self.split(texts)
+        if not batches:
+            return []
+
+        if len(batches) == 1:
+            results = [self._send_limited([texts[i] for i in batches[0]])]
+        else:
+            futures = [
+                self._executor.submit(self._send_limited, [texts[i] for i in batch])
+                for batch in batches
+            ]
+            results = [future.result() for future in futures]
+
+        return self._reassemble(len(texts), batches, results)
+
+    async def aembed(self, texts: List[str]) -> List[np.ndarray]:
+        """Embed texts batch by batch without blocking the event loop.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            List of embeddings in input order
+        """
+        batches = self.split(texts)
+        if not batches:
+            return []
+
+        semaphore = asyncio.Semaphore(self.max_workers)
+
+        async def send(batch):
+            async with semaphore:
+                if self.async_limit is None:
+                    return await self._asend_with_retry([texts[i] for i in batch])
+                async with self.async_limit():
+                    return await self._asend_with_retry([texts[i] for i in batch])
+
+        results = await asyncio.gather(*(send(batch) for batch in batches))
+        return self._reassemble(len(texts), batches, results)
+
+    def _reassemble(self, count: int, batches: List[List[int]],
+                    results: List[List[np.ndarray]]) -> List[np.ndarray]:
+        """Put per-batch results back into input order.
+
+        Args:
+            count: Number of input texts
+            batches: Index batches produced by split()
+            results: Embeddings returned for each batch
+
+        Returns:
+            List of embeddings in input order
+        """
+        embeddings = [None] * count
+        for batch, batch_embeddings in zip(batches, results):
+            if len(batch_embeddings) != len(batch):
+                raise Exception(
+                    f"Embedding batch returned {len(batch_embeddings)} vectors for {len(batch)} inputs"
+                )
+            for index, embedding in zip(batch, batch_embeddings):
+                embeddings[index] = embedding
+
+        return embeddings
+
+    def _send_limited(self, batch: List[str]) -> List[np.ndarray]:
+        """Send one batch with retries, holding sync_limit if there is one."""
+        if self.sync_limit is None:
+            return self._send_with_retry(batch)
+        with self.sync_limit():
+            return self._send_with_retry(batch)
+
+    def _send_with_retry(self, batch: List[str]) -> List[np.ndarray]:
+        """Send one batch, retrying transient failures with backoff.
+
+        Args:
+            batch: Texts in the batch
+
+        Returns:
+            Embeddings for the batch
+        """
+        attempt = 0
+        while True:
+            try:
+                return self.send_batch(batch)
+            except TransientEmbeddingError as e:
+                if attempt >= self.max_retries:
+                    raise
+                UPSTREAM_ERRORS.labels("embedding", "retried").inc()
+                time.sleep(self.backoff_delay(attempt, e.retry_after))
+                attempt += 1
+
+    async def _asend_with_retry(self, batch: List[str]) -> List[np.ndarray]:
+        """Async counterpart of _send_with_retry.
+
+        Args:
+            batch: Texts in the batch
+
+        Returns:
+            Embeddings for the batch
+        """
+        attempt = 0
+        while True:
+            try:
+                return await self.asend_batch(batch)
+            except TransientEmbeddingError as e:
+                if attempt >= self.max_retries:
+                    raise
+                UPSTREAM_ERRORS.labels("embedding", "retried").inc()
+                await asyncio.sleep(self.backoff_delay(attempt, e.retry_after))
+                attempt += 1
+
+    def backoff_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Compute the delay before the next retry.
+
+        Args:
+            attempt: Zero-based retry number
+            retry_after: Delay requested by the server, if any
+
+        Returns:
+            Delay in seconds
+        """
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        delay = min(self.backoff_base * (2 ** attempt), self.backoff_max)
+        # Full jitter keeps concurrent workers from retrying in lockstep
+        return random.uniform(0, delay)
+
+
+class QueryCoalescer:
+    """Merge concurrent single-text embedding requests into shared batches.
+
+    The first request to arrive opens a batch that is sent once the window
+    has elapsed or max_batch_size distinct texts have joined, whichever
+    comes first. Every caller then gets its own embedding, or the batch's
+    error, from the one upstream call. Must be used from a single event
+    loop.
+    """
+
+    def __init__(self,
+                 send: Callable[[List[str]], Awaitable[List[np.ndarray]]],
+                 window: float = 0.005,
+                 max_batch_size: int = 32):
+        """Initialize the coalescer.
+
+        Args:
+            send: Coroutine function embedding a list of texts
+            window: Seconds a batch stays open after its first request
+            max_batch_size: Distinct texts that close a batch early
+        """
+        self.send = send
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self._pending = {}
+        self._timer = None
+        # The loop only keeps weak references to tasks
+        self._sending = set()
+
+    async def embed(self, text: str) -> np.ndarray:
+        """Embed one text as part of the current batch.
+
+        Args:
+            text: Text to embed
+
+        Returns:
+            The text's embedding
+        """
+        loop = asyncio.get_running_loop()
+        future = self._pending.get(text)
+        if future is None:
+            future = loop.create_future()
+            self._pending[text] = future
+            if len(self._pending) >= self.max_batch_size:
+                self._flush("full")
+            elif self._timer is None:
+                self._timer = loop.call_later(self.window, self._flush, "window")
+        # Shielded so one caller giving up does not fail the others
+        return await asyncio.shield(future)
+
+    def _flush(self, reason: str):
+        """Send the open batch in the background."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, {}
+        if batch:
+            QUERY_BATCH_FLUSHES.labels(reason).inc()
+            QUERY_BATCH_SIZE.observe(len(batch))
+            task = asyncio.ensure_future(self._send(batch))
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+
+    async def _send(self, batch):
+        """Embed a batch and resolve its callers' futures.
+
+        Every future is resolved, with the batch's error if the request
+        fails or is cancelled, so no caller waits forever.
+        """
+        try:
+            embeddings = await self.send(list(batch))
+            if len(embeddings) != len(batch):
+                raise ValueError(
+                    f"Expected {len(batch)} embeddings, got {len(embeddings)}"
+                )
+        except asyncio.CancelledError:
+            for future in batch.values():
+                future.cancel()
+            raise
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for future, embedding in zip(batch.values(), embeddings):
+            if not future.done():
+                future.set_result(embedding)
@@ -0,0 +1,176 @@
+import re
+from typing import Any, Dict, List, Tuple
+from .tokens import estimate_tokens
+
+# Sentence ends followed by whitespace and an uppercase letter, digit or quote
+_SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])["\')\]]?\s+(?=["\'(\[]?[A-Z0-9])')
+
+
+def chunk_id(article_id: str, index: int) -> str:
+    """Build the document ID of an article chunk.
+
+    Args:
+        article_id: ID of the parent article
+        index: Position of the chunk within the article
+
+    Returns:
+        Chunk document ID
+    """
+    return f"{article_id}#{index}"
+
+
+def parent_id(doc_id: str) -> str:
+    """Get the article ID a chunk document ID belongs to.
+
+    Args:
+        doc_id: Chunk document ID
+
+    Returns:
+        ID of the parent article
+    """
+    return doc_id.split("#", 1)[0]
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split text into sentences, treating paragraph breaks as boundaries.
+
+    Args:
+        text: Text to split
+
+    Returns:
+        List of sentences with surrounding whitespace removed
+    """
+    sentences = []
+    for paragraph in re.split(r'\n\s*\n', text):
+        paragraph = " ".join(paragraph.split())
+        if paragraph:
+            sentences.extend(s for s in _SENTENCE_BOUNDARY.split(paragraph) if s)
+    return sentences
+
+
+def _split_long(sentence: str, max_tokens: int) -> List[str]:
+    """Split a sentence longer than max_tokens at word boundaries."""
+    pieces = []
+    current = []
+    for word in sentence.split(" "):
+        if current and estimate_tokens(" ".join(current + [word])) > max_tokens:
+            pieces.append(" ".join(current))
+            current = []
+        current.append(word)
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+
+def chunk_text(text: str, max_tokens: int, overlap_tokens: int) -> List[Tuple[str, int]]:
+    """Split text into overlapping chunks of whole sentences.
+
+    Each chunk after the first starts with the trailing sentences of the
+    previous chunk, up to overlap_tokens, so a passage is never cut off
+    from the sentence that introduces it.
+
+    Args:
+        text: Text to split
+        max_tokens: Maximum estimated tokens per chunk
+        overlap_tokens: Maximum estimated tokens repeated from the previous chunk
+
+    Returns:
+        List of (chunk text, length in characters of the repeated prefix
+        including its trailing space) tuples
+    """
+    sentences = []
+    for sentence in split_sentences(text):
+        if estimate_tokens(sentence) > max_tokens:
+            sentences.extend(_split_long(sentence, max_tokens))
+        else:
+            sentences.append(sentence)
+
+    chunks = []
+    current = []
+    overlap = []
+
+    for sentence in sentences:
+        candidate = current + [sentence]
+        if len(current) > len(overlap) and estimate_tokens(" ".join(candidate)) > max_tokens:
+            chunks.append((" ".join(current), _prefix_length(overlap)))
+
+            # Carry trailing sentences over as the next chunk's overlap
+            overlap = []
+            for previous in reversed(current):
+                if estimate_tokens(" ".join([previous] + overlap)) > overlap_tokens:
+                    break
+                overlap.insert(0, previous)
+            if estimate_tokens(" ".join(overlap + [sentence])) > max_tokens:
+                overlap = []
+            current = overlap + [sentence]
+        else:
+            current = candidate
+
+    if current:
+        chunks.append((" ".join(current), _prefix_length(overlap)))
+
+    return chunks
+
+
+def _prefix_length(overlap: List[str]) -> int:
+    """Length of the overlap prefix of a chunk, including the joining space."""
+    return len(" ".join(overlap)) + 1 if overlap else 0
+
+
+def merge_search_results(search_results: Dict[str, Any], max_articles: int) -> List[Dict[str, Any]]:
+    """Group retrieved chunks by article and stitch adjacent chunks together.
+
+    Articles are ordered by their best-ranked chunk. Within an article,
+    consecutive chunks are joined with their overlap removed and gaps are
+    marked with an ellipsis.
+
+    Args:
+        search_results: Vector store search results for a single query
+        max_articles: Maximum number of articles to return
+
+    Returns:
+        List of passages with "article_id", "text", "metadata" and
+        "distance" (of the best chunk, None if it was only a keyword hit)
+    """
+    passages = {}
+
+    rows = zip(
+        search_results["ids"][0],
+        search_results["documents"][0],
+        search_results["metadatas"][0],
+        search_results["distances"][0]
+    )
+    for doc_id, document, metadata, distance in rows:
+        metadata = metadata or {}
+        article = metadata.get("article_id") or parent_id(doc_id)
+        if article not in passages:
+            if len(passages) >= max_articles:
+                continue
+            passages[article] = {
+                "article_id": article,
+                "metadata": metadata,
+                "distance": distance,
+                "chunks": {}
+            }
+        passages[article]["chunks"][metadata.get("chunk_index", 0)] = (
+            document, metadata.get("overlap_chars", 0)
+        )
+
+    merged = []
+    for passage in passages.values():
+        chunks = passage.pop("chunks")
+        text = ""
+        previous = None
+        for index in sorted(chunks):
+            document, overlap_chars = chunks[index]
+            if previous is None:
+                text = document
+            elif index == previous + 1:
+                text += " " + document[overlap_chars:]
+            else:
+                text += " ... " + document
+            previous = index
+        passage["text"] = text
+        merged.append(passage)
+
+    return merged
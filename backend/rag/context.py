@@ -0,0 +1,61 @@
+from typing import Any, Dict, List
+
+from .chunking import split_sentences
+from .tokens import estimate_tokens
+
+
+def trim_to_tokens(text: str, max_tokens: int) -> str:
+    """Shorten text to its leading whole sentences that fit a token budget.
+
+    Args:
+        text: Text to shorten
+        max_tokens: Maximum estimated tokens
+
+    Returns:
+        The longest prefix of whole sentences within the budget, possibly empty
+    """
+    kept = []
+    for sentence in split_sentences(text):
+        if estimate_tokens(" ".join(kept + [sentence])) > max_tokens:
+            break
+        kept.append(sentence)
+    return " ".join(kept)
+
+
+def pack_passages(passages: List[Dict[str, Any]], budget: int,
+                  min_tokens: int = 32) -> List[Dict[str, Any]]:
+    """Fit passages into a token budget, in order.
+
+    Each passage costs the tokens of its title and text. Passages that fit
+    are kept whole; one that does not is trimmed at a sentence boundary to
+    the remaining budget if at least min_tokens of its text survive,
+    otherwise skipped in favour of later, shorter passages.
+
+    Args:
+        passages: Passages from merge_search_results, best first
+        budget: Maximum estimated tokens of context
+        min_tokens: Smallest trimmed passage worth sending
+
+    Returns:
+        Passages that fit the budget; trimmed ones are copies
+    """
+    packed = []
+    remaining = budget
+
+    for passage in passages:
+        title_tokens = estimate_tokens(passage["metadata"].get("title", ""))
+        cost = title_tokens + estimate_tokens(passage["text"])
+        if cost <= remaining:
+            packed.append(passage)
+            remaining -= cost
+            continue
+
+        available = remaining - title_tokens
+        if available < min_tokens:
+            continue
+        trimmed = trim_to_tokens(passage["text"], available)
+        if estimate_tokens(trimmed) >= min_tokens:
+            packed.append({**passage, "text": trimmed})
+            remaining -= title_tokens + estimate_tokens(trimmed)
+
+    return packed
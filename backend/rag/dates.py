@@ -0,0 +1,35 @@
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+
+def parse_published(value: str) -> Optional[float]:
+    """Parse a feed publication date into a UNIX timestamp.
+    
+    Accepts RFC 822 dates as used by RSS and ISO 8601 dates as used by Atom.
+    Dates without a timezone are assumed to be UTC.
+    
+    Args:
+        value: Date string
+        
+    Returns:
+        Seconds since the epoch, or None if the date cannot be parsed
+    """
+    if not value:
+        return None
+    
+    value = value.strip()
+    parsed = None
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        try:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    
+    if parsed is None:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
@@ -0,0 +1,300 @@
+import base64
+import re
+import threading
+import zlib
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from config import DEDUPE_INDEX_PATH, DEDUPE_NUM_PERM, DEDUPE_BANDS, DEDUPE_THRESHOLD
+
+from .append_log import AppendLog
+
+# Mersenne prime used by the universal hash family
+_PRIME = (1 << 31) - 1
+
+
+class DuplicateDetector:
+    """Cluster near-duplicate articles with MinHash and LSH banding.
+
+    Each article is reduced to the set of its word shingles and summarised
+    by a MinHash signature, whose agreement rate with another signature
+    estimates the Jaccard similarity of the two shingle sets. Signatures
+    are split into bands, and articles sharing any band are compared; an
+    article whose estimated similarity to an existing canonical article
+    reaches the threshold joins that article's cluster instead of starting
+    its own.
+
+    Assignments are persisted as an append-only JSON Lines log under a
+    file lock, and records written by other processes are applied before
+    each batch, so the API and the ingestion daemon agree on clusters.
+    Articles that are no longer indexed are forgotten with remove(), which
+    logs a tombstone; once superseded records outnumber live ones the log
+    is rewritten without them, so removed articles leave the LSH bands for
+    good.
+    """
+
+    def __init__(self, path: str, num_perm: int = 128, bands: int = 16,
+                 threshold: float = 0.8, shingle_size: int = 5, seed: int = 1):
+        """Initialize the detector.
+
+        Args:
+            path: Path of the JSON Lines log
+            num_perm: Number of hash functions in a signature
+            bands: Number of LSH bands; must divide num_perm
+            threshold: Minimum estimated Jaccard similarity of duplicates
+            shingle_size: Words per shingle
+            seed: Seed of the hash functions; changing it invalidates the log
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+
+        self.path = path
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _PRIME, num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _PRIME, num_perm, dtype=np.uint64)
+        self._lock = threading.RLock()
+        self._log = AppendLog(path)
+
+        self._reset()
+        self.refresh()
+
+    def signature(self, text: str) -> np.ndarray:
+        """Compute the MinHash signature of a text.
+
+        Args:
+            text: Article text
+
+        Returns:
+            Array of num_perm 32-bit minimum hash values
+        """
+        words = re.findall(r"\w+", text.lower())
+        size = min(self.shingle_size, len(words)) or 1
+        shingles = {" ".join(words[i:i + size]) for i in range(max(len(words) - size + 1, 1))}
+        hashes = np.fromiter(
+            (zlib.crc32(shingle.encode("utf-8")) & _PRIME for shingle in shingles),
+            dtype=np.uint64,
+            count=len(shingles)
+        )
+        # (a * x + b) mod p for every hash function and shingle at once
+        permuted = (np.outer(self._a, hashes) + self._b[:, None]) % _PRIME
+        return permuted.min(axis=1).astype(np.uint32)
+
+    def assign(self, articles: List[Tuple[str, Dict[str, Any]]]) -> Dict[str, str]:
+        """Assign articles to clusters, creating clusters for new stories.
+
+        Articles seen before keep their cluster. Articles in the same batch
+        can cluster with each other.
+
+        Args:
+            articles: (article ID, article) tuples
+
+        Returns:
+            Mapping of each article ID to the ID of its canonical article
+        """
+        assignments = {}
+        with self._lock, self._log.lock():
+            self._refresh_locked()
+            records = []
+            for aid, article in articles:
+                if aid in self._canonical_of:
+                    assignments[aid] = self._canonical_of[aid]
+                    continue
+
+                signature = self.signature(f"{article.get('title', '')} {article.get('content', '')}")
+                canonical = self._best_match(signature)
+                record = {
+                    "id": aid,
+                    "canonical": canonical or aid,
+                    "source": article.get("source", ""),
+                    "url": article.get("url", ""),
+                    "title": article.get("title", "")
+                }
+                if canonical is None:
+                    record["signature"] = base64.b64encode(signature.tobytes()).decode("ascii")
+                records.append(record)
+                self._apply(record, signature=signature)
+                assignments[aid] = record["canonical"]
+
+            # Already applied above, so the log skips replaying them
+            self._log.append(records, replayed=True)
+        return assignments
+
+    def remove(self, ids: List[str]) -> List[Dict[str, str]]:
+        """Forget articles, e.g. ones pruned from the index.
+
+        Removing a canonical article dissolves its cluster: the other
+        members are forgotten as well and returned, so the caller can
+        assign them again and one of them becomes the new canonical
+        article.
+
+        Args:
+            ids: Article IDs
+
+        Returns:
+            Members of dissolved clusters that were not removed themselves,
+            as dictionaries with "id", "source", "url" and "title"
+        """
+        with self._lock, self._log.lock():
+            self._refresh_locked()
+            ids = [aid for aid in dict.fromkeys(ids) if aid in self._canonical_of]
+            removed = set(ids)
+            orphans = [
+                member
+                for aid in ids if self._canonical_of[aid] == aid
+                for member in self._members.get(aid, [])
+                if member["id"] not in removed
+            ]
+
+            records = [{"id": aid, "removed": True} for aid in ids + [m["id"] for m in orphans]]
+            for record in records:
+                self._apply(record)
+            # Already applied above, so the log skips replaying them
+            self._log.append(records, replayed=True)
+
+            if self._records > 2 * len(self._canonical_of):
+                self._compact_locked()
+        return orphans
+
+    def compact(self) -> int:
+        """Rewrite the log keeping only the current assignment of each article.
+
+        Returns:
+            Number of superseded records removed
+        """
+        with self._lock, self._log.lock():
+            return self._compact_locked()
+
+    def alternates(self, canonical: str) -> List[Dict[str, str]]:
+        """Get the other articles in a canonical article's cluster.
+
+        Args:
+            canonical: ID of the canonical article
+
+        Returns:
+            List of dictionaries with "id", "source", "url" and "title"
+        """
+        with self._lock:
+            return list(self._members.get(canonical, []))
+
+    def stats(self) -> Dict[str, int]:
+        """Get clustering counters.
+
+        Returns:
+            Dictionary with articles seen and distinct clusters
+        """
+        self.refresh()
+        with self._lock:
+            return {"articles": len(self._canonical_of), "clusters": len(self._signatures)}
+
+    def refresh(self):
+        """Apply log records written since the last refresh, by any process."""
+        with self._lock:
+            self._refresh_locked()
+
+    def _best_match(self, signature: np.ndarray):
+        """Find the most similar canonical article above the threshold."""
+        candidates = set()
+        for key, bucket in self._bands(signature):
+            candidates.update(bucket.get(key, ()))
+
+        best, best_similarity = None, self.threshold
+        for candidate in candidates:
+            similarity = float(np.mean(self._signatures[candidate] == signature))
+            if similarity >= best_similarity:
+                best, best_similarity = candidate, similarity
+        return best
+
+    def _compact_locked(self) -> int:
+        self._refresh_locked()
+        records = []
+        for canonical, signature in self._signatures.items():
+            records.append({
+                "id": canonical,
+                "canonical": canonical,
+                **self._details[canonical],
+                "signature": base64.b64encode(signature.tobytes()).decode("ascii")
+            })
+            for member in self._members.get(canonical, []):
+                records.append({**member, "canonical": canonical})
+
+        removed = self._records - len(records)
+        self._log.rewrite(records)
+        self._refresh_locked()
+        return removed
+
+    def _apply(self, record: Dict[str, Any], offset: int = 0, signature: np.ndarray = None):
+        self._records += 1
+        aid = record["id"]
+        if record.get("removed"):
+            self._forget(aid)
+            return
+
+        canonical = record["canonical"]
+        self._canonical_of[aid] = canonical
+        if aid != canonical:
+            self._members.setdefault(canonical, []).append({
+                key: record.get(key, "") for key in ("id", "source", "url", "title")
+            })
+            return
+
+        if signature is None:
+            signature = np.frombuffer(base64.b64decode(record["signature"]), dtype=np.uint32)
+        self._signatures[aid] = signature
+        self._details[aid] = {key: record.get(key, "") for key in ("source", "url", "title")}
+        for key, bucket in self._bands(signature):
+            bucket.setdefault(key, []).append(aid)
+
+    def _forget(self, aid: str):
+        """Drop an article from its cluster, and a canonical article from the bands."""
+        canonical = self._canonical_of.pop(aid, None)
+        if canonical is None:
+            return
+        if canonical != aid:
+            members = self._members.get(canonical, [])
+            members[:] = [member for member in members if member["id"] != aid]
+            return
+
+        self._members.pop(aid, None)
+        self._details.pop(aid, None)
+        for key, bucket in self._bands(self._signatures.pop(aid)):
+            bucket[key].remove(aid)
+            if not bucket[key]:
+                del bucket[key]
+
+    def _bands(self, signature: np.ndarray):
+        """Yield the (band key, bucket) of each band of a signature."""
+        for band in range(self.bands):
+            yield signature[band * self.rows:(band + 1) * self.rows].tobytes(), self._buckets[band]
+
+    def _refresh_locked(self):
+        self._log.replay(self._apply, self._reset)
+
+    def _reset(self):
+        self._signatures = {}
+        self._buckets = [{} for _ in range(self.bands)]
+        self._canonical_of = {}
+        self._members = {}
+        self._details = {}
+        # Records applied, live or superseded
+        self._records = 0
+
+
+def create_duplicate_detector() -> DuplicateDetector:
+    """Create a detector from the DEDUPE_* settings.
+
+    Returns:
+        DuplicateDetector backed by DEDUPE_INDEX_PATH
+    """
+    return DuplicateDetector(
+        DEDUPE_INDEX_PATH,
+        num_perm=DEDUPE_NUM_PERM,
+        bands=DEDUPE_BANDS,
+        threshold=DEDUPE_THRESHOLD
+    )
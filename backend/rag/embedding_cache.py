@@ -0,0 +1,220 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCache:
+    """Content-addressed embedding cache.
+
+    Embeddings are keyed by a hash of the model name and the normalized
+    text. Lookups go through a bounded in-memory LRU tier first and fall
+    back to a SQLite store on disk, so vectors survive restarts.
+
+    The tiers have separate locks, so an in-memory lookup never waits for
+    a disk read or write on another thread. Writes to disk can be handed
+    to a background writer thread, which keeps them off latency-sensitive
+    callers such as the event loop.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_memory_items: int = 10000):
+        """Initialize the embedding cache.
+
+        Args:
+            path: Path of the on-disk SQLite store. If None, only the
+                  in-memory tier is used.
+            max_memory_items: Maximum number of vectors kept in memory
+        """
+        self.path = path
+        self.max_memory_items = max_memory_items
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._disk_lock = threading.Lock()
+        self._writer = None
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+            )
+            self._conn.commit()
+            # One thread, so background writes land in order
+            self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedding-cache")
+
+    @property
+    def persistent(self) -> bool:
+        """Whether the cache has a disk tier."""
+        return self._conn is not None
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Normalize text so trivially different inputs share a cache entry.
+
+        Args:
+            text: Raw text
+
+        Returns:
+            NFC-normalized text with collapsed whitespace
+        """
+        return " ".join(unicodedata.normalize("NFC", text).split())
+
+    @staticmethod
+    def make_key(model_name: str, normalized_text: str) -> str:
+        """Build the cache key for a model/text pair.
+
+        Args:
+            model_name: Name of the embedding model
+            normalized_text: Text already passed through normalize()
+
+        Returns:
+            Hex digest identifying the embedding
+        """
+        digest = hashlib.sha256()
+        digest.update(model_name.encode("utf-8"))
+        digest.update(b"\x00")
+        digest.update(normalized_text.encode("utf-8"))
+        return digest.hexdigest()
+
+    def get_many(self, keys: List[str], memory_only: bool = False) -> Dict[str, np.ndarray]:
+        """Look up several keys at once.
+
+        Args:
+            keys: Cache keys
+            memory_only: Skip the disk tier. Keys not found are then not
+                         counted as misses, so they can be looked up again
+                         with a full get_many.
+
+        Returns:
+            Mapping of the keys that were found to their embeddings
+        """
+        found = {}
+        missing = []
+
+        with self._lock:
+            for key in keys:
+                if key in found:
+                    continue
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vector
+                    self.hits += 1
+                else:
+                    missing.append(key)
+
+        if memory_only and self._conn is not None:
+            return found
+
+        on_disk = {}
+        if missing and self._conn is not None:
+            unique_missing = list(dict.fromkeys(missing))
+            with self._disk_lock:
+                # Stay below SQLite's bound-parameter limit
+                for start in range(0, len(unique_missing), 500):
+                    batch = unique_missing[start:start + 500]
+                    placeholders = ",".join("?" for _ in batch)
+                    rows = self._conn.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                        batch
+                    ).fetchall()
+                    for key, blob in rows:
+                        on_disk[key] = np.frombuffer(blob, dtype=np.float64).copy()
+
+        with self._lock:
+            for key, vector in on_disk.items():
+                self._remember(key, vector)
+            self.disk_hits += sum(1 for key in missing if key in on_disk)
+            self.misses += sum(1 for key in missing if key not in on_disk)
+
+        found.update(on_disk)
+        return found
+
+    def put_many(self, items: Dict[str, np.ndarray], background: bool = False):
+        """Store embeddings in both tiers.
+
+        Args:
+            items: Mapping of cache keys to embeddings
+            background: Return once the in-memory tier is updated and
+                        write to disk on the background writer thread
+        """
+        if not items:
+            return
+
+        with self._lock:
+            for key, vector in items.items():
+                self._remember(key, vector)
+
+        if self._conn is None:
+            return
+        rows = [
+            (key, np.asarray(vector, dtype=np.float64).tobytes())
+            for key, vector in items.items()
+        ]
+        if background:
+            self._writer.submit(self._write, rows).add_done_callback(_log_write_error)
+        else:
+            self._write(rows)
+
+    def _write(self, rows: List[tuple]):
+        """Write (key, blob) rows to the disk tier."""
+        with self._disk_lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)", rows
+            )
+            self._conn.commit()
+
+    def _remember(self, key: str, vector: np.ndarray):
+        """Insert into the in-memory LRU tier, evicting if needed.
+
+        Must be called with the lock held.
+        """
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        """Get cache counters.
+
+        Returns:
+            Dictionary of hit/miss/eviction counters and tier sizes
+        """
+        disk_items = 0
+        if self._conn is not None:
+            with self._disk_lock:
+                disk_items = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+        with self._lock:
+            return {
+                "memory_hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "memory_items": len(self._memory),
+                "memory_capacity": self.max_memory_items,
+                "disk_items": disk_items
+            }
+
+
+def _log_write_error(future):
+    if future.exception() is not None:
+        logger.warning("Failed to write embeddings to the disk cache: %s", future.exception())
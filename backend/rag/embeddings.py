@@ -1,18 +1,37 @@
 import os
+import json
+import asyncio
+import httpx
 import requests
 import numpy as np
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from metrics import CACHE_EVENTS
+from config import (
+    EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_SIZE, JINA_API_URL,
+    EMBEDDING_BATCH_SIZE, EMBEDDING_BATCH_MAX_BYTES, EMBEDDING_MAX_WORKERS,
+    EMBEDDING_MAX_RETRIES, EMBEDDING_TIMEOUT, QUERY_BATCH_WINDOW_MS, QUERY_BATCH_MAX_SIZE
+)
+from .embedding_cache import EmbeddingCache
+from .batching import EmbeddingBatcher, QueryCoalescer, TransientEmbeddingError
 
 # Load environment variables
 load_dotenv()
 
 class EmbeddingModel:
-    def __init__(self, model_name="jina-embeddings-v2-base-en"):
+    def __init__(self, model_name="jina-embeddings-v2-base-en", cache=None,
+                 async_limit=None, sync_limit=None):
         """Initialize the Jina embedding model.
         
         Args:
             model_name: Name of the embedding model to use.
                        Default is "jina-embeddings-v2-base-en"
+            cache: EmbeddingCache to use. Defaults to one built from
+                   EMBEDDING_CACHE_PATH and EMBEDDING_CACHE_SIZE.
+            async_limit: Optional factory of a context manager held around
+                         each async request, bounding request-path calls
+            sync_limit: Optional factory of a context manager held around
+                        each blocking request, bounding ingestion calls
         """
         self.model_name = model_name
         # Get API key from environment variable
@@ -21,7 +40,49 @@ class EmbeddingModel:
             raise ValueError("JINA_API_KEY not found in environment variables")
         
         # API endpoint
-        self.api_url = "https://api.jina.ai/v1/embeddings"
+        self.api_url = JINA_API_URL
+        
+        # Pooled keep-alive connections, one per concurrent batch
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=EMBEDDING_MAX_WORKERS,
+            pool_maxsize=EMBEDDING_MAX_WORKERS
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        
+        # Splits large requests into bounded, concurrent, retried batches
+        self.batcher = EmbeddingBatcher(
+            send_batch=self._post_batch,
+            asend_batch=self._apost_batch,
+            max_batch_size=EMBEDDING_BATCH_SIZE,
+            max_batch_bytes=EMBEDDING_BATCH_MAX_BYTES,
+            max_workers=EMBEDDING_MAX_WORKERS,
+            max_retries=EMBEDDING_MAX_RETRIES,
+            async_limit=async_limit,
+            sync_limit=sync_limit
+        )
+        
+        # Concurrent chat queries share embedding requests
+        self.query_coalescer = None
+        if QUERY_BATCH_WINDOW_MS > 0:
+            self.query_coalescer = QueryCoalescer(
+                self.batcher.aembed,
+                window=QUERY_BATCH_WINDOW_MS / 1000,
+                max_batch_size=QUERY_BATCH_MAX_SIZE
+            )
+        
+        # Async HTTP client for the request path, created on first use
+        # so it binds to the running event loop
+        self._async_client = None
+        
+        # Content-addressed cache so unchanged texts are never re-embedded
+        if cache is None:
+            cache = EmbeddingCache(
+                path=EMBEDDING_CACHE_PATH or None,
+                max_memory_items=EMBEDDING_CACHE_SIZE
+            )
+        self.cache = cache
         
     def embed_query(self, text):
         """Embed a single query text using Jina AI API.
@@ -46,6 +107,145 @@ class EmbeddingModel:
         return self._get_embeddings(documents)
     
     def _get_embeddings(self, texts):
+        """Get embeddings, serving cached vectors and fetching only misses.
+        
+        Args:
+            texts: List of texts to embed (a single string is also accepted)
+            
+        Returns:
+            List of embeddings as numpy arrays, in input order
+        """
+        keys, found, missing = self._lookup(texts)
+        
+        if missing:
+            fetched = self._request_embeddings(list(missing.values()))
+            self._store(found, missing, fetched)
+        
+        return [found[key] for key in keys]
+    
+    async def aembed_query(self, text):
+        """Embed a single query text without blocking the event loop.
+        
+        Cache misses are batched with other concurrent queries when query
+        coalescing is enabled.
+        
+        Args:
+            text: The text to embed
+            
+        Returns:
+            A numpy array containing the embedding
+        """
+        if self.query_coalescer is None:
+            return (await self.aget_embeddings([text]))[0]
+        
+        keys, found, missing = await self._alookup([text])
+        if missing:
+            fetched = [await self.query_coalescer.embed(text) for text in missing.values()]
+            self._store(found, missing, fetched, background=True)
+        return found[keys[0]]
+    
+    async def aget_embeddings(self, texts):
+        """Async counterpart of _get_embeddings.
+        
+        Args:
+            texts: List of texts to embed (a single string is also accepted)
+            
+        Returns:
+            List of embeddings as numpy arrays, in input order
+        """
+        keys, found, missing = await self._alookup(texts)
+        
+        if missing:
+            fetched = await self.batcher.aembed(list(missing.values()))
+            self._store(found, missing, fetched, background=True)
+        
+        return [found[key] for key in keys]
+    
+    def _lookup(self, texts):
+        """Resolve texts against the cache.
+        
+        Args:
+            texts: List of texts (a single string is also accepted)
+            
+        Returns:
+            Tuple of (cache keys in input order, cached embeddings by key,
+            distinct missing texts by key)
+        """
+        keys, normalized = self._keys(texts)
+        found = self.cache.get_many(keys)
+        return keys, found, self._missing(keys, normalized, found)
+    
+    async def _alookup(self, texts):
+        """Async counterpart of _lookup.
+        
+        Only the in-memory tier is read on the event loop; keys it does
+        not hold are looked up on disk from a worker thread.
+        
+        Args:
+            texts: List of texts (a single string is also accepted)
+            
+        Returns:
+            Same as _lookup
+        """
+        keys, normalized = self._keys(texts)
+        found = self.cache.get_many(keys, memory_only=True)
+        rest = [key for key in dict.fromkeys(keys) if key not in found]
+        if rest and self.cache.persistent:
+            found.update(await asyncio.to_thread(self.cache.get_many, rest))
+        return keys, found, self._missing(keys, normalized, found)
+    
+    def _keys(self, texts):
+        """Normalize texts and derive their cache keys.
+        
+        Args:
+            texts: List of texts (a single string is also accepted)
+            
+        Returns:
+            Tuple of (cache keys, normalized texts), in input order
+        """
+        if isinstance(texts, str):
+            texts = [texts]
+        normalized = [EmbeddingCache.normalize(text) for text in texts]
+        return [EmbeddingCache.make_key(self.model_name, text) for text in normalized], normalized
+    
+    def _missing(self, keys, normalized, found):
+        """Count cache hits and collect the texts still to embed.
+        
+        Args:
+            keys: Cache keys in input order
+            normalized: Normalized texts in input order
+            found: Cached embeddings by key
+            
+        Returns:
+            Distinct missing texts by key
+        """
+        hits = sum(key in found for key in keys)
+        CACHE_EVENTS.labels("embedding", "hit").inc(hits)
+        CACHE_EVENTS.labels("embedding", "miss").inc(len(keys) - hits)
+        
+        # Embed each distinct missing text once
+        missing = {}
+        for key, text in zip(keys, normalized):
+            if key not in found and key not in missing:
+                missing[key] = text
+        
+        return missing
+    
+    def _store(self, found, missing, fetched, background=False):
+        """Cache freshly fetched embeddings and merge them into found.
+        
+        Args:
+            found: Cached embeddings by key, updated in place
+            missing: Missing texts by key, in request order
+            fetched: Embeddings returned for the missing texts
+            background: Write to the disk tier on the cache's writer
+                        thread instead of before returning
+        """
+        new_items = dict(zip(missing.keys(), fetched))
+        self.cache.put_many(new_items, background=background)
+        found.update(new_items)
+    
+    def _request_embeddings(self, texts):
         """Get embeddings from Jina AI API.
         
         Args:
@@ -54,24 +254,104 @@ class EmbeddingModel:
         Returns:
             List of embeddings as numpy arrays
         """
-        headers = {
+        return self.batcher.embed(texts)
+    
+    def _post_batch(self, texts):
+        """Send a single batch of texts to Jina AI API.
+        
+        Args:
+            texts: List of texts to embed
+            
+        Returns:
+            List of embeddings as numpy arrays
+            
+        Raises:
+            TransientEmbeddingError: On rate limiting, server errors and
+                                     connection failures
+        """
+        try:
+            response = self.session.post(
+                self.api_url,
+                headers=self._headers(),
+                json=self._payload(texts),
+                timeout=EMBEDDING_TIMEOUT
+            )
+        except (requests.ConnectionError, requests.Timeout) as e:
+            raise TransientEmbeddingError(f"Error reaching Jina AI API: {e}")
+        
+        return self._parse_response(response.status_code, response.text, response.headers)
+    
+    async def _apost_batch(self, texts):
+        """Async counterpart of _post_batch using a pooled httpx client.
+        
+        Args:
+            texts: List of texts to embed
+            
+        Returns:
+            List of embeddings as numpy arrays
+        """
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(
+                timeout=EMBEDDING_TIMEOUT,
+                limits=httpx.Limits(max_keepalive_connections=EMBEDDING_MAX_WORKERS * 4)
+            )
+        
+        try:
+            response = await self._async_client.post(
+                self.api_url, headers=self._headers(), json=self._payload(texts)
+            )
+        except httpx.TransportError as e:
+            raise TransientEmbeddingError(f"Error reaching Jina AI API: {e}")
+        
+        return self._parse_response(response.status_code, response.text, response.headers)
+    
+    async def aclose(self):
+        """Close the pooled async HTTP client."""
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+    
+    def _headers(self):
+        """Build request headers for Jina AI API."""
+        return {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
-        
-        payload = {
+    
+    def _payload(self, texts):
+        """Build the request body for Jina AI API."""
+        return {
             "input": texts,
             "model": self.model_name
         }
+    
+    def _parse_response(self, status_code, text, headers):
+        """Turn a Jina AI API response into embeddings.
         
-        response = requests.post(self.api_url, headers=headers, json=payload)
+        Args:
+            status_code: HTTP status code
+            text: Response body
+            headers: Response headers
+            
+        Returns:
+            List of embeddings as numpy arrays
+            
+        Raises:
+            TransientEmbeddingError: On rate limiting and server errors
+        """
+        if status_code == 429 or status_code >= 500:
+            raise TransientEmbeddingError(
+                f"Error from Jina AI API ({status_code}): {text}",
+                retry_after=_parse_retry_after(headers.get("Retry-After"))
+            )
         
-        if response.status_code != 200:
-            raise Exception(f"Error from Jina AI API: {response.text}")
+        if status_code != 200:
+            raise Exception(f"Error from Jina AI API: {text}")
         
         # Parse response
-        result = response.json()
-        embeddings = [np.array(data["embedding"]) for data in result["data"]]
+        result = json.loads(text)
+        data = sorted(result["data"], key=lambda item: item.get("index", 0))
+        embeddings = [np.array(item["embedding"]) for item in data]
         
         return embeddings
     
@@ -85,4 +365,19 @@ class EmbeddingModel:
         Returns:
             Cosine similarity score between 0 and 1
         """
-        return np.dot(embedding1, embedding2) / (np.linalg.norm(embedding1) * np.linalg.norm(embedding2))
\ No newline at end of file
+        return np.dot(embedding1, embedding2) / (np.linalg.norm(embedding1) * np.linalg.norm(embedding2))
+
+
+def _parse_retry_after(value):
+    """Parse a Retry-After header given in seconds.
+    
+    Args:
+        value: Header value or None
+        
+    Returns:
+        Delay in seconds, or None if absent or not numeric
+    """
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
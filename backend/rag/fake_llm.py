@@ -0,0 +1,69 @@
+import asyncio
+import time
+from typing import AsyncIterator, Dict, List
+from config import FAKE_LLM_LATENCY, FAKE_LLM_TOKEN_DELAY
+
+class FakeLLMService:
+    """Offline stand-in for LLMService.
+    
+    Produces a deterministic answer from the query and contexts and streams
+    it word by word with configurable delays, so the chat and streaming
+    paths can be exercised without a Gemini API key.
+    """
+    
+    def __init__(self, latency: float = FAKE_LLM_LATENCY, 
+                 token_delay: float = FAKE_LLM_TOKEN_DELAY):
+        """Initialize the fake LLM service.
+        
+        Args:
+            latency: Seconds before the first token
+            token_delay: Seconds between subsequent tokens
+        """
+        self.latency = latency
+        self.token_delay = token_delay
+    
+    def generate_response(self, query: str, contexts: List[str], 
+                          chat_history: List[Dict[str, str]] = None) -> str:
+        """Generate a response based on query and contexts.
+        
+        Args:
+            query: User query
+            contexts: List of context passages
+            chat_history: List of chat history messages
+            
+        Returns:
+            Fake response
+        """
+        tokens = self._tokens(query, contexts)
+        time.sleep(self.latency + self.token_delay * max(len(tokens) - 1, 0))
+        return "".join(tokens)
+    
+    async def agenerate_response(self, query: str, contexts: List[str], 
+                                 chat_history: List[Dict[str, str]] = None) -> str:
+        """Async counterpart of generate_response."""
+        chunks = [chunk async for chunk in self.astream_response(query, contexts, chat_history)]
+        return "".join(chunks)
+    
+    async def astream_response(self, query: str, contexts: List[str], 
+                               chat_history: List[Dict[str, str]] = None) -> AsyncIterator[str]:
+        """Stream the response one word at a time.
+        
+        Args:
+            query: User query
+            contexts: List of context passages
+            chat_history: List of chat history messages
+            
+        Yields:
+            Response text chunks
+        """
+        await asyncio.sleep(self.latency)
+        for index, token in enumerate(self._tokens(query, contexts)):
+            if index:
+                await asyncio.sleep(self.token_delay)
+            yield token
+    
+    def _tokens(self, query: str, contexts: List[str]) -> List[str]:
+        """Build the fake answer split into word tokens."""
+        answer = f"Based on {len(contexts)} retrieved articles, here is what I found about: {query}"
+        words = answer.split(" ")
+        return [words[0]] + [" " + word for word in words[1:]]
@@ -0,0 +1,251 @@
+import heapq
+import json
+import logging
+import os
+import random
+import time
+from typing import Any, Dict, List, Optional
+
+from .article_ingestion import ArticleIngestion
+from .dates import parse_published
+from .fetcher import FetchResult
+
+# Number of entry GUIDs remembered per feed to recognise entries already seen
+MAX_SEEN_GUIDS = 500
+
+logger = logging.getLogger(__name__)
+
+
+def load_feed_registry(path: str, default_interval: int) -> List[Dict[str, Any]]:
+    """Load the list of feeds to poll.
+
+    The registry is a JSON list whose items are either a feed URL or an
+    object with "url" and optional "interval" (seconds) and
+    "max_interval" (seconds).
+
+    Args:
+        path: Path of the registry file
+        default_interval: Poll interval for feeds that do not set one
+
+    Returns:
+        List of feed dictionaries with "url", "interval" and "max_interval"
+    """
+    if not os.path.exists(path):
+        return []
+
+    with open(path, 'r') as f:
+        entries = json.load(f)
+
+    feeds = []
+    for entry in entries:
+        if isinstance(entry, str):
+            entry = {"url": entry}
+        interval = int(entry.get("interval", default_interval))
+        feeds.append({
+            "url": entry["url"],
+            "interval": interval,
+            "max_interval": int(entry.get("max_interval", interval * 8))
+        })
+    return feeds
+
+
+class FeedScheduler:
+    """Poll many RSS feeds on per-feed schedules.
+
+    Each feed is polled every "interval" seconds, with jitter so feeds do
+    not synchronise. A feed that returns nothing new has its interval
+    stretched by the backoff factor up to "max_interval", and an interval
+    snaps back as soon as new entries appear. Failures back off the same way.
+
+    Per-feed state (validators, seen GUIDs, current interval and stats) is
+    persisted to a JSON file so restarts only process new entries.
+    """
+
+    def __init__(self, ingestion: ArticleIngestion, feeds: List[Dict[str, Any]],
+                 state_path: str, backoff_factor: float = 1.5, jitter: float = 0.1):
+        """Initialize the scheduler.
+
+        Args:
+            ingestion: Article ingestion service used to fetch and index feeds
+            feeds: Feeds from load_feed_registry
+            state_path: Path of the JSON state file
+            backoff_factor: Interval multiplier after a poll with nothing new
+            jitter: Fraction of the interval added or removed at random
+        """
+        self.ingestion = ingestion
+        self.feeds = {feed["url"]: feed for feed in feeds}
+        self.state_path = state_path
+        self.backoff_factor = backoff_factor
+        self.jitter = jitter
+        self.state = self._load_state()
+        self._queue = []
+
+        now = time.time()
+        for url, feed in self.feeds.items():
+            state = self.state.setdefault(url, self._new_state(feed))
+
+            # Let the fetcher send the persisted validators
+            if state.get("etag") or state.get("last_modified"):
+                self.ingestion.fetcher.remember(
+                    url, FetchResult(url, 200, etag=state.get("etag"),
+                                     last_modified=state.get("last_modified"))
+                )
+
+            heapq.heappush(self._queue, (max(state.get("next_poll_at", now), now), url))
+
+    def run_forever(self):
+        """Poll feeds as they become due until interrupted."""
+        while True:
+            self.run_pending()
+            if self._queue:
+                time.sleep(max(self._queue[0][0] - time.time(), 0))
+            else:
+                time.sleep(60)
+
+    def run_pending(self) -> int:
+        """Poll every feed that is due now.
+
+        Returns:
+            Number of feeds polled
+        """
+        polled = 0
+        while self._queue and self._queue[0][0] <= time.time():
+            _, url = heapq.heappop(self._queue)
+            self.poll(url)
+            heapq.heappush(self._queue, (self.state[url]["next_poll_at"], url))
+            polled += 1
+        return polled
+
+    def poll(self, url: str) -> int:
+        """Poll a single feed and index its new entries.
+
+        Args:
+            url: Feed URL
+
+        Returns:
+            Number of new entries indexed
+        """
+        feed = self.feeds[url]
+        state = self.state[url]
+        started = time.time()
+        state["polls"] += 1
+        state["last_poll_at"] = started
+
+        try:
+            articles = self.ingestion.fetch_feed(url, skip_guids=set(state["seen_guids"]))
+            indexed = self.ingestion.ingest_articles(articles) if articles else 0
+        except Exception as e:
+            logger.warning("Error polling feed %s: %s", url, e)
+            state["errors"] += 1
+            state["last_error"] = str(e)
+            self._reschedule(feed, state, changed=False)
+            self._save_state()
+            return 0
+
+        finished = time.time()
+        new_articles = articles or []
+        state["last_success_at"] = finished
+        state["last_duration"] = finished - started
+        state["last_new_entries"] = len(new_articles)
+        state["new_entries_total"] += len(new_articles)
+        state["indexed_total"] += indexed
+        state["last_throughput"] = len(new_articles) / max(finished - started, 1e-6)
+        state["last_error"] = None
+        logger.info("Polled feed %s in %.1fs: %d new entries, %d indexed",
+                    url, finished - started, len(new_articles), indexed)
+
+        if new_articles:
+            state["last_new_at"] = finished
+            state["seen_guids"] = (
+                state["seen_guids"] + [a["guid"] for a in new_articles]
+            )[-MAX_SEEN_GUIDS:]
+
+            # Delay between publication and indexing
+            lags = [
+                finished - published
+                for published in (parse_published(a.get("published", "")) for a in new_articles)
+                if published is not None
+            ]
+            if lags:
+                state["last_lag"] = sum(lags) / len(lags)
+
+        validators = self.ingestion.fetcher.validators(url)
+        state["etag"] = validators["etag"]
+        state["last_modified"] = validators["last_modified"]
+
+        self._reschedule(feed, state, changed=bool(new_articles))
+        self._save_state()
+        return indexed
+
+    def _reschedule(self, feed: Dict[str, Any], state: Dict[str, Any], changed: bool):
+        """Adapt the feed's interval and set its next poll time."""
+        if changed:
+            state["current_interval"] = feed["interval"]
+        else:
+            state["current_interval"] = min(
+                state["current_interval"] * self.backoff_factor, feed["max_interval"]
+            )
+        interval = state["current_interval"]
+        interval += random.uniform(-self.jitter, self.jitter) * interval
+        state["next_poll_at"] = time.time() + interval
+
+    def _new_state(self, feed: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "etag": None,
+            "last_modified": None,
+            "seen_guids": [],
+            "current_interval": feed["interval"],
+            "next_poll_at": 0,
+            "polls": 0,
+            "errors": 0,
+            "last_error": None,
+            "last_poll_at": None,
+            "last_success_at": None,
+            "last_new_at": None,
+            "last_duration": None,
+            "last_new_entries": 0,
+            "new_entries_total": 0,
+            "indexed_total": 0,
+            "last_throughput": None,
+            "last_lag": None
+        }
+
+    def _load_state(self) -> Dict[str, Dict[str, Any]]:
+        if not os.path.exists(self.state_path):
+            return {}
+        with open(self.state_path, 'r') as f:
+            return json.load(f)
+
+    def _save_state(self):
+        """Write the state file atomically so readers never see a partial file."""
+        directory = os.path.dirname(self.state_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, self.state_path)
+
+
+def read_feed_stats(state_path: str) -> Optional[Dict[str, Dict[str, Any]]]:
+    """Read per-feed stats written by a running scheduler.
+
+    Args:
+        state_path: Path of the scheduler's state file
+
+    Returns:
+        Mapping of feed URL to stats, or None if there is no state file
+    """
+    if not os.path.exists(state_path):
+        return None
+    with open(state_path, 'r') as f:
+        state = json.load(f)
+
+    now = time.time()
+    stats = {}
+    for url, feed_state in state.items():
+        feed_stats = {key: value for key, value in feed_state.items() if key != "seen_guids"}
+        last_success = feed_state.get("last_success_at")
+        feed_stats["seconds_since_success"] = now - last_success if last_success else None
+        stats[url] = feed_stats
+    return stats
@@ -0,0 +1,277 @@
+import logging
+import multiprocessing
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+import requests
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+def extract_article_text(html: str) -> str:
+    """Extract the readable text of an article page.
+
+    Runs in a worker process, so it must stay a module-level function.
+
+    Args:
+        html: Page HTML
+
+    Returns:
+        Text of the page's paragraphs
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+
+    # Extract main content (this is a simple implementation)
+    # For real use, you'd need more sophisticated extraction
+    paragraphs = soup.find_all('p')
+    return ' '.join([p.get_text() for p in paragraphs])
+
+
+class FetchResult:
+    """Outcome of a single HTTP fetch."""
+
+    def __init__(self, url: str, status: int, body: Optional[bytes] = None,
+                 etag: Optional[str] = None, last_modified: Optional[str] = None):
+        self.url = url
+        self.status = status
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+
+    @property
+    def not_modified(self) -> bool:
+        return self.status == 304
+
+
+class ContentFetcher:
+    """Concurrent HTTP fetcher for feeds and article pages.
+
+    Requests share a pooled keep-alive session and run on a bounded thread
+    pool with a per-host concurrency limit. Validators (ETag and
+    Last-Modified) and extracted page text are remembered in a bounded LRU
+    so repeat fetches become conditional GETs. HTML parsing runs in a
+    process pool so it never competes with the fetch threads for the GIL.
+    The pool's workers are spawned, not forked, because the pool is
+    created lazily from a worker thread of a multi-threaded process, and a
+    forked child could inherit a lock another thread held at fork time.
+    """
+
+    def __init__(self, max_workers: int = 16, per_host_limit: int = 4,
+                 timeout: float = 10, parse_workers: int = 2,
+                 cache_size: int = 2000, user_agent: str = "NewsChat/1.0"):
+        """Initialize the fetcher.
+
+        Args:
+            max_workers: Maximum concurrent requests overall
+            per_host_limit: Maximum concurrent requests to a single host
+            timeout: Timeout in seconds for a single request
+            parse_workers: Number of HTML parsing processes
+            cache_size: Number of URLs whose validators are remembered
+            user_agent: User-Agent header sent with every request
+        """
+        self.max_workers = max_workers
+        self.per_host_limit = per_host_limit
+        self.timeout = timeout
+        self.parse_workers = parse_workers
+        self.cache_size = cache_size
+
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = user_agent
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fetch")
+        self._parse_pool = None
+        self._host_limits = {}
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def fetch(self, url: str, timeout: Optional[float] = None) -> FetchResult:
+        """Fetch a URL, sending stored validators as a conditional GET.
+
+        Args:
+            url: URL to fetch
+            timeout: Time limit for waiting on the host's concurrency limit
+                     and the request together, defaults to the fetcher's
+                     timeout
+
+        Returns:
+            FetchResult; status 304 means the cached version is current
+
+        Raises:
+            TimeoutError: If no slot for the host frees up within timeout
+        """
+        timeout = timeout or self.timeout
+        headers = {}
+        cached = self._cached(url)
+        if cached:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        host_limit = self._host_limit(url)
+        started = time.monotonic()
+        if not host_limit.acquire(timeout=timeout):
+            raise TimeoutError(f"No connection slot for {urlsplit(url).netloc} within {timeout:.1f}s")
+        try:
+            response = self.session.get(
+                url, headers=headers, timeout=max(timeout - (time.monotonic() - started), 0.001)
+            )
+        finally:
+            host_limit.release()
+
+        result = FetchResult(
+            url,
+            response.status_code,
+            response.content if response.status_code == 200 else None,
+            response.headers.get("ETag"),
+            response.headers.get("Last-Modified")
+        )
+        if result.not_modified and cached:
+            result.etag = result.etag or cached.get("etag")
+            result.last_modified = result.last_modified or cached.get("last_modified")
+        return result
+
+    def remember(self, url: str, result: FetchResult, content: Optional[str] = None):
+        """Store a response's validators, and optionally its extracted text.
+
+        Args:
+            url: Fetched URL
+            result: Successful fetch result
+            content: Extracted content to reuse when the URL is not modified
+        """
+        if not (result.etag or result.last_modified):
+            return
+        with self._lock:
+            self._cache[url] = {
+                "etag": result.etag,
+                "last_modified": result.last_modified,
+                "content": content
+            }
+            self._cache.move_to_end(url)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def validators(self, url: str) -> Dict[str, Optional[str]]:
+        """Get the stored ETag and Last-Modified for a URL.
+
+        Args:
+            url: URL
+
+        Returns:
+            Dictionary with "etag" and "last_modified" (either may be None)
+        """
+        cached = self._cached(url) or {}
+        return {"etag": cached.get("etag"), "last_modified": cached.get("last_modified")}
+
+    def fetch_articles(self, urls: List[str], budget: float) -> Dict[str, str]:
+        """Fetch and extract article pages concurrently.
+
+        Pages still outstanding when the budget runs out are skipped, so
+        wall time is bounded by the budget rather than the sum of all
+        pages. Pages answered with 304 reuse the text extracted last time.
+
+        Args:
+            urls: Article URLs
+            budget: Overall time limit in seconds
+
+        Returns:
+            Mapping of URL to extracted text for the pages that succeeded
+        """
+        deadline = time.monotonic() + budget
+        contents = {}
+        fetches = {}
+        parses = {}
+
+        for url in dict.fromkeys(urls):
+            fetches[self._executor.submit(self._fetch_quietly, url, deadline)] = url
+
+        pending = set(fetches)
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                if result is None:
+                    continue
+                if result.not_modified:
+                    cached = self._cached(result.url)
+                    if cached and cached.get("content"):
+                        contents[result.url] = cached["content"]
+                elif result.status == 200:
+                    # Parse as soon as each page arrives
+                    html = result.body.decode("utf-8", errors="replace")
+                    parses[self._parser().submit(extract_article_text, html)] = result
+
+        for future in pending:
+            future.cancel()
+
+        remaining = max(deadline - time.monotonic(), 0)
+        done, not_done = wait(parses, timeout=remaining)
+        for future in not_done:
+            future.cancel()
+        for future in done:
+            result = parses[future]
+            try:
+                content = future.result()
+            except Exception as e:
+                logger.warning("Error parsing %s: %s", result.url, e)
+                continue
+            if content:
+                contents[result.url] = content
+                self.remember(result.url, result, content)
+
+        return contents
+
+    def _fetch_quietly(self, url: str, deadline: float) -> Optional[FetchResult]:
+        """Fetch within the remaining budget, logging instead of raising."""
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        try:
+            return self.fetch(url, timeout=min(self.timeout, remaining))
+        except Exception as e:
+            logger.warning("Error fetching %s: %s", url, e)
+            return None
+
+    def _cached(self, url: str) -> Optional[Dict[str, Optional[str]]]:
+        with self._lock:
+            entry = self._cache.get(url)
+            if entry is not None:
+                self._cache.move_to_end(url)
+            return entry
+
+    def _host_limit(self, url: str) -> threading.BoundedSemaphore:
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._host_limits:
+                self._host_limits[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return self._host_limits[host]
+
+    def close(self):
+        """Stop the parsing processes and fetch threads and close connections."""
+        with self._lock:
+            parse_pool, self._parse_pool = self._parse_pool, None
+        if parse_pool is not None:
+            parse_pool.shutdown(wait=True, cancel_futures=True)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
+
+    def _parser(self) -> ProcessPoolExecutor:
+        # Created on first use so importing the module never starts processes
+        with self._lock:
+            if self._parse_pool is None:
+                self._parse_pool = ProcessPoolExecutor(
+                    max_workers=self.parse_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._parse_pool
@@ -0,0 +1,81 @@
+from typing import Any, Dict, List, Optional
+
+_OPERATORS = {
+    "$eq": lambda value, arg: value == arg,
+    "$ne": lambda value, arg: value != arg,
+    "$gt": lambda value, arg: value is not None and value > arg,
+    "$gte": lambda value, arg: value is not None and value >= arg,
+    "$lt": lambda value, arg: value is not None and value < arg,
+    "$lte": lambda value, arg: value is not None and value <= arg,
+    "$in": lambda value, arg: value in arg,
+    "$nin": lambda value, arg: value not in arg,
+}
+
+
+def build_where(sources: Optional[List[str]] = None,
+                published_after: Optional[float] = None,
+                published_before: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """Build a metadata filter restricting retrieval by source and date.
+
+    Dates are matched against the "published_ts" chunk metadata. Articles
+    without a parseable date are stored with a timestamp of 0 and never
+    match a date range.
+
+    Args:
+        sources: Only match articles from these sources
+        published_after: Only match articles published at or after this timestamp
+        published_before: Only match articles published at or before this timestamp
+
+    Returns:
+        Chroma-style where filter, or None if no restriction applies
+    """
+    clauses = []
+    if sources:
+        clauses.append({"source": {"$in": list(sources)}})
+    if published_after is not None:
+        clauses.append({"published_ts": {"$gte": published_after}})
+    if published_before is not None:
+        clauses.append({"published_ts": {"$lte": published_before}})
+        if published_after is None:
+            clauses.append({"published_ts": {"$gt": 0}})
+
+    if not clauses:
+        return None
+    if len(clauses) == 1:
+        return clauses[0]
+    return {"$and": clauses}
+
+
+def matches_where(metadata: Dict[str, Any], where: Optional[Dict[str, Any]]) -> bool:
+    """Evaluate a Chroma-style metadata filter against one document.
+
+    Supports field equality, the comparison operators $eq, $ne, $gt, $gte,
+    $lt, $lte, $in and $nin, and the logical operators $and and $or.
+
+    Args:
+        metadata: Document metadata
+        where: Filter, or None to match everything
+
+    Returns:
+        True if the document matches
+    """
+    if not where:
+        return True
+
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(matches_where(metadata, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_where(metadata, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = metadata.get(key)
+            for operator, arg in condition.items():
+                if operator not in _OPERATORS:
+                    raise ValueError(f"Unsupported filter operator: {operator}")
+                if not _OPERATORS[operator](value, arg):
+                    return False
+        elif metadata.get(key) != condition:
+            return False
+    return True
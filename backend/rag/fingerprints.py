@@ -0,0 +1,34 @@
+import hashlib
+from typing import Any, Dict
+
+
+def article_id(article: Dict[str, Any]) -> str:
+    """Build a stable document ID for an article.
+
+    The URL identifies an article when it has one; otherwise the title and
+    content are hashed so the same article always maps to the same ID.
+
+    Args:
+        article: Article dictionary
+
+    Returns:
+        Deterministic document ID
+    """
+    url = (article.get("url") or "").strip()
+    if url:
+        basis = f"url:{url}"
+    else:
+        basis = f"text:{article.get('title', '')}\n\n{article.get('content', '')}"
+    return "doc_" + hashlib.sha1(basis.encode("utf-8")).hexdigest()
+
+
+def content_fingerprint(text: str) -> str:
+    """Fingerprint document content to detect changes between ingests.
+
+    Args:
+        text: Document text
+
+    Returns:
+        Hex digest of the text
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
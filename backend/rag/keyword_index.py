@@ -0,0 +1,248 @@
+import math
+import re
+import threading
+from array import array
+from collections import Counter
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from .append_log import AppendLog
+
+_TOKEN = re.compile(r"\w+(?:[&.]\w+)*")
+
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have he her his i in is it its of on or
+s she that the their they this to was were what when where which who will with
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase search terms.
+
+    Keeps joined tokens such as "s&p" and "u.s" intact and drops stopwords.
+
+    Args:
+        text: Text to tokenize
+
+    Returns:
+        List of terms in order of appearance
+    """
+    return [
+        token.rstrip(".")
+        for token in _TOKEN.findall(text.lower())
+        if token not in STOPWORDS
+    ]
+
+
+class KeywordIndex:
+    """Incremental BM25 inverted index.
+
+    Each term maps to a compact posting list: a typed array of internal
+    document numbers, ascending, and a parallel array of term frequencies.
+    Documents get a new number every time they are indexed, so postings
+    stay sorted by appending. Deleting or re-indexing a document only
+    marks its old number dead; dead postings are skipped at query time and
+    dropped when the index is compacted.
+
+    The index is persisted as an append-only JSON Lines log of added and
+    deleted documents with their term counts. Writes take an exclusive
+    file lock, and every search first applies records appended by other
+    processes, so the API picks up documents indexed by the ingestion
+    daemon. When another process compacts the log, the postings are
+    rebuilt from the new log.
+    """
+
+    def __init__(self, path: str, k1: float = 1.2, b: float = 0.75):
+        """Initialize the keyword index.
+
+        Args:
+            path: Path of the JSON Lines log
+            k1: BM25 term frequency saturation
+            b: BM25 document length normalization
+        """
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._log = AppendLog(path)
+
+        self._reset()
+        self.refresh()
+
+    def upsert(self, ids: List[str], texts: List[str]):
+        """Index documents, replacing earlier versions with the same IDs.
+
+        Args:
+            ids: Document IDs
+            texts: Document texts
+        """
+        records = []
+        for doc_id, text in dict(zip(ids, texts)).items():
+            records.append({"op": "add", "id": doc_id, "terms": Counter(tokenize(text))})
+        self._append_log(records)
+
+    def delete(self, ids: List[str]):
+        """Remove documents from the index.
+
+        Args:
+            ids: Document IDs
+        """
+        with self._lock:
+            self._refresh_locked()
+            records = [
+                {"op": "delete", "id": doc_id}
+                for doc_id in dict.fromkeys(ids)
+                if doc_id in self._number_of
+            ]
+        self._append_log(records)
+
+    def contains(self, doc_id: str) -> bool:
+        """Check whether a document is indexed.
+
+        Args:
+            doc_id: Document ID
+
+        Returns:
+            True if the document is indexed
+        """
+        self.refresh()
+        return doc_id in self._number_of
+
+    def search(self, query: str, top_k: int = 10) -> List[Tuple[str, float]]:
+        """Rank documents against a query with BM25.
+
+        Args:
+            query: Query text
+            top_k: Maximum number of results
+
+        Returns:
+            List of (document ID, score) tuples, best first
+        """
+        terms = set(tokenize(query))
+        self.refresh()
+        with self._lock:
+            live = len(self._number_of)
+            if not terms or live == 0:
+                return []
+
+            count = self._count
+            alive = self._alive[:count]
+            lengths = self._lengths[:count]
+            average_length = self._total_length / live
+            scores = np.zeros(count)
+
+            for term in terms:
+                postings = self._postings.get(term)
+                if postings is None:
+                    continue
+                numbers = np.frombuffer(postings[0], dtype=np.uint32)
+                frequencies = np.frombuffer(postings[1], dtype=np.uint16).astype(np.float64)
+                live_postings = alive[numbers]
+                df = int(live_postings.sum())
+                if df == 0:
+                    continue
+                numbers = numbers[live_postings]
+                frequencies = frequencies[live_postings]
+
+                idf = math.log(1 + (live - df + 0.5) / (df + 0.5))
+                norm = self.k1 * (1 - self.b + self.b * lengths[numbers] / average_length)
+                scores[numbers] += idf * frequencies * (self.k1 + 1) / (frequencies + norm)
+
+            matched = np.flatnonzero(scores)
+            if len(matched) > top_k:
+                matched = matched[np.argpartition(-scores[matched], top_k - 1)[:top_k]]
+            matched = matched[np.argsort(-scores[matched], kind="stable")]
+            return [(self._doc_ids[number], float(scores[number])) for number in matched]
+
+    def count(self) -> int:
+        """Get the number of indexed documents."""
+        self.refresh()
+        return len(self._number_of)
+
+    def refresh(self):
+        """Apply log records written since the last refresh, by any process."""
+        with self._lock:
+            self._refresh_locked()
+
+    def compact(self) -> int:
+        """Rewrite the log keeping only live documents.
+
+        Returns:
+            Number of dead document versions removed
+        """
+        with self._lock, self._log.lock():
+            self._refresh_locked()
+            return self._compact_locked()
+
+    def _compact_locked(self) -> int:
+        """Compact the index. Caller holds the locks."""
+        terms_of = {number: {} for number in self._number_of.values()}
+        for term, (numbers, frequencies) in self._postings.items():
+            for number, frequency in zip(numbers, frequencies):
+                if number in terms_of:
+                    terms_of[number][term] = frequency
+
+        self._log.rewrite(
+            {"op": "add", "id": self._doc_ids[number], "terms": terms_of[number]}
+            for number in sorted(terms_of)
+        )
+
+        removed = self._count - len(terms_of)
+        self._refresh_locked()
+        return removed
+
+    def _append_log(self, records: List[Dict]):
+        if not records:
+            return
+        with self._lock, self._log.lock():
+            self._log.append(records)
+            self._refresh_locked()
+
+            # Rewrite once dead versions outnumber live documents
+            if self._count - len(self._number_of) > len(self._number_of):
+                self._compact_locked()
+
+    def _refresh_locked(self):
+        self._log.replay(self._apply, self._reset)
+
+    def _apply(self, record: Dict, offset: int = 0):
+        doc_id = record["id"]
+        previous = self._number_of.pop(doc_id, None)
+        if previous is not None:
+            self._alive[previous] = False
+            self._total_length -= int(self._lengths[previous])
+
+        if record["op"] != "add":
+            return
+
+        number = self._count
+        if number >= len(self._alive):
+            size = max(1024, 2 * len(self._alive))
+            self._alive = np.concatenate([self._alive, np.zeros(size - len(self._alive), dtype=bool)])
+            self._lengths = np.concatenate([self._lengths, np.zeros(size - len(self._lengths), dtype=np.int64)])
+        self._count += 1
+
+        length = 0
+        for term, frequency in record["terms"].items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = (array('I'), array('H'))
+            postings[0].append(number)
+            postings[1].append(min(frequency, 65535))
+            length += frequency
+
+        self._doc_ids.append(doc_id)
+        self._number_of[doc_id] = number
+        self._alive[number] = True
+        self._lengths[number] = length
+        self._total_length += length
+
+    def _reset(self):
+        self._postings = {}
+        self._doc_ids = []
+        self._number_of = {}
+        self._alive = np.zeros(0, dtype=bool)
+        self._lengths = np.zeros(0, dtype=np.int64)
+        self._count = 0
+        self._total_length = 0
@@ -1,20 +1,35 @@
-import google.generativeai as genai
-from typing import List, Dict, Any
-from config import GEMINI_API_KEY
+from typing import AsyncIterator, List, Dict
+from config import GEMINI_API_KEY, GEMINI_MODEL, HISTORY_TOKEN_BUDGET, HISTORY_SUMMARY_MAX_CHARS
+from .tokens import estimate_tokens
+
+SYSTEM_PROMPT = """You are a helpful assistant that answers questions about news articles.
+Base your answers solely on the provided context information.
+If you don't know the answer based on the provided context, say "I don't have enough information to answer that question."
+Be concise but comprehensive in your responses.
+{summary}
+Context information:
+{context}
+"""
 
 class LLMService:
     """Service for interacting with Gemini LLM API."""
     
     def __init__(self):
         """Initialize the LLM service."""
+        # Imported here so the fake backend runs without the Gemini SDK
+        import google.generativeai as genai
+        
         # Configure the Gemini API
         genai.configure(api_key=GEMINI_API_KEY)
-        self.model = genai.GenerativeModel('gemini-1.5-pro')
+        self.genai = genai
+        self.model_name = GEMINI_MODEL
     
     def generate_response(self, query: str, contexts: List[str], 
                           chat_history: List[Dict[str, str]] = None) -> str:
         """Generate a response based on query and contexts.
         
+        History, contexts and query are sent in a single request.
+        
         Args:
             query: User query
             contexts: List of context passages
@@ -23,42 +38,153 @@ class LLMService:
         Returns:
             LLM response
         """
+        model, contents = self._build_request(query, contexts, chat_history)
+        response = model.generate_content(contents)
+        return response.text
+    
+    async def agenerate_response(self, query: str, contexts: List[str], 
+                                 chat_history: List[Dict[str, str]] = None) -> str:
+        """Async counterpart of generate_response.
+        
+        Args:
+            query: User query
+            contexts: List of context passages
+            chat_history: List of chat history messages
+            
+        Returns:
+            LLM response
+        """
+        model, contents = self._build_request(query, contexts, chat_history)
+        response = await model.generate_content_async(contents)
+        return response.text
+    
+    async def astream_response(self, query: str, contexts: List[str], 
+                               chat_history: List[Dict[str, str]] = None) -> AsyncIterator[str]:
+        """Stream a response as the model produces it.
+        
+        Args:
+            query: User query
+            contexts: List of context passages
+            chat_history: List of chat history messages
+            
+        Yields:
+            Response text chunks
+        """
+        model, contents = self._build_request(query, contexts, chat_history)
+        response = await model.generate_content_async(contents, stream=True)
+        async for chunk in response:
+            text = _chunk_text(chunk)
+            if text:
+                yield text
+    
+    def _build_request(self, query: str, contexts: List[str], 
+                       chat_history: List[Dict[str, str]] = None):
+        """Assemble the model and role-tagged contents for one request.
+        
+        The retrieved contexts go into the system instruction and the chat
+        history is sent as native user/model turns, trimmed to
+        HISTORY_TOKEN_BUDGET. Older turns that do not fit are reduced to a
+        short summary of the user's earlier questions.
+        
+        Args:
+            query: User query
+            contexts: List of context passages
+            chat_history: List of chat history messages
+            
+        Returns:
+            Tuple of (GenerativeModel, contents)
+        """
         # Default empty chat history
         if chat_history is None:
             chat_history = []
-            
+        
+        window, dropped = self._window_history(chat_history)
+        
         # Format the context
         context_text = "\n\n".join([f"Article: {ctx}" for ctx in contexts])
+        system_prompt = SYSTEM_PROMPT.format(
+            summary=self._summarize(dropped),
+            context=context_text
+        )
         
-        # Build the prompt
-        system_prompt = f"""You are a helpful assistant that answers questions about news articles.
-Base your answers solely on the provided context information.
-If you don't know the answer based on the provided context, say "I don't have enough information to answer that question."
-Be concise but comprehensive in your responses.
-
-Context information:
-{context_text}
-"""
-
-        # Create the chat session with history
-        chat = self.model.start_chat(history=[])
+        contents = []
+        for message in window + [{"role": "user", "content": query}]:
+            role = "model" if message["role"] == "assistant" else "user"
+            if message["role"] not in ("user", "assistant"):
+                continue
+            # Gemini expects alternating turns that start with the user
+            if not contents and role == "model":
+                continue
+            if contents and contents[-1]["role"] == role:
+                contents[-1]["parts"].append(message["content"])
+            else:
+                contents.append({"role": role, "parts": [message["content"]]})
         
-        # Add system prompt
-        chat.send_message(system_prompt)
+        # The system instruction changes with the retrieved context, so a
+        # lightweight model object is built per request
+        model = self.genai.GenerativeModel(self.model_name, system_instruction=system_prompt)
+        return model, contents
+    
+    def _window_history(self, chat_history: List[Dict[str, str]]):
+        """Keep the most recent messages that fit in the history budget.
         
-        # Add chat history
-        for message in chat_history:
-            role = message["role"]
-            content = message["content"]
-            if role == "user":
-                chat.send_message(content)
-            elif role == "assistant":
-                # This is a bit of a hack since Gemini API doesn't support
-                # directly setting assistant messages in history
-                user_msg = "Please remember your last response was: " + content
-                chat.send_message(user_msg)
+        Args:
+            chat_history: List of chat history messages, oldest first
+            
+        Returns:
+            Tuple of (kept messages, dropped older messages)
+        """
+        budget = HISTORY_TOKEN_BUDGET
+        start = len(chat_history)
+        while start > 0:
+            cost = estimate_tokens(chat_history[start - 1]["content"])
+            if cost > budget:
+                break
+            budget -= cost
+            start -= 1
+        return chat_history[start:], chat_history[:start]
+    
+    def _summarize(self, dropped: List[Dict[str, str]]) -> str:
+        """Summarize turns that fell out of the history window.
         
-        # Send the user query and get response
-        response = chat.send_message(query)
+        Args:
+            dropped: Older chat history messages
+            
+        Returns:
+            A short note listing the user's earlier questions, or ""
+        """
+        questions = [m["content"] for m in dropped if m["role"] == "user"]
+        if not questions:
+            return ""
+        
+        summary = ""
+        # Most recent questions are the most relevant, so fill from the end
+        for question in reversed(questions):
+            question = " ".join(question.split())
+            if len(question) > 120:
+                question = question[:117] + "..."
+            if len(summary) + len(question) + 4 > HISTORY_SUMMARY_MAX_CHARS:
+                break
+            summary = f"- {question}\n" + summary
         
-        return response.text
\ No newline at end of file
+        if not summary:
+            return ""
+        return f"\nEarlier in this conversation the user asked:\n{summary}"
+
+
+def _chunk_text(chunk) -> str:
+    """Get the text of a streamed chunk.
+
+    Chunks carrying only a finish reason or safety ratings have no text
+    parts, and reading .text on them raises ValueError.
+
+    Args:
+        chunk: Streamed response chunk
+
+    Returns:
+        The chunk's text, or "" if it has none
+    """
+    try:
+        return chunk.text
+    except ValueError:
+        return ""
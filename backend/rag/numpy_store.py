@@ -0,0 +1,627 @@
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .append_log import AppendLog
+from .filters import matches_where
+from .vector_store import BaseVectorStore
+
+# Numeric metadata fields filtered with vectorized comparisons
+NUMERIC_FIELDS = ("published_ts",)
+
+# String metadata fields filtered through integer codes
+CATEGORICAL_FIELDS = ("source",)
+
+# Element types of the compact copy scanned by the first search pass
+QUANTIZATION_DTYPES = {
+    "none": np.float32,
+    "float16": np.float16,
+    "int8": np.int8,
+}
+
+_NUMPY_OPERATORS = {
+    "$eq": np.equal,
+    "$ne": np.not_equal,
+    "$gt": np.greater,
+    "$gte": np.greater_equal,
+    "$lt": np.less,
+    "$lte": np.less_equal,
+    "$in": np.isin,
+    "$nin": lambda column, arg: ~np.isin(column, arg),
+}
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize each row of a float32 matrix.
+
+    Args:
+        vectors: Matrix with one vector per row
+
+    Returns:
+        Normalized copy; all-zero rows stay zero
+    """
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, np.finfo(np.float32).tiny)
+
+
+class NumpyVectorStore(BaseVectorStore):
+    """In-process exact vector store backed by a memory-mapped NumPy matrix.
+
+    Embeddings are L2-normalized and stored as rows of a contiguous float32
+    matrix in a memory-mapped file, so cosine similarity for every document
+    is one matrix-vector product and the top k are selected with
+    argpartition. Documents and metadata live in memory.
+
+    Rows are append-only. An operation log (JSON Lines) records the matrix
+    file and dimension, every added row with its ID, text and metadata, and
+    every deleted row; replaying it rebuilds the store. Overwriting a
+    document deletes its old row and appends a new one, so rows a reader
+    is scoring are never modified underneath it. Once deleted rows
+    outnumber live ones, compact() rewrites the matrix and log.
+
+    Writes take an exclusive file lock and readers pick up records
+    appended by other processes, so the API and the ingestion daemon can
+    share one store, as with Chroma. A reader that finds the log compacted
+    by another process reloads it, and the matrix file it names, from
+    scratch.
+
+    Metadata filters are applied as a row mask before scoring. The fields
+    in NUMERIC_FIELDS and CATEGORICAL_FIELDS are kept in column arrays so
+    filtering on them is vectorized; other fields fall back to evaluating
+    the filter per row.
+
+    Optionally, searches scan a compact in-memory copy of the matrix
+    instead: float16, or int8 with one scale per row, and possibly only the
+    leading truncate_dim dimensions of each (renormalized) vector. The best
+    k * rescore_factor rows of that pass are rescored against the float32
+    matrix, so only those rows of the memory-mapped file are read. The
+    compact copy is derived from the matrix on load and is not persisted,
+    so the settings can be changed without reindexing.
+    """
+
+    INITIAL_CAPACITY = 1024
+
+    # Rows converted to float32 at a time when scanning the compact copy
+    SCAN_BLOCK = 8192
+
+    def __init__(self, path: str, quantization: str = "none",
+                 truncate_dim: int = 0, rescore_factor: int = 4):
+        """Initialize the vector store.
+
+        Args:
+            path: Directory holding the matrix and the operation log
+            quantization: Element type of the compact copy: "none"
+                          (float32), "float16" or "int8"
+            truncate_dim: Dimensions kept in the compact copy; 0 keeps all
+            rescore_factor: Candidates rescored at full precision per result
+        """
+        if quantization not in QUANTIZATION_DTYPES:
+            raise ValueError(f"Unknown quantization {quantization!r}")
+
+        self.path = path
+        self.log_path = os.path.join(path, "rows.jsonl")
+        self.quantization = quantization
+        self.truncate_dim = truncate_dim
+        self.rescore_factor = max(rescore_factor, 1)
+        # Without quantization or truncation the matrix itself is scanned
+        self.compact_scan = quantization != "none" or truncate_dim > 0
+        self._lock = threading.RLock()
+        os.makedirs(path, exist_ok=True)
+        self._log = AppendLog(self.log_path, os.path.join(path, "lock"))
+
+        self._reset()
+        self.refresh()
+
+    def add_documents(self, documents: List[str],
+                      embeddings: List[List[float]],
+                      metadatas: List[Dict[str, Any]] = None,
+                      ids: List[str] = None):
+        """Add documents to the vector store, ignoring IDs that already exist.
+
+        Args:
+            documents: List of document texts
+            embeddings: List of embedding vectors
+            metadatas: List of metadata dictionaries
+            ids: List of document IDs
+        """
+        if metadatas is None:
+            metadatas = [{} for _ in documents]
+
+        if ids is None:
+            ids = [f"doc_{i}" for i in range(len(documents))]
+
+        self._write(documents, embeddings, metadatas, ids, overwrite=False)
+
+    def upsert_documents(self, documents: List[str],
+                         embeddings: List[List[float]],
+                         metadatas: List[Dict[str, Any]],
+                         ids: List[str]):
+        """Insert documents or overwrite existing ones with the same IDs.
+
+        Args:
+            documents: List of document texts
+            embeddings: List of embedding vectors
+            metadatas: List of metadata dictionaries
+            ids: List of document IDs
+        """
+        self._write(documents, embeddings, metadatas, ids, overwrite=True)
+
+    def get_fingerprints(self, ids: List[str]) -> Dict[str, str]:
+        """Get the stored content fingerprints for a set of documents.
+
+        Args:
+            ids: List of document IDs
+
+        Returns:
+            Mapping of the IDs that exist to their fingerprint
+        """
+        self.refresh()
+        with self._lock:
+            return {
+                doc_id: self._metadatas[self._row_of[doc_id]].get("fingerprint", "")
+                for doc_id in ids
+                if doc_id in self._row_of
+            }
+
+    def get_ids(self, where: Dict[str, Any] = None) -> List[str]:
+        """Get the IDs of documents matching a metadata filter.
+
+        Args:
+            where: Chroma-style metadata filter
+
+        Returns:
+            List of document IDs
+        """
+        self.refresh()
+        with self._lock:
+            return [
+                doc_id for doc_id, row in self._row_of.items()
+                if matches_where(self._metadatas[row], where)
+            ]
+
+    def get_documents(self, ids: List[str]) -> Dict[str, Tuple[str, Dict[str, Any]]]:
+        """Get stored documents by ID.
+
+        Args:
+            ids: List of document IDs
+
+        Returns:
+            Mapping of the IDs that exist to (document text, metadata)
+        """
+        self.refresh()
+        with self._lock:
+            return {
+                doc_id: (self._documents[self._row_of[doc_id]], self._metadatas[self._row_of[doc_id]])
+                for doc_id in ids
+                if doc_id in self._row_of
+            }
+
+    def get_embeddings(self, ids: List[str]) -> Dict[str, np.ndarray]:
+        """Get stored embeddings by ID.
+
+        Args:
+            ids: List of document IDs
+
+        Returns:
+            Mapping of the IDs that exist to their normalized embedding
+        """
+        self.refresh()
+        with self._lock:
+            return {
+                doc_id: np.array(self._matrix[self._row_of[doc_id]])
+                for doc_id in ids
+                if doc_id in self._row_of
+            }
+
+    def delete_documents(self, ids: List[str]):
+        """Delete documents from the vector store.
+
+        Args:
+            ids: List of document IDs
+        """
+        if not ids:
+            return
+
+        with self._lock, self._log.lock():
+            self._refresh_locked()
+            records = [
+                {"op": "delete", "row": self._row_of[doc_id]}
+                for doc_id in dict.fromkeys(ids)
+                if doc_id in self._row_of
+            ]
+            self._append_log(records)
+            self._maybe_compact()
+
+    def search(self, query_embedding: List[float], top_k: int = 3,
+               where: Optional[Dict[str, Any]] = None,
+               include_embeddings: bool = False) -> Dict[str, Any]:
+        """Search for similar documents.
+
+        Args:
+            query_embedding: Embedding vector for the query
+            top_k: Number of results to return
+            where: Optional Chroma-style metadata filter
+            include_embeddings: Also return the stored (normalized) embeddings
+
+        Returns:
+            Dictionary of search results in Chroma's format
+        """
+        return self.search_batch([query_embedding], top_k, where, include_embeddings)
+
+    def search_batch(self, query_embeddings: List[List[float]], top_k: int = 3,
+                     where: Optional[Dict[str, Any]] = None,
+                     include_embeddings: bool = False) -> Dict[str, Any]:
+        """Search for the documents most similar to each of several queries.
+
+        All queries are scored with a single matrix product.
+
+        Args:
+            query_embeddings: List of query embedding vectors
+            top_k: Number of results to return per query
+            where: Optional Chroma-style metadata filter
+            include_embeddings: Also return the stored (normalized) embeddings
+
+        Returns:
+            Dictionary of search results in Chroma's format, one list per query
+        """
+        self.refresh()
+        with self._lock:
+            # Rows below _rows are never modified, so a snapshot of the
+            # references is enough to score without holding the lock
+            rows = self._rows
+            matrix = self._matrix
+            codes, scales = self._codes, self._scales
+            alive = self._alive[:rows].copy()
+            if where:
+                alive &= self._filter_mask(where, rows)
+            ids, documents, metadatas = self._ids, self._documents, self._metadatas
+
+        results = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        if include_embeddings:
+            results["embeddings"] = []
+        live = int(alive.sum())
+        k = min(top_k, live)
+        if k <= 0:
+            for key in results:
+                results[key] = [[] for _ in query_embeddings]
+            return results
+
+        queries = normalize_rows(np.asarray(query_embeddings, dtype=np.float32))
+        if codes is None:
+            scores = queries @ np.asarray(matrix[:rows]).T
+        else:
+            scores = self._approximate_scores(queries, codes, scales, rows)
+        if live < rows:
+            scores[:, ~alive] = -np.inf
+
+        # The compact pass only shortlists candidates for exact rescoring
+        shortlist = k if codes is None else min(k * self.rescore_factor, live)
+        if shortlist < rows:
+            top = np.argpartition(-scores, shortlist - 1, axis=1)[:, :shortlist]
+        else:
+            top = np.tile(np.arange(rows), (len(queries), 1))
+
+        for query, query_scores, candidates in zip(queries, scores, top):
+            if codes is None:
+                candidate_scores = query_scores[candidates]
+            else:
+                # Sorted rows read the memory-mapped file sequentially
+                candidates = np.sort(candidates)
+                candidate_scores = np.asarray(matrix[candidates]) @ query
+            best = np.argsort(-candidate_scores, kind="stable")[:k]
+            order = candidates[best]
+            results["ids"].append([ids[row] for row in order])
+            results["documents"].append([documents[row] for row in order])
+            results["metadatas"].append([metadatas[row] for row in order])
+            # Cosine distance, as returned by Chroma's cosine space
+            results["distances"].append((1.0 - candidate_scores[best]).tolist())
+            if include_embeddings:
+                results["embeddings"].append(np.array(matrix[order]))
+
+        return results
+
+    def get_collection_count(self) -> int:
+        """Get the number of documents in the store.
+
+        Returns:
+            Number of documents
+        """
+        self.refresh()
+        return len(self._row_of)
+
+    def refresh(self):
+        """Apply log records written since the last refresh, by any process."""
+        with self._lock:
+            self._refresh_locked()
+
+    def compact(self) -> int:
+        """Rewrite the matrix and log keeping only live rows.
+
+        Returns:
+            Number of deleted rows removed
+        """
+        with self._lock, self._log.lock():
+            self._refresh_locked()
+            return self._compact_locked()
+
+    def _compact_locked(self) -> int:
+        """Compact the store. Caller holds the locks."""
+        if self._matrix is None:
+            return 0
+
+        live_rows = [row for row in range(self._rows) if self._alive[row]]
+        removed = self._rows - len(live_rows)
+
+        generation = int(self._vectors_file.split(".")[1]) + 1
+        vectors_file = f"vectors.{generation}.f32"
+        capacity = max(self.INITIAL_CAPACITY, len(live_rows))
+        matrix = self._open_matrix(vectors_file, capacity)
+        for start in range(0, len(live_rows), self.INITIAL_CAPACITY):
+            batch = live_rows[start:start + self.INITIAL_CAPACITY]
+            matrix[start:start + len(batch)] = self._matrix[batch]
+        matrix.flush()
+
+        records = [{"op": "init", "dim": self.dim, "vectors": vectors_file}]
+        records.extend(
+            {
+                "op": "add",
+                "row": new_row,
+                "id": self._ids[row],
+                "document": self._documents[row],
+                "metadata": self._metadatas[row]
+            }
+            for new_row, row in enumerate(live_rows)
+        )
+        self._log.rewrite(records)
+
+        # Readers holding the old mapping keep it until they refresh, and
+        # replay the rewritten log from the start when they do
+        old_vectors = os.path.join(self.path, self._vectors_file)
+        self._refresh_locked()
+        os.remove(old_vectors)
+        return removed
+
+    def _write(self, documents: List[str], embeddings: List[List[float]],
+               metadatas: List[Dict[str, Any]], ids: List[str], overwrite: bool):
+        """Append rows for documents, deleting the rows they replace."""
+        if not ids:
+            return
+
+        vectors = normalize_rows(np.asarray(embeddings, dtype=np.float32))
+        if vectors.ndim != 2 or len(vectors) != len(ids):
+            raise ValueError("Expected one embedding vector per document")
+
+        with self._lock, self._log.lock():
+            self._refresh_locked()
+
+            if self._matrix is None:
+                self.dim = vectors.shape[1]
+                vectors_file = "vectors.0.f32"
+                self._open_matrix(vectors_file, self.INITIAL_CAPACITY)
+                self._append_log([{"op": "init", "dim": vectors.shape[1], "vectors": vectors_file}])
+            if vectors.shape[1] != self.dim:
+                raise ValueError(
+                    f"Embedding dimension {vectors.shape[1]} does not match the store's {self.dim}"
+                )
+
+            # The last occurrence of a repeated ID wins
+            latest = {doc_id: i for i, doc_id in enumerate(ids)}
+            keep = [
+                i for doc_id, i in latest.items()
+                if overwrite or doc_id not in self._row_of
+            ]
+            if not keep:
+                return
+
+            start = self._rows
+            self._ensure_capacity(start + len(keep))
+            self._matrix[start:start + len(keep)] = vectors[keep]
+            self._matrix.flush()
+
+            records = [
+                {"op": "delete", "row": self._row_of[ids[i]]}
+                for i in keep if ids[i] in self._row_of
+            ]
+            records.extend(
+                {
+                    "op": "add",
+                    "row": start + offset,
+                    "id": ids[i],
+                    "document": documents[i],
+                    "metadata": metadatas[i] or {}
+                }
+                for offset, i in enumerate(keep)
+            )
+            self._append_log(records)
+            self._maybe_compact()
+
+    def _append_log(self, records: List[Dict[str, Any]]):
+        """Append records to the log and apply them. Caller holds the locks."""
+        self._log.append(records)
+        self._refresh_locked()
+
+    def _maybe_compact(self):
+        """Compact once deleted rows outnumber live ones."""
+        if self._rows - len(self._row_of) > len(self._row_of):
+            self._compact_locked()
+
+    def _refresh_locked(self):
+        self._log.replay(self._apply, self._reset)
+
+        if self._matrix is not None and self._rows > len(self._matrix):
+            # Another process grew the matrix file
+            self._open_matrix(self._vectors_file)
+        self._encode_rows()
+
+    def _encode_rows(self):
+        """Add rows appended since the last call to the compact copy."""
+        if not self.compact_scan or self._matrix is None or self._encoded >= self._rows:
+            return
+
+        width = min(self.truncate_dim or self.dim, self.dim)
+        start, rows = self._encoded, self._rows
+        if self._codes is None or len(self._codes) < rows:
+            # Grow into new arrays; searches keep scanning the old ones
+            capacity = max(self.INITIAL_CAPACITY, rows)
+            if self._codes is not None:
+                capacity = max(capacity, 2 * len(self._codes))
+            codes = np.zeros((capacity, width), dtype=QUANTIZATION_DTYPES[self.quantization])
+            scales = np.ones(capacity, dtype=np.float32)
+            if self._codes is not None:
+                codes[:start] = self._codes[:start]
+                scales[:start] = self._scales[:start]
+            self._codes, self._scales = codes, scales
+
+        vectors = np.asarray(self._matrix[start:rows])[:, :width]
+        if width < self.dim:
+            vectors = normalize_rows(vectors)
+        if self.quantization == "int8":
+            scale = np.abs(vectors).max(axis=1) / 127.0
+            scale[scale == 0] = 1.0
+            self._codes[start:rows] = np.rint(vectors / scale[:, None])
+            self._scales[start:rows] = scale
+        else:
+            self._codes[start:rows] = vectors
+        self._encoded = rows
+
+    def _approximate_scores(self, queries: np.ndarray, codes: np.ndarray,
+                            scales: np.ndarray, rows: int) -> np.ndarray:
+        """Score the first rows rows of the compact copy against the queries."""
+        prefix = queries[:, :codes.shape[1]]
+        scores = np.empty((len(queries), rows), dtype=np.float32)
+        # NumPy has no fast float16 or int8 product, so widen block by block
+        for start in range(0, rows, self.SCAN_BLOCK):
+            stop = min(start + self.SCAN_BLOCK, rows)
+            scores[:, start:stop] = prefix @ codes[start:stop].astype(np.float32).T
+        if self.quantization == "int8":
+            scores *= scales[:rows]
+        return scores
+
+    def _filter_mask(self, where: Dict[str, Any], rows: int) -> np.ndarray:
+        """Evaluate a metadata filter over the first rows rows."""
+        mask = np.ones(rows, dtype=bool)
+        for key, condition in where.items():
+            if key == "$and":
+                for clause in condition:
+                    mask &= self._filter_mask(clause, rows)
+            elif key == "$or":
+                any_mask = np.zeros(rows, dtype=bool)
+                for clause in condition:
+                    any_mask |= self._filter_mask(clause, rows)
+                mask &= any_mask
+            else:
+                if not isinstance(condition, dict):
+                    condition = {"$eq": condition}
+                for operator, arg in condition.items():
+                    mask &= self._field_mask(key, operator, arg, rows)
+        return mask
+
+    def _field_mask(self, field: str, operator: str, arg: Any, rows: int) -> np.ndarray:
+        """Evaluate one field condition, using a column array when there is one."""
+        if field in self._numeric and operator in _NUMPY_OPERATORS:
+            with np.errstate(invalid="ignore"):
+                return _NUMPY_OPERATORS[operator](self._numeric[field][:rows], arg)
+
+        if field in self._categorical and operator in ("$eq", "$ne", "$in", "$nin"):
+            codes, lookup = self._categorical[field]
+            values = arg if operator in ("$in", "$nin") else [arg]
+            hit = np.isin(codes[:rows], [lookup[value] for value in values if value in lookup])
+            return hit if operator in ("$eq", "$in") else ~hit
+
+        return np.fromiter(
+            (
+                metadata is not None and matches_where(metadata, {field: {operator: arg}})
+                for metadata in self._metadatas[:rows]
+            ),
+            dtype=bool,
+            count=rows
+        )
+
+    def _apply(self, record: Dict[str, Any], offset: int = 0):
+        op = record["op"]
+        if op == "init":
+            self.dim = record["dim"]
+            self._open_matrix(record["vectors"])
+        elif op == "add":
+            row = record["row"]
+            if row >= len(self._alive):
+                self._grow_columns(max(row + 1, 2 * len(self._alive)))
+            while len(self._ids) <= row:
+                self._ids.append(None)
+                self._documents.append(None)
+                self._metadatas.append(None)
+            metadata = record["metadata"]
+            self._ids[row] = record["id"]
+            self._documents[row] = record["document"]
+            self._metadatas[row] = metadata
+            self._alive[row] = True
+            for field, column in self._numeric.items():
+                value = metadata.get(field)
+                column[row] = value if isinstance(value, (int, float)) else np.nan
+            for field, (codes, lookup) in self._categorical.items():
+                value = metadata.get(field)
+                codes[row] = lookup.setdefault(value, len(lookup)) if value is not None else -1
+            self._row_of[record["id"]] = row
+            self._rows = max(self._rows, row + 1)
+        elif op == "delete":
+            row = record["row"]
+            self._alive[row] = False
+            if self._row_of.get(self._ids[row]) == row:
+                del self._row_of[self._ids[row]]
+
+    def _grow_columns(self, size: int):
+        """Extend the per-row arrays to size rows."""
+        extra = size - len(self._alive)
+        self._alive = np.concatenate([self._alive, np.zeros(extra, dtype=bool)])
+        for field, column in self._numeric.items():
+            self._numeric[field] = np.concatenate([column, np.full(extra, np.nan)])
+        for field, (codes, lookup) in self._categorical.items():
+            self._categorical[field] = (
+                np.concatenate([codes, np.full(extra, -1, dtype=np.int32)]), lookup
+            )
+
+    def _open_matrix(self, vectors_file: str, capacity: Optional[int] = None) -> np.memmap:
+        """Map a matrix file, creating or growing it to capacity rows."""
+        file_path = os.path.join(self.path, vectors_file)
+        row_bytes = self.dim * 4 if self.dim else None
+        if capacity is not None:
+            if row_bytes is None:
+                raise ValueError("Cannot size a matrix before its dimension is known")
+            with open(file_path, 'ab') as f:
+                if f.tell() < capacity * row_bytes:
+                    f.truncate(capacity * row_bytes)
+        size = os.path.getsize(file_path)
+        matrix = np.memmap(file_path, dtype=np.float32, mode='r+', shape=(size // row_bytes, self.dim))
+        if self._vectors_file in (None, vectors_file):
+            self._vectors_file = vectors_file
+            self._matrix = matrix
+        return matrix
+
+    def _ensure_capacity(self, rows: int):
+        """Grow the matrix file geometrically to hold at least rows rows."""
+        capacity = len(self._matrix)
+        if rows <= capacity:
+            return
+        while capacity < rows:
+            capacity *= 2
+        self._open_matrix(self._vectors_file, capacity)
+
+    def _reset(self):
+        self.dim = None
+        self._vectors_file = None
+        self._matrix = None
+        self._alive = np.zeros(0, dtype=bool)
+        self._numeric = {field: np.zeros(0) for field in NUMERIC_FIELDS}
+        self._categorical = {
+            field: (np.zeros(0, dtype=np.int32), {}) for field in CATEGORICAL_FIELDS
+        }
+        self._rows = 0
+        self._ids = []
+        self._documents = []
+        self._metadatas = []
+        self._row_of = {}
+        self._codes = None
+        self._scales = None
+        self._encoded = 0
@@ -0,0 +1,143 @@
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+# Per-result fields carried through fusion, besides "ids"
+_RESULT_FIELDS = ("documents", "metadatas", "distances", "embeddings")
+
+
+def _reorder(search_results: Dict[str, Any], order) -> Dict[str, Any]:
+    """Reorder every per-result list of a single-query search result."""
+    size = len(search_results["ids"][0])
+    reordered = {}
+    for key, value in search_results.items():
+        if isinstance(value, (list, np.ndarray)) and len(value) and value[0] is not None \
+                and not isinstance(value[0], str) and len(value[0]) == size:
+            reordered[key] = [[value[0][i] for i in order]]
+        else:
+            reordered[key] = value
+    return reordered
+
+
+def blend_recency(search_results: Dict[str, Any], weight: float,
+                  half_life: float, now: Optional[float] = None) -> Dict[str, Any]:
+    """Re-rank search results by similarity blended with freshness.
+
+    Each result scores (1 - weight) * similarity + weight * freshness,
+    where similarity is one minus the cosine distance and freshness halves
+    every half_life seconds since "published_ts". Undated results get no
+    freshness credit.
+
+    Args:
+        search_results: Vector store search results for a single query
+        weight: Share of the score given to freshness, from 0 to 1
+        half_life: Seconds after which freshness has halved
+        now: Reference timestamp, defaults to the current time
+
+    Returns:
+        Search results in the same format, in blended score order
+    """
+    if weight <= 0 or not search_results["ids"] or not search_results["ids"][0]:
+        return search_results
+
+    now = time.time() if now is None else now
+    scores = []
+    for distance, metadata in zip(search_results["distances"][0], search_results["metadatas"][0]):
+        published = (metadata or {}).get("published_ts") or 0
+        freshness = 0.5 ** (max(now - published, 0) / half_life) if published > 0 else 0.0
+        scores.append((1 - weight) * (1 - distance) + weight * freshness)
+
+    order = sorted(range(len(scores)), key=lambda i: -scores[i])
+    return _reorder(search_results, order)
+
+
+def reciprocal_rank_fusion(result_lists: List[Dict[str, Any]], k: int = 60,
+                           limit: Optional[int] = None) -> Dict[str, Any]:
+    """Fuse several ranked result lists with reciprocal rank fusion.
+
+    A document scores the sum of 1 / (k + rank) over the lists it appears
+    in, so documents ranked well by several retrievers rise to the top
+    without their raw scores having to be comparable.
+
+    Args:
+        result_lists: Single-query search results in the vector store format
+        k: Rank offset dampening the weight of the top ranks
+        limit: Maximum number of fused results
+
+    Returns:
+        Fused search results in the vector store format, with a "scores"
+        list. A document keeps the fields of the first list it appears in;
+        "embeddings" is kept only if every list has it.
+    """
+    fields = [
+        field for field in _RESULT_FIELDS
+        if all(results.get(field) is not None for results in result_lists)
+    ]
+    scores = {}
+    rows = {}
+    for results in result_lists:
+        if not results["ids"] or not results["ids"][0]:
+            continue
+        for rank, doc_id in enumerate(results["ids"][0], start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+            if doc_id not in rows:
+                rows[doc_id] = {field: results[field][0][rank - 1] for field in fields}
+
+    ranked = sorted(scores, key=lambda doc_id: -scores[doc_id])[:limit]
+    fused = {"ids": [ranked]}
+    for field in fields:
+        fused[field] = [[rows[doc_id][field] for doc_id in ranked]]
+    fused["scores"] = [[scores[doc_id] for doc_id in ranked]]
+    return fused
+
+
+def mmr_select(search_results: Dict[str, Any], k: int, lambda_: float) -> Dict[str, Any]:
+    """Pick a relevant but non-redundant subset of results with maximal marginal relevance.
+
+    Results are chosen greedily, each maximising
+    lambda_ * relevance - (1 - lambda_) * (highest cosine similarity to a
+    result already chosen). Relevance comes from the incoming order, scaled
+    linearly from 1 for the first result towards 0 for the last, so the
+    similarity, freshness and keyword fusion that produced that order still
+    count. Redundancy is measured on the "embeddings" of the results;
+    without them the results are simply truncated.
+
+    Args:
+        search_results: Single-query search results, best first
+        k: Maximum number of results to keep
+        lambda_: Trade-off between relevance (1) and diversity (0)
+
+    Returns:
+        Search results in the vector store format, in selection order
+    """
+    size = len(search_results["ids"][0]) if search_results["ids"] else 0
+    embeddings = search_results.get("embeddings")
+    if size <= 1 or not embeddings or embeddings[0] is None:
+        return _reorder(search_results, range(min(k, size))) if size else search_results
+
+    # Results without an embedding count as similar to nothing
+    dim = next((len(row) for row in embeddings[0] if row is not None), 0)
+    vectors = np.array(
+        [row if row is not None else np.zeros(dim) for row in embeddings[0]],
+        dtype=np.float32
+    )
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = vectors / np.maximum(norms, np.finfo(np.float32).tiny)
+    similarity = vectors @ vectors.T
+
+    relevance = 1.0 - np.arange(size) / size
+    selected = [0]
+    redundancy = similarity[0].copy()
+    available = np.ones(size, dtype=bool)
+    available[0] = False
+
+    while len(selected) < min(k, size):
+        scores = lambda_ * relevance - (1 - lambda_) * redundancy
+        scores[~available] = -np.inf
+        choice = int(np.argmax(scores))
+        selected.append(choice)
+        available[choice] = False
+        redundancy = np.maximum(redundancy, similarity[choice])
+
+    return _reorder(search_results, selected)
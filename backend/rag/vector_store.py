@@ -1,9 +1,67 @@
-import chromadb
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 import os
-from config import VECTOR_DB_PATH
+from config import (
+    VECTOR_DB_PATH, VECTOR_STORE_BACKEND, NUMPY_STORE_PATH, NUMPY_QUANTIZATION,
+    NUMPY_TRUNCATE_DIM, NUMPY_RESCORE_FACTOR
+)
 
-class VectorStore:
+class BaseVectorStore:
+    """Interface shared by the vector store backends.
+    
+    search() returns results in Chroma's query format: a dictionary of
+    "ids", "documents", "metadatas" and "distances" lists, each holding one
+    list per query, with cosine distances in ascending order.
+    """
+    
+    def add_documents(self, documents: List[str], 
+                      embeddings: List[List[float]], 
+                      metadatas: List[Dict[str, Any]] = None,
+                      ids: List[str] = None):
+        """Add documents to the vector store."""
+        raise NotImplementedError
+    
+    def upsert_documents(self, documents: List[str], 
+                         embeddings: List[List[float]], 
+                         metadatas: List[Dict[str, Any]],
+                         ids: List[str]):
+        """Insert documents or overwrite existing ones with the same IDs."""
+        raise NotImplementedError
+    
+    def get_fingerprints(self, ids: List[str]) -> Dict[str, str]:
+        """Get the stored content fingerprints of the IDs that exist."""
+        raise NotImplementedError
+    
+    def get_ids(self, where: Dict[str, Any] = None) -> List[str]:
+        """Get the IDs of documents matching a Chroma-style metadata filter."""
+        raise NotImplementedError
+    
+    def get_documents(self, ids: List[str]) -> Dict[str, Tuple[str, Dict[str, Any]]]:
+        """Get the text and metadata of the IDs that exist."""
+        raise NotImplementedError
+    
+    def delete_documents(self, ids: List[str]):
+        """Delete documents from the vector store."""
+        raise NotImplementedError
+    
+    def get_embeddings(self, ids: List[str]) -> Dict[str, List[float]]:
+        """Get the stored embeddings of the IDs that exist."""
+        raise NotImplementedError
+    
+    def search(self, query_embedding: List[float], top_k: int = 3,
+               where: Optional[Dict[str, Any]] = None,
+               include_embeddings: bool = False) -> Dict[str, Any]:
+        """Search for the documents most similar to a query embedding.
+        
+        Only documents matching the Chroma-style where filter are considered.
+        With include_embeddings, results also have an "embeddings" list.
+        """
+        raise NotImplementedError
+    
+    def get_collection_count(self) -> int:
+        """Get the number of documents in the store."""
+        raise NotImplementedError
+
+class VectorStore(BaseVectorStore):
     """Vector store for storing and retrieving embeddings."""
     
     def __init__(self, collection_name: str = "news_articles"):
@@ -12,6 +70,9 @@ class VectorStore:
         Args:
             collection_name: Name of the collection to use
         """
+        # Imported here so the numpy backend does not load Chroma
+        import chromadb
+        
         # Make sure directory exists
         os.makedirs(VECTOR_DB_PATH, exist_ok=True)
         
@@ -53,21 +114,125 @@ class VectorStore:
             ids=ids
         )
     
-    def search(self, query_embedding: List[float], top_k: int = 3) -> Dict[str, Any]:
+    def upsert_documents(self, documents: List[str], 
+                         embeddings: List[List[float]], 
+                         metadatas: List[Dict[str, Any]],
+                         ids: List[str]):
+        """Insert documents or overwrite existing ones with the same IDs.
+        
+        Args:
+            documents: List of document texts
+            embeddings: List of embedding vectors
+            metadatas: List of metadata dictionaries
+            ids: List of document IDs
+        """
+        if not ids:
+            return
+            
+        self.collection.upsert(
+            documents=documents,
+            embeddings=embeddings,
+            metadatas=metadatas,
+            ids=ids
+        )
+    
+    def get_fingerprints(self, ids: List[str]) -> Dict[str, str]:
+        """Get the stored content fingerprints for a set of documents.
+        
+        Args:
+            ids: List of document IDs
+            
+        Returns:
+            Mapping of the IDs that exist to their fingerprint
+        """
+        if not ids:
+            return {}
+            
+        results = self.collection.get(ids=ids, include=["metadatas"])
+        return {
+            doc_id: (metadata or {}).get("fingerprint", "")
+            for doc_id, metadata in zip(results["ids"], results["metadatas"])
+        }
+    
+    def get_ids(self, where: Dict[str, Any] = None) -> List[str]:
+        """Get the IDs of documents matching a metadata filter.
+        
+        Args:
+            where: Chroma metadata filter
+            
+        Returns:
+            List of document IDs
+        """
+        results = self.collection.get(where=where, include=[])
+        return results["ids"]
+    
+    def get_documents(self, ids: List[str]) -> Dict[str, Tuple[str, Dict[str, Any]]]:
+        """Get stored documents by ID.
+        
+        Args:
+            ids: List of document IDs
+            
+        Returns:
+            Mapping of the IDs that exist to (document text, metadata)
+        """
+        if not ids:
+            return {}
+            
+        results = self.collection.get(ids=ids, include=["documents", "metadatas"])
+        return {
+            doc_id: (document, metadata or {})
+            for doc_id, document, metadata in zip(
+                results["ids"], results["documents"], results["metadatas"]
+            )
+        }
+    
+    def get_embeddings(self, ids: List[str]) -> Dict[str, List[float]]:
+        """Get stored embeddings by ID.
+        
+        Args:
+            ids: List of document IDs
+            
+        Returns:
+            Mapping of the IDs that exist to their embedding
+        """
+        if not ids:
+            return {}
+            
+        results = self.collection.get(ids=ids, include=["embeddings"])
+        return dict(zip(results["ids"], results["embeddings"]))
+    
+    def delete_documents(self, ids: List[str]):
+        """Delete documents from the vector store.
+        
+        Args:
+            ids: List of document IDs
+        """
+        if not ids:
+            return
+            
+        self.collection.delete(ids=ids)
+    
+    def search(self, query_embedding: List[float], top_k: int = 3,
+               where: Optional[Dict[str, Any]] = None,
+               include_embeddings: bool = False) -> Dict[str, Any]:
         """Search for similar documents.
         
         Args:
             query_embedding: Embedding vector for the query
             top_k: Number of results to return
+            where: Optional metadata filter, applied inside the index
+            include_embeddings: Also return the stored embeddings
             
         Returns:
             Dictionary of search results
         """
         # Query the collection
-        results = self.collection.query(
-            query_embeddings=[query_embedding],
-            n_results=top_k
-        )
+        query = {"query_embeddings": [query_embedding], "n_results": top_k}
+        if where:
+            query["where"] = where
+        if include_embeddings:
+            query["include"] = ["documents", "metadatas", "distances", "embeddings"]
+        results = self.collection.query(**query)
         
         return results
     
@@ -77,4 +242,20 @@ class VectorStore:
         Returns:
             Number of documents
         """
-        return self.collection.count()
\ No newline at end of file
+        return self.collection.count()
+
+def create_vector_store() -> BaseVectorStore:
+    """Create the vector store backend selected by VECTOR_STORE_BACKEND.
+    
+    Returns:
+        Chroma-backed VectorStore, or NumpyVectorStore for "numpy"
+    """
+    if VECTOR_STORE_BACKEND == "numpy":
+        from .numpy_store import NumpyVectorStore
+        return NumpyVectorStore(
+            NUMPY_STORE_PATH,
+            quantization=NUMPY_QUANTIZATION,
+            truncate_dim=NUMPY_TRUNCATE_DIM,
+            rescore_factor=NUMPY_RESCORE_FACTOR
+        )
+    return VectorStore()
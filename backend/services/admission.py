@@ -0,0 +1,394 @@
+import asyncio
+import concurrent.futures
+import logging
+import math
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from config import (
+    CHAT_MAX_CONCURRENCY, CHAT_QUEUE_SIZE, CHAT_QUEUE_TIMEOUT, LLM_MAX_CONCURRENCY,
+    EMBEDDING_QUERY_MAX_CONCURRENCY, SESSION_RATE_LIMIT, SESSION_RATE_BURST,
+    INGEST_MAX_PENDING, INGEST_MAX_CONCURRENCY, INGEST_YIELD_MAX
+)
+from metrics import ADMISSION_IN_FLIGHT, ADMISSION_QUEUE_DEPTH, SHED_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+# Event loop time by which an admitted request must have its upstream slots
+request_deadline_var: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+async def _acquire(semaphore: asyncio.Semaphore, timeout: Optional[float]) -> bool:
+    """Acquire a semaphore within timeout seconds (None waits indefinitely).
+
+    Unlike wait_for(semaphore.acquire(), timeout), a timeout firing just as
+    the acquire succeeds cannot leak the slot: it is given back before
+    reporting the timeout.
+
+    Returns:
+        True if the semaphore was acquired, False on timeout
+    """
+    acquired = False
+    try:
+        async with asyncio.timeout(timeout):
+            acquired = await semaphore.acquire()
+    except TimeoutError:
+        if acquired:
+            semaphore.release()
+        return False
+    return True
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    """Get the event loop running in the current thread, if any."""
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+class Overloaded(Exception):
+    """Raised when a request is shed instead of being queued."""
+
+    def __init__(self, message: str, status_code: int = 503, retry_after: float = 1.0):
+        """Initialize the error.
+
+        Args:
+            message: Reason the request was shed
+            status_code: 429 for rate limiting, 503 for overload
+            retry_after: Seconds the client should wait before retrying
+        """
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = max(1, math.ceil(retry_after))
+
+class Ticket:
+    """An admitted request's slot, released exactly once."""
+
+    def __init__(self, release):
+        self._release = release
+        self._released = False
+        self._lock = threading.Lock()
+
+    def release(self):
+        """Give the slot back; later calls do nothing."""
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        self._release()
+
+class AdmissionController:
+    """Admission control and load shedding for chat and ingestion.
+
+    Chat requests run at most max_concurrency at a time. Up to queue_size
+    more wait for a slot, each for at most queue_timeout seconds; the
+    rest are rejected at once with 503 and a Retry-After estimated from
+    the queue length and recent service times. Admission fixes a deadline
+    that also bounds waiting for the LLM and embedding concurrency limits
+    further along. Each session is rate limited with a token bucket (429).
+
+    Ingestion jobs are bounded the same way, and yield to chat: before
+    each embedding batch they pause while chat requests are waiting, and
+    the batch then takes a slot of the same embedding limit as chat
+    queries, so an ingest burst does not hold up interactive traffic or
+    saturate the provider.
+    """
+
+    def __init__(self,
+                 max_concurrency: int = CHAT_MAX_CONCURRENCY,
+                 queue_size: int = CHAT_QUEUE_SIZE,
+                 queue_timeout: float = CHAT_QUEUE_TIMEOUT,
+                 llm_limit: int = LLM_MAX_CONCURRENCY,
+                 embedding_limit: int = EMBEDDING_QUERY_MAX_CONCURRENCY,
+                 session_rate: float = SESSION_RATE_LIMIT,
+                 session_burst: int = SESSION_RATE_BURST,
+                 ingest_max_pending: int = INGEST_MAX_PENDING,
+                 ingest_max_concurrency: int = INGEST_MAX_CONCURRENCY,
+                 ingest_yield_max: float = INGEST_YIELD_MAX):
+        """Initialize the controller.
+
+        Args:
+            max_concurrency: Chat requests processed at once
+            queue_size: Chat requests allowed to wait for a slot
+            queue_timeout: Seconds a chat request may spend waiting, for
+                           admission and for upstream slots combined
+            llm_limit: Concurrent LLM calls
+            embedding_limit: Concurrent query embedding calls
+            session_rate: Messages per minute per session; 0 disables
+            session_burst: Messages a session may send back to back
+            ingest_max_pending: Ingestion jobs running or queued
+            ingest_max_concurrency: Ingestion jobs running at once
+            ingest_yield_max: Longest pause of an ingestion job for chat
+        """
+        self.max_concurrency = max_concurrency
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.session_rate = session_rate / 60.0
+        self.session_burst = session_burst
+        self.ingest_max_pending = ingest_max_pending
+        self.ingest_yield_max = ingest_yield_max
+
+        self._chat_slots = asyncio.Semaphore(max_concurrency)
+        self._upstreams = {
+            "llm": asyncio.Semaphore(llm_limit),
+            "embedding": asyncio.Semaphore(embedding_limit),
+        }
+        self._ingest_slots = threading.Semaphore(ingest_max_concurrency)
+        self._ingest_lock = threading.Lock()
+
+        # Loop owning the upstream semaphores, used by ingestion threads
+        self._loop = _running_loop()
+
+        self.chat_in_flight = 0
+        self.chat_waiting = 0
+        self.ingest_pending = 0
+        self.shed = {}
+        # Smoothed chat service time, used to estimate Retry-After
+        self._service_time = 1.0
+        self._buckets: Dict[str, tuple] = {}
+
+    async def admit_chat(self, session_id: str) -> Ticket:
+        """Admit a chat request or shed it.
+
+        Args:
+            session_id: Session sending the message
+
+        Returns:
+            Ticket to release when the response is complete
+
+        Raises:
+            Overloaded: If the session is over its rate limit, the queue
+                        is full or no slot frees up before the deadline
+        """
+        self._take_token(session_id)
+
+        loop = self._loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.queue_timeout
+        request_deadline_var.set(deadline)
+
+        if self._chat_slots.locked():
+            if self.chat_waiting >= self.queue_size:
+                raise self._shed("chat", "queue_full", self._retry_after())
+            self.chat_waiting += 1
+            ADMISSION_QUEUE_DEPTH.labels("chat").inc()
+            try:
+                acquired = await _acquire(self._chat_slots, self.queue_timeout)
+            finally:
+                self.chat_waiting -= 1
+                ADMISSION_QUEUE_DEPTH.labels("chat").dec()
+            if not acquired:
+                raise self._shed("chat", "deadline", self._retry_after())
+        else:
+            await self._chat_slots.acquire()
+
+        self.chat_in_flight += 1
+        ADMISSION_IN_FLIGHT.labels("chat").inc()
+        started = loop.time()
+
+        def release():
+            # Tickets may be released from a response's background task
+            loop.call_soon_threadsafe(self._release_chat, loop.time() - started)
+
+        return Ticket(release)
+
+    @asynccontextmanager
+    async def upstream(self, name: str):
+        """Hold one of an upstream's concurrency slots.
+
+        Waiting is bounded by the deadline set at admission, if any.
+
+        Args:
+            name: "llm" or "embedding"
+
+        Raises:
+            Overloaded: If no slot frees up before the deadline
+        """
+        slots = self._upstreams[name]
+        deadline = request_deadline_var.get()
+        self._loop = asyncio.get_running_loop()
+        if slots.locked():
+            timeout = None
+            if deadline is not None:
+                timeout = max(deadline - self._loop.time(), 0)
+            ADMISSION_QUEUE_DEPTH.labels(name).inc()
+            try:
+                acquired = await _acquire(slots, timeout)
+            finally:
+                ADMISSION_QUEUE_DEPTH.labels(name).dec()
+            if not acquired:
+                raise self._shed(name, "deadline", self._retry_after())
+        else:
+            await slots.acquire()
+
+        ADMISSION_IN_FLIGHT.labels(name).inc()
+        try:
+            yield
+        finally:
+            ADMISSION_IN_FLIGHT.labels(name).dec()
+            slots.release()
+
+    @contextmanager
+    def ingest_upstream(self, name: str):
+        """Hold one of an upstream's concurrency slots from an ingestion thread.
+
+        Waits first while chat requests are queued, so every call is a
+        preemption point, then shares the slots used by upstream() on the
+        event loop. Without a running event loop there is no chat traffic
+        to protect and the call proceeds unbounded.
+
+        Args:
+            name: "llm" or "embedding"
+        """
+        self.yield_to_chat()
+        loop = self._loop
+        if loop is None or not loop.is_running() or _running_loop() is loop:
+            # Blocking the loop's own thread on its semaphore would deadlock
+            yield
+            return
+
+        slots = self._upstreams[name]
+        ADMISSION_QUEUE_DEPTH.labels(name).inc()
+        try:
+            acquiring = asyncio.run_coroutine_threadsafe(slots.acquire(), loop)
+            while True:
+                try:
+                    acquiring.result(timeout=1)
+                    break
+                except concurrent.futures.TimeoutError:
+                    if not loop.is_running():
+                        # Shutting down; nothing is left to share with
+                        acquiring.cancel()
+                        loop = None
+                        break
+        finally:
+            ADMISSION_QUEUE_DEPTH.labels(name).dec()
+
+        if loop is None:
+            yield
+            return
+
+        ADMISSION_IN_FLIGHT.labels(name).inc()
+        try:
+            yield
+        finally:
+            ADMISSION_IN_FLIGHT.labels(name).dec()
+            loop.call_soon_threadsafe(slots.release)
+
+    def admit_ingest(self) -> Ticket:
+        """Accept an ingestion job or shed it.
+
+        Returns:
+            Ticket released by run_ingest once the job finishes
+
+        Raises:
+            Overloaded: If too many ingestion jobs are already pending
+        """
+        with self._ingest_lock:
+            if self.ingest_pending >= self.ingest_max_pending:
+                raise self._shed("ingest", "queue_full", 30)
+            self.ingest_pending += 1
+
+        def release():
+            with self._ingest_lock:
+                self.ingest_pending -= 1
+
+        return Ticket(release)
+
+    def run_ingest(self, ticket: Ticket, job, *args):
+        """Run an admitted ingestion job on the current (worker) thread.
+
+        Args:
+            ticket: Ticket from admit_ingest
+            job: Ingestion function
+            *args: Arguments for job
+        """
+        try:
+            ADMISSION_QUEUE_DEPTH.labels("ingest").inc()
+            try:
+                self._ingest_slots.acquire()
+            finally:
+                ADMISSION_QUEUE_DEPTH.labels("ingest").dec()
+            ADMISSION_IN_FLIGHT.labels("ingest").inc()
+            name = getattr(job, "__name__", "job")
+            started = time.monotonic()
+            logger.info("Ingestion job %s started", name)
+            try:
+                result = job(*args)
+            except Exception:
+                logger.exception("Ingestion job %s failed", name)
+                raise
+            else:
+                logger.info("Ingestion job %s finished in %.1fs", name, time.monotonic() - started)
+                return result
+            finally:
+                ADMISSION_IN_FLIGHT.labels("ingest").dec()
+                self._ingest_slots.release()
+        finally:
+            ticket.release()
+
+    def yield_to_chat(self):
+        """Block an ingestion thread while chat requests are queued.
+
+        Called between ingestion batches and before each embedding batch.
+        The pause is capped at ingest_yield_max so ingestion cannot starve
+        entirely.
+        """
+        if self.chat_waiting == 0:
+            return
+        started = time.monotonic()
+        give_up = started + self.ingest_yield_max
+        while self.chat_waiting > 0 and time.monotonic() < give_up:
+            time.sleep(0.05)
+        logger.info("Ingestion paused %.2fs for queued chat requests", time.monotonic() - started)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get queue depths and shed counts.
+
+        Returns:
+            Dictionary of admission counters
+        """
+        return {
+            "chat_in_flight": self.chat_in_flight,
+            "chat_waiting": self.chat_waiting,
+            "ingest_pending": self.ingest_pending,
+            "service_time_seconds": self._service_time,
+            "shed": dict(self.shed)
+        }
+
+    def _release_chat(self, elapsed: float):
+        self.chat_in_flight -= 1
+        ADMISSION_IN_FLIGHT.labels("chat").dec()
+        self._service_time = 0.9 * self._service_time + 0.1 * elapsed
+        self._chat_slots.release()
+
+    def _retry_after(self) -> float:
+        """Estimate how long the current chat backlog takes to drain."""
+        return (self.chat_waiting + 1) * self._service_time / self.max_concurrency
+
+    def _take_token(self, session_id: str):
+        """Charge one message to a session's token bucket."""
+        if self.session_rate <= 0:
+            return
+        now = time.monotonic()
+        if len(self._buckets) > 10000:
+            # Forget sessions whose buckets have refilled
+            full = self.session_burst / self.session_rate
+            self._buckets = {
+                key: bucket for key, bucket in self._buckets.items() if now - bucket[1] < full
+            }
+        tokens, updated = self._buckets.get(session_id, (self.session_burst, now))
+        tokens = min(self.session_burst, tokens + (now - updated) * self.session_rate)
+        if tokens < 1:
+            self._buckets[session_id] = (tokens, now)
+            raise self._shed("session", "rate_limited", (1 - tokens) / self.session_rate, 429)
+        self._buckets[session_id] = (tokens - 1, now)
+
+    def _shed(self, lane: str, reason: str, retry_after: float,
+              status_code: int = 503) -> Overloaded:
+        """Count a rejected request and build its error."""
+        SHED_REQUESTS.labels(lane, reason).inc()
+        logger.debug("Shedding %s request: %s", lane, reason)
+        key = f"{lane}:{reason}"
+        self.shed[key] = self.shed.get(key, 0) + 1
+        return Overloaded(f"Server busy ({lane} {reason.replace('_', ' ')})", status_code, retry_after)
@@ -0,0 +1,178 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from rag.chunking import parent_id
+
+
+class SemanticAnswerCache:
+    """Cache of LLM answers keyed on query embedding similarity.
+
+    A cached answer is reused when a new query's embedding is within the
+    cosine similarity threshold of a cached query and the same passages
+    were packed into the prompt. Passages are compared as a set, by article
+    ID, content fingerprint and text, so paraphrases that rank the wider
+    candidate list differently still share an answer. Entries expire after
+    a TTL and the least recently used entry is evicted when the cache is
+    full.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl: float = 900,
+                 threshold: float = 0.95):
+        """Initialize the answer cache.
+
+        Args:
+            max_entries: Maximum number of cached answers
+            ttl: Seconds an answer stays valid
+            threshold: Minimum cosine similarity between queries
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+        self._entries = OrderedDict()
+        self._next_key = 0
+        self._lock = threading.Lock()
+
+        # Normalized query embeddings stacked for vectorized lookup,
+        # rebuilt lazily after the entry set changes
+        self._matrix = None
+        self._matrix_keys = []
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def context_key(passages: List[Dict[str, Any]]) -> FrozenSet[Tuple[str, str, str]]:
+        """Identify the context packed into a prompt.
+
+        Args:
+            passages: Passages sent to the LLM
+
+        Returns:
+            Set of (article ID, fingerprint, text digest) tuples
+        """
+        return frozenset(
+            (
+                passage["article_id"],
+                passage["metadata"].get("fingerprint", ""),
+                hashlib.sha1(passage["text"].encode("utf-8")).hexdigest()
+            )
+            for passage in passages
+        )
+
+    def lookup(self, query_embedding, context_key) -> Optional[str]:
+        """Find a cached answer for a similar query over the same context.
+
+        Args:
+            query_embedding: Embedding of the new query
+            context_key: Result of context_key() for the new query
+
+        Returns:
+            The cached answer, or None on a miss
+        """
+        query = self._normalize(query_embedding)
+
+        with self._lock:
+            self._expire()
+            if not self._entries:
+                self.misses += 1
+                return None
+
+            if self._matrix is None:
+                self._matrix_keys = list(self._entries.keys())
+                self._matrix = np.stack([self._entries[k]["embedding"] for k in self._matrix_keys])
+
+            similarities = self._matrix @ query
+            for index in np.argsort(-similarities):
+                if similarities[index] < self.threshold:
+                    break
+                key = self._matrix_keys[index]
+                entry = self._entries[key]
+                if entry["context_key"] == context_key:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry["answer"]
+
+            self.misses += 1
+            return None
+
+    def store(self, query_embedding, context_key, answer: str):
+        """Cache an answer.
+
+        Args:
+            query_embedding: Embedding of the query
+            context_key: Result of context_key() for the query
+            answer: LLM answer
+        """
+        with self._lock:
+            self._entries[self._next_key] = {
+                "embedding": self._normalize(query_embedding),
+                "context_key": context_key,
+                "article_ids": {article for article, _, _ in context_key},
+                "answer": answer,
+                "created_at": time.time()
+            }
+            self._next_key += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            self._matrix = None
+
+    def invalidate_documents(self, ids: Iterable[str]):
+        """Drop cached answers built from any of the given documents.
+
+        Args:
+            ids: IDs of articles or chunks that were changed or deleted
+        """
+        ids = {parent_id(doc_id) for doc_id in ids}
+        if not ids:
+            return
+
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if entry["article_ids"] & ids]
+            for key in stale:
+                del self._entries[key]
+            if stale:
+                self.invalidations += len(stale)
+                self._matrix = None
+
+    def stats(self) -> Dict[str, int]:
+        """Get cache counters.
+
+        Returns:
+            Dictionary of hit/miss/eviction counters and size
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+                "capacity": self.max_entries
+            }
+
+    def _expire(self):
+        """Remove entries older than the TTL. Must be called with the lock held."""
+        cutoff = time.time() - self.ttl
+        expired = [key for key, entry in self._entries.items() if entry["created_at"] < cutoff]
+        for key in expired:
+            del self._entries[key]
+        if expired:
+            self.expirations += len(expired)
+            self._matrix = None
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        """L2-normalize an embedding so a dot product is cosine similarity."""
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
@@ -1,18 +1,39 @@
-from typing import List, Dict, Any
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple
 from rag.embeddings import EmbeddingModel
-from rag.vector_store import VectorStore
+from rag.embedding_cache import EmbeddingCache
+from rag.vector_store import BaseVectorStore
 from rag.llm import LLMService
-from services.session_service import SessionService
-from config import TOP_K
+from services.session_service import BaseSessionService
+from services.answer_cache import SemanticAnswerCache
+from rag.chunking import merge_search_results
+from rag.context import pack_passages
+from rag.tokens import estimate_tokens
+from rag.keyword_index import KeywordIndex
+from rag.filters import matches_where
+from rag.ranking import blend_recency, mmr_select, reciprocal_rank_fusion
+from services.admission import AdmissionController
+from config import (
+    TOP_K, SEARCH_WORKERS, CHUNK_OVERFETCH, RECENCY_WEIGHT, RECENCY_HALF_LIFE_HOURS, RRF_K,
+    CONTEXT_MAX_CHUNKS, MMR_LAMBDA, CONTEXT_TOKEN_BUDGET, SINGLE_FLIGHT_ENABLED
+)
+from metrics import CACHE_EVENTS, LLM_TOKENS, count_errors, observe_stage, stage_timer
 
 class ChatService:
     """Service for handling chat interactions."""
     
     def __init__(self, 
                  embedding_model: EmbeddingModel,
-                 vector_store: VectorStore,
+                 vector_store: BaseVectorStore,
                  llm_service: LLMService,
-                 session_service: SessionService):
+                 session_service: BaseSessionService,
+                 answer_cache: Optional[SemanticAnswerCache] = None,
+                 keyword_index: Optional[KeywordIndex] = None,
+                 admission: Optional[AdmissionController] = None):
         """Initialize the chat service.
         
         Args:
@@ -20,55 +41,458 @@ class ChatService:
             vector_store: Vector store
             llm_service: LLM service
             session_service: Session service
+            answer_cache: Optional semantic cache of previous answers
+            keyword_index: Optional BM25 index fused with vector search
+            admission: Optional admission controller bounding LLM calls
         """
         self.embedding_model = embedding_model
         self.vector_store = vector_store
         self.llm_service = llm_service
         self.session_service = session_service
+        self.answer_cache = answer_cache
+        self.keyword_index = keyword_index
+        self.admission = admission
+        
+        # Generations in progress, shared by identical concurrent requests
+        self._inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+        
+        # Blocking vector store queries run here instead of on the event loop
+        self.search_executor = ThreadPoolExecutor(
+            max_workers=SEARCH_WORKERS,
+            thread_name_prefix="vector-search"
+        )
     
-    def process_message(self, session_id: str, message: str) -> str:
+    def process_message(self, session_id: str, message: str,
+                        where: Optional[Dict[str, Any]] = None) -> str:
         """Process a user message and generate a response.
         
         Args:
             session_id: Session ID
             message: User message
+            where: Optional metadata filter restricting the articles searched
             
         Returns:
             Assistant response
         """
-        # Add user message to history
-        self.session_service.add_message(session_id, {
-            "role": "user",
-            "content": message
-        })
-
-        
-        # Get chat history
-        history = self.session_service.get_chat_history(session_id)
+        history = self._start_turn(session_id, message)
         
         # Generate query embedding
-        query_embedding = self.embedding_model._get_embeddings(message)[0]
+        with stage_timer("embed"), count_errors("embedding"):
+            query_embedding = self.embedding_model._get_embeddings([message])[0]
         
         # Retrieve relevant contexts
-        search_results = self.vector_store.search(query_embedding, top_k=TOP_K)
-        contexts = search_results["documents"][0]
-        
-        # Generate response
-        response = self.llm_service.generate_response(
-            query=message,
-            contexts=contexts,
-            chat_history=history[:-1]  # Exclude the latest user message
+        with stage_timer("search"):
+            search_results = self._search(message, query_embedding, where)
+        with stage_timer("prompt_build"):
+            passages = self._assemble_context(search_results)
+            contexts = self._contexts(passages)
+        
+        response = self._cached_answer(history, query_embedding, passages)
+        if response is None:
+            # Generate response
+            with stage_timer("llm"), count_errors("llm"):
+                response = self.llm_service.generate_response(
+                    query=message,
+                    contexts=contexts,
+                    chat_history=history[:-1]  # Exclude the latest user message
+                )
+            self._count_tokens(message, contexts, history, response)
+            self._cache_answer(history, query_embedding, passages, response)
+        
+        self._finish_turn(session_id, response)
+        return response
+    
+    async def aprocess_message(self, session_id: str, message: str,
+                               where: Optional[Dict[str, Any]] = None) -> str:
+        """Process a user message without blocking the event loop.
+        
+        Args:
+            session_id: Session ID
+            message: User message
+            where: Optional metadata filter restricting the articles searched
+            
+        Returns:
+            Assistant response
+        """
+        history = await self.session_service.acall(self._start_turn, session_id, message)
+        
+        query_embedding, search_results = await self._aretrieve(message, where)
+        with stage_timer("prompt_build"):
+            passages = self._assemble_context(search_results)
+            contexts = self._contexts(passages)
+        
+        key = self._flight_key(history, message, passages)
+        response = self._cached_answer(history, query_embedding, passages)
+        if response is None:
+            response = await self._join_flight(key)
+        if response is None:
+            flight = self._lead_flight(key)
+            try:
+                async with self._upstream("llm"):
+                    with stage_timer("llm"), count_errors("llm"):
+                        response = await self.llm_service.agenerate_response(
+                            query=message,
+                            contexts=contexts,
+                            chat_history=history[:-1]  # Exclude the latest user message
+                        )
+            except BaseException as e:
+                self._land_flight(key, flight, error=e)
+                raise
+            self._land_flight(key, flight, response)
+            self._count_tokens(message, contexts, history, response)
+            self._cache_answer(history, query_embedding, passages, response)
+        
+        await self.session_service.acall(self._finish_turn, session_id, response)
+        return response
+    
+    async def astream_message(self, session_id: str, message: str,
+                              where: Optional[Dict[str, Any]] = None) -> AsyncIterator[Tuple[str, Any]]:
+        """Process a user message and stream the response.
+        
+        The retrieved sources are emitted before any tokens, and the
+        assistant message is saved to the session once the stream completes.
+        
+        Args:
+            session_id: Session ID
+            message: User message
+            where: Optional metadata filter restricting the articles searched
+            
+        Yields:
+            (event, data) tuples: ("sources", list of source metadata),
+            then ("token", text) per chunk, then ("done", full response)
+        """
+        history = await self.session_service.acall(self._start_turn, session_id, message)
+        
+        query_embedding, search_results = await self._aretrieve(message, where)
+        with stage_timer("prompt_build"):
+            passages = self._assemble_context(search_results)
+            contexts = self._contexts(passages)
+        yield "sources", self._sources(passages)
+        
+        key = self._flight_key(history, message, passages)
+        response = self._cached_answer(history, query_embedding, passages)
+        if response is None:
+            response = await self._join_flight(key)
+        if response is not None:
+            yield "token", response
+        else:
+            chunks = []
+            started = time.perf_counter()
+            flight = self._lead_flight(key)
+            try:
+                async with self._upstream("llm"):
+                    with stage_timer("llm"), count_errors("llm"):
+                        async for chunk in self.llm_service.astream_response(
+                            query=message,
+                            contexts=contexts,
+                            chat_history=history[:-1]  # Exclude the latest user message
+                        ):
+                            if not chunks:
+                                observe_stage("llm_first_token", time.perf_counter() - started)
+                            chunks.append(chunk)
+                            yield "token", chunk
+            except BaseException as e:
+                # Also reached when the client disconnects mid-stream
+                self._land_flight(key, flight, error=e)
+                raise
+            
+            response = "".join(chunks)
+            self._land_flight(key, flight, response)
+            self._count_tokens(message, contexts, history, response)
+            self._cache_answer(history, query_embedding, passages, response)
+        
+        await self.session_service.acall(self._finish_turn, session_id, response)
+        yield "done", response
+    
+    async def _aretrieve(self, message: str, where: Optional[Dict[str, Any]] = None):
+        """Embed the query and search the vector store off the event loop.
+        
+        Args:
+            message: User message
+            where: Optional metadata filter
+            
+        Returns:
+            Tuple of (query embedding, vector store search results)
+        """
+        with stage_timer("embed"), count_errors("embedding"):
+            query_embedding = await self.embedding_model.aembed_query(message)
+        
+        loop = asyncio.get_running_loop()
+        with stage_timer("search"):
+            search_results = await loop.run_in_executor(
+                self.search_executor, self._search, message, query_embedding, where
+            )
+        return query_embedding, search_results
+    
+    def _search(self, message: str, query_embedding: List[float],
+                where: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Retrieve candidate chunks for a query.
+        
+        Vector hits are ranked by similarity blended with freshness. With a
+        keyword index, BM25 hits are fused with them by reciprocal rank
+        fusion, which recovers exact names and tickers that dense search
+        misses. The filter is applied inside the vector index, so excluded
+        articles never take up candidate slots.
+        
+        Args:
+            message: User message
+            query_embedding: Query embedding
+            where: Optional metadata filter
+            
+        Returns:
+            Search results in the vector store format, best first
+        """
+        candidates = TOP_K * CHUNK_OVERFETCH
+        search_results = self.vector_store.search(
+            query_embedding, top_k=candidates, where=where, include_embeddings=True
         )
+        search_results = blend_recency(search_results, RECENCY_WEIGHT, RECENCY_HALF_LIFE_HOURS * 3600)
         
-        # Add assistant response to history
-        self.session_service.add_message(session_id, {
-            "role": "user",
-            "content": message
-        })
-
+        if self.keyword_index is None:
+            return search_results
+        
+        keyword_results = self._keyword_search(message, candidates, where)
+        return reciprocal_rank_fusion([search_results, keyword_results], k=RRF_K, limit=candidates)
+    
+    def _keyword_search(self, message: str, top_k: int,
+                        where: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Rank chunks against the message with BM25.
+        
+        Args:
+            message: User message
+            top_k: Maximum number of results
+            where: Optional metadata filter
+            
+        Returns:
+            Search results in the vector store format, with embeddings.
+            Distances are None because they are not computed for keyword hits.
+        """
+        # Over-fetch when filtering, since the filter is applied afterwards
+        hits = self.keyword_index.search(message, top_k=top_k * (4 if where else 1))
+        stored = self.vector_store.get_documents([doc_id for doc_id, _ in hits])
         
+        ids = [
+            doc_id for doc_id, _ in hits
+            if doc_id in stored and matches_where(stored[doc_id][1], where)
+        ][:top_k]
+        embeddings = self.vector_store.get_embeddings(ids)
+        return {
+            "ids": [ids],
+            "documents": [[stored[doc_id][0] for doc_id in ids]],
+            "metadatas": [[stored[doc_id][1] for doc_id in ids]],
+            "distances": [[None for _ in ids]],
+            "embeddings": [[embeddings.get(doc_id) for doc_id in ids]]
+        }
+    
+    def _assemble_context(self, search_results: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Turn ranked candidate chunks into the passages sent to the LLM.
+        
+        Maximal marginal relevance drops chunks that repeat better-ranked
+        ones, the survivors are stitched into per-article passages, and the
+        passages are packed into CONTEXT_TOKEN_BUDGET, so prompt size per
+        turn is bounded regardless of how much was retrieved.
+        
+        Args:
+            search_results: Candidate chunks with embeddings, best first
+            
+        Returns:
+            Passages from merge_search_results that fit the budget
+        """
+        selected = mmr_select(search_results, CONTEXT_MAX_CHUNKS, MMR_LAMBDA)
+        passages = merge_search_results(selected, TOP_K)
+        return pack_passages(passages, CONTEXT_TOKEN_BUDGET)
+    
+    def _history_independent(self, history: List[Dict[str, str]]) -> bool:
+        """Check whether earlier turns could influence the answer.
+        
+        Args:
+            history: Chat history including the current user message
+            
+        Returns:
+            True if the current message is the first in the session
+        """
+        return len(history) <= 1
+    
+    def _cached_answer(self, history, query_embedding, passages) -> Optional[str]:
+        """Look up a semantically cached answer for this turn.
+        
+        Args:
+            history: Chat history including the current user message
+            query_embedding: Embedding of the user message
+            passages: Passages packed into the prompt
+            
+        Returns:
+            The cached answer, or None if there is none or caching does
+            not apply to this turn
+        """
+        if self.answer_cache is None or not self._history_independent(history):
+            return None
+        response = self.answer_cache.lookup(
+            query_embedding, SemanticAnswerCache.context_key(passages)
+        )
+        CACHE_EVENTS.labels("answer", "hit" if response is not None else "miss").inc()
         return response
     
+    def _cache_answer(self, history, query_embedding, passages, response: str):
+        """Store a freshly generated answer in the semantic cache."""
+        if self.answer_cache is None or not self._history_independent(history):
+            return
+        self.answer_cache.store(
+            query_embedding, SemanticAnswerCache.context_key(passages), response
+        )
+    
+    def _upstream(self, name: str):
+        """Hold a concurrency slot of an upstream, if admission control is on."""
+        if self.admission is None:
+            return nullcontext()
+        return self.admission.upstream(name)
+    
+    def _flight_key(self, history: List[Dict[str, str]], message: str,
+                    passages: List[Dict[str, Any]]) -> Optional[Tuple[str, str]]:
+        """Key identical requests whose generation can be shared.
+        
+        Returns:
+            (normalized query, packed context key), or None if sharing
+            does not apply to this turn
+        """
+        if not SINGLE_FLIGHT_ENABLED or not self._history_independent(history):
+            return None
+        return (
+            EmbeddingCache.normalize(message).lower(),
+            SemanticAnswerCache.context_key(passages)
+        )
+    
+    async def _join_flight(self, key: Optional[Tuple[str, str]]) -> Optional[str]:
+        """Wait for the answer of an identical request already generating.
+        
+        Args:
+            key: Key from _flight_key
+            
+        If the request being waited on is abandoned, the waiter joins the
+        request that took over generating, if any, so the waiters of a
+        cancelled flight do not all start generating at once.
+        
+        Returns:
+            The shared answer, or None if there is no such request or the
+            last one was abandoned before finishing
+            
+        Raises:
+            Exception: The error the shared generation failed with
+        """
+        flight = self._inflight.get(key) if key is not None else None
+        if flight is None:
+            return None
+        CACHE_EVENTS.labels("single_flight", "hit").inc()
+        while True:
+            # Waiting does not cancel the flight if this caller goes away
+            await asyncio.wait([flight])
+            if not flight.cancelled():
+                return flight.result()
+            flight = self._inflight.get(key)
+            if flight is None:
+                return None
+    
+    def _lead_flight(self, key: Optional[Tuple[str, str]]) -> Optional[asyncio.Future]:
+        """Register this request as the one generating the answer for key."""
+        if key is None:
+            return None
+        CACHE_EVENTS.labels("single_flight", "miss").inc()
+        flight = asyncio.get_running_loop().create_future()
+        self._inflight[key] = flight
+        return flight
+    
+    def _land_flight(self, key: Optional[Tuple[str, str]], flight: Optional[asyncio.Future],
+                     response: Optional[str] = None, error: Optional[BaseException] = None):
+        """Hand the answer, or the failure, to requests waiting on a flight."""
+        if flight is None:
+            return
+        if self._inflight.get(key) is flight:
+            del self._inflight[key]
+        if error is None:
+            flight.set_result(response)
+        elif isinstance(error, Exception):
+            flight.set_exception(error)
+            # Mark the error retrieved; it is re-raised by the leader anyway
+            flight.exception()
+        else:
+            # Cancelled leader: waiters generate their own answer
+            flight.cancel()
+    
+    def _count_tokens(self, message: str, contexts: List[str],
+                      history: List[Dict[str, str]], response: str):
+        """Record estimated prompt and completion tokens of an LLM call."""
+        prompt = [message] + contexts + [turn["content"] for turn in history[:-1]]
+        LLM_TOKENS.labels("prompt").inc(sum(estimate_tokens(text) for text in prompt))
+        LLM_TOKENS.labels("completion").inc(estimate_tokens(response))
+    
+    def _contexts(self, passages: List[Dict[str, Any]]) -> List[str]:
+        """Format merged passages as LLM context.
+        
+        Args:
+            passages: Passages from merge_search_results
+            
+        Returns:
+            List of context strings, each headed by its article title
+        """
+        return [
+            f"{passage['metadata'].get('title', '')}\n\n{passage['text']}"
+            for passage in passages
+        ]
+    
+    def _sources(self, passages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Extract source metadata to show alongside a response.
+        
+        Args:
+            passages: Passages from merge_search_results
+            
+        Returns:
+            List of source dictionaries
+        """
+        return [
+            {
+                "title": metadata.get("title", ""),
+                "url": metadata.get("url", ""),
+                "source": metadata.get("source", ""),
+                "published": metadata.get("published", ""),
+                "alternates": json.loads(metadata.get("alternates") or "[]")
+            }
+            for metadata in (passage["metadata"] for passage in passages)
+        ]
+    
+    def _start_turn(self, session_id: str, message: str) -> List[Dict[str, str]]:
+        """Record the user message and return the updated history.
+        
+        Args:
+            session_id: Session ID
+            message: User message
+            
+        Returns:
+            Chat history including the new message
+        """
+        # Add user message to history
+        with stage_timer("session_write"):
+            self.session_service.add_message(session_id, {
+                "role": "user",
+                "content": message
+            })
+        
+        # Get chat history
+        with stage_timer("session_read"):
+            return self.session_service.get_chat_history(session_id)
+    
+    def _finish_turn(self, session_id: str, response: str):
+        """Record the assistant response.
+        
+        Args:
+            session_id: Session ID
+            response: Assistant response
+        """
+        with stage_timer("session_write"):
+            self.session_service.add_message(session_id, {
+                "role": "assistant",
+                "content": response
+            })
+    
     def get_chat_history(self, session_id: str) -> List[Dict[str, str]]:
         """Get chat history for a session.
         
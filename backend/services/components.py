@@ -0,0 +1,187 @@
+import asyncio
+import threading
+from typing import Any, Callable, Dict
+
+from config import (
+    DATA_PATH, LLM_BACKEND, ANSWER_CACHE_SIZE, ANSWER_CACHE_TTL, ANSWER_CACHE_THRESHOLD,
+    HYBRID_SEARCH, KEYWORD_INDEX_PATH, DEDUPE_ENABLED, ADMISSION_CONTROL
+)
+
+class Components:
+    """Application components, each constructed on first use.
+    
+    Building the embedding, vector store and LLM clients is deferred until a
+    request or the warm-up task needs them, so the API can start accepting
+    traffic immediately. Each component has its own construction lock, so
+    building one never waits on another that does not depend on it; warm-up
+    builds the heavy ones on a worker thread while requests arrive on the
+    event loop.
+    
+    Coroutines get components through aget(), which builds missing ones on
+    a worker thread. The cheap components in LIGHT are built at startup by
+    build_light(), so coroutines can use them directly.
+    """
+    
+    # Components that are cheap to construct and used on every request
+    LIGHT = ("admission", "session_service", "answer_cache")
+    
+    def __init__(self):
+        """Initialize the component registry."""
+        self._instances: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+    
+    def is_built(self, name: str) -> bool:
+        """Check whether a component has been constructed.
+        
+        Args:
+            name: Component name
+            
+        Returns:
+            True if the component exists
+        """
+        return name in self._instances
+    
+    def build_light(self):
+        """Construct the cheap components; call once at startup."""
+        for name in self.LIGHT:
+            getattr(self, name)
+    
+    async def aget(self, name: str) -> Any:
+        """Return a component from a coroutine without blocking the event loop.
+        
+        A component that is not built yet is constructed on a worker thread,
+        waiting there if warm-up is already building it.
+        
+        Args:
+            name: Component name
+            
+        Returns:
+            The component
+        """
+        if name in self._instances:
+            return self._instances[name]
+        return await asyncio.get_running_loop().run_in_executor(None, getattr, self, name)
+    
+    def _get(self, name: str, factory: Callable[[], Any]) -> Any:
+        """Return a component, constructing it once on first access."""
+        if name in self._instances:
+            return self._instances[name]
+        with self._lock:
+            lock = self._locks.setdefault(name, threading.Lock())
+        # Held only while this component is built; its dependencies take
+        # their own locks, always in dependency order
+        with lock:
+            if name not in self._instances:
+                self._instances[name] = factory()
+        return self._instances[name]
+    
+    @property
+    def embedding_model(self):
+        def build():
+            from rag.embeddings import EmbeddingModel
+            admission = self.admission
+            if admission is None:
+                return EmbeddingModel()
+            return EmbeddingModel(
+                async_limit=lambda: admission.upstream("embedding"),
+                # Blocking calls come from ingestion threads
+                sync_limit=lambda: admission.ingest_upstream("embedding")
+            )
+        return self._get("embedding_model", build)
+    
+    @property
+    def admission(self):
+        def build():
+            if not ADMISSION_CONTROL:
+                return None
+            from services.admission import AdmissionController
+            return AdmissionController()
+        return self._get("admission", build)
+    
+    @property
+    def vector_store(self):
+        def build():
+            from rag.vector_store import create_vector_store
+            return create_vector_store()
+        return self._get("vector_store", build)
+    
+    @property
+    def keyword_index(self):
+        def build():
+            if not HYBRID_SEARCH:
+                return None
+            from rag.keyword_index import KeywordIndex
+            return KeywordIndex(KEYWORD_INDEX_PATH)
+        return self._get("keyword_index", build)
+    
+    @property
+    def duplicate_detector(self):
+        def build():
+            if not DEDUPE_ENABLED:
+                return None
+            from rag.dedupe import create_duplicate_detector
+            return create_duplicate_detector()
+        return self._get("duplicate_detector", build)
+    
+    @property
+    def llm_service(self):
+        def build():
+            if LLM_BACKEND == "fake":
+                from rag.fake_llm import FakeLLMService
+                return FakeLLMService()
+            from rag.llm import LLMService
+            return LLMService()
+        return self._get("llm_service", build)
+    
+    @property
+    def session_service(self):
+        def build():
+            from services.session_service import create_session_service
+            return create_session_service()
+        return self._get("session_service", build)
+    
+    @property
+    def answer_cache(self):
+        def build():
+            if ANSWER_CACHE_SIZE <= 0:
+                return None
+            from services.answer_cache import SemanticAnswerCache
+            return SemanticAnswerCache(
+                max_entries=ANSWER_CACHE_SIZE,
+                ttl=ANSWER_CACHE_TTL,
+                threshold=ANSWER_CACHE_THRESHOLD
+            )
+        return self._get("answer_cache", build)
+    
+    @property
+    def article_ingestion(self):
+        def build():
+            from rag.article_ingestion import ArticleIngestion
+            ingestion = ArticleIngestion(
+                embedding_model=self.embedding_model,
+                vector_store=self.vector_store,
+                data_path=DATA_PATH,
+                keyword_index=self.keyword_index,
+                duplicate_detector=self.duplicate_detector,
+                throttle=self.admission.yield_to_chat if self.admission is not None else None
+            )
+            if self.answer_cache is not None:
+                ingestion.add_change_listener(self.answer_cache.invalidate_documents)
+            return ingestion
+        return self._get("article_ingestion", build)
+    
+    @property
+    def chat_service(self):
+        def build():
+            from services.chat_service import ChatService
+            return ChatService(
+                embedding_model=self.embedding_model,
+                vector_store=self.vector_store,
+                llm_service=self.llm_service,
+                session_service=self.session_service,
+                answer_cache=self.answer_cache,
+                keyword_index=self.keyword_index,
+                admission=self.admission
+            )
+        return self._get("chat_service", build)
@@ -0,0 +1,194 @@
+import json
+import time
+import uuid
+from typing import Any, Dict, List
+
+import redis
+
+from config import (
+    REDIS_HOST, REDIS_PORT, REDIS_DB, REDIS_TTL, REDIS_MAX_CONNECTIONS, SESSION_MAX_MESSAGES
+)
+from services.session_service import BaseSessionService
+
+class RedisSessionService(BaseSessionService):
+    """Session service backed by Redis.
+
+    Each session is stored as two keys sharing a sliding TTL:
+    ``session:{id}`` is a hash of session fields and
+    ``session:{id}:messages`` is a list of JSON-encoded messages, so an
+    append is a single RPUSH instead of a rewrite of the whole history.
+    Expiry is handled by Redis itself.
+    """
+
+    blocking_io = True
+
+    def __init__(self, client: redis.Redis = None, ttl: int = REDIS_TTL,
+                 max_messages: int = SESSION_MAX_MESSAGES):
+        """Initialize the Redis session service.
+
+        Args:
+            client: Redis client to use. Defaults to one backed by a
+                    connection pool built from the REDIS_* settings.
+            ttl: Seconds of inactivity before a session expires
+            max_messages: Maximum number of messages kept per session
+        """
+        if client is None:
+            pool = redis.ConnectionPool(
+                host=REDIS_HOST,
+                port=REDIS_PORT,
+                db=REDIS_DB,
+                max_connections=REDIS_MAX_CONNECTIONS,
+                decode_responses=True
+            )
+            client = redis.Redis(connection_pool=pool)
+        self.redis = client
+        self.ttl = ttl
+        self.max_messages = max_messages
+
+    @staticmethod
+    def _meta_key(session_id: str) -> str:
+        return f"session:{session_id}"
+
+    @staticmethod
+    def _messages_key(session_id: str) -> str:
+        return f"session:{session_id}:messages"
+
+    def create_session(self) -> str:
+        """Create a new chat session.
+
+        Returns:
+            str: A unique session identifier
+        """
+        session_id = str(uuid.uuid4())
+        now = time.time()
+
+        pipe = self.redis.pipeline()
+        pipe.hset(self._meta_key(session_id), mapping={
+            "created_at": json.dumps(now),
+            "updated_at": json.dumps(now)
+        })
+        pipe.expire(self._meta_key(session_id), self.ttl)
+        pipe.execute()
+
+        return session_id
+
+    def get_session(self, session_id: str) -> Dict[str, Any]:
+        """Get session data by ID.
+
+        Args:
+            session_id: The unique session identifier
+
+        Returns:
+            Dict containing session data
+
+        Raises:
+            ValueError: If session does not exist or has expired
+        """
+        pipe = self.redis.pipeline()
+        pipe.hgetall(self._meta_key(session_id))
+        pipe.lrange(self._messages_key(session_id), 0, -1)
+        fields, messages = pipe.execute()
+
+        if not fields:
+            raise ValueError(f"Session {session_id} not found")
+
+        session = {key: json.loads(value) for key, value in fields.items()}
+        session["messages"] = [json.loads(message) for message in messages]
+        return session
+
+    def update_session(self, session_id: str, data: Dict[str, Any]) -> None:
+        """Update session data.
+
+        Args:
+            session_id: The unique session identifier
+            data: The data to update. A "messages" entry replaces the
+                  whole message history.
+
+        Raises:
+            ValueError: If session does not exist
+        """
+        if not self.session_exists(session_id):
+            raise ValueError(f"Session {session_id} not found")
+
+        data = dict(data)
+        messages = data.pop("messages", None)
+        data["updated_at"] = time.time()
+
+        pipe = self.redis.pipeline()
+        pipe.hset(self._meta_key(session_id), mapping={
+            key: json.dumps(value) for key, value in data.items()
+        })
+        if messages is not None:
+            pipe.delete(self._messages_key(session_id))
+            if messages:
+                messages = messages[-self.max_messages:]
+                pipe.rpush(self._messages_key(session_id), *[json.dumps(m) for m in messages])
+        self._refresh_ttl(pipe, session_id)
+        pipe.execute()
+
+    def add_message(self, session_id: str, message: Dict[str, Any]) -> None:
+        """Add a message to the session history.
+
+        Args:
+            session_id: The unique session identifier
+            message: The message data including role and content
+
+        Raises:
+            ValueError: If session does not exist
+        """
+        # EXPIRE doubles as the existence check, so the append and the TTL
+        # refresh take a single round trip
+        pipe = self.redis.pipeline()
+        pipe.expire(self._meta_key(session_id), self.ttl)
+        pipe.rpush(self._messages_key(session_id), json.dumps(message))
+        pipe.ltrim(self._messages_key(session_id), -self.max_messages, -1)
+        pipe.expire(self._messages_key(session_id), self.ttl)
+        pipe.hset(self._meta_key(session_id), "updated_at", json.dumps(time.time()))
+        exists = pipe.execute()[0]
+
+        if not exists:
+            # Undo the orphan keys created by RPUSH/HSET on a missing session
+            self.redis.delete(self._meta_key(session_id), self._messages_key(session_id))
+            raise ValueError(f"Session {session_id} not found")
+
+    def session_exists(self, session_id: str) -> bool:
+        """Check if a session exists and hasn't expired.
+
+        Args:
+            session_id: Session ID
+
+        Returns:
+            True if session exists and is valid, False otherwise
+        """
+        return bool(self.redis.exists(self._meta_key(session_id)))
+
+    def get_chat_history(self, session_id: str) -> List[Dict[str, Any]]:
+        """Get all messages for a session.
+
+        Args:
+            session_id: The unique session identifier
+
+        Returns:
+            List of message objects
+
+        Raises:
+            ValueError: If session does not exist
+        """
+        pipe = self.redis.pipeline()
+        pipe.exists(self._meta_key(session_id))
+        pipe.lrange(self._messages_key(session_id), 0, -1)
+        exists, messages = pipe.execute()
+
+        if not exists:
+            raise ValueError(f"Session {session_id} not found")
+
+        return [json.loads(message) for message in messages]
+
+    def clear_session(self, session_id: str) -> None:
+        """Remove a session entirely."""
+        self.redis.delete(self._meta_key(session_id), self._messages_key(session_id))
+
+    def _refresh_ttl(self, pipe, session_id: str):
+        """Queue TTL refreshes for both session keys on a pipeline."""
+        pipe.expire(self._meta_key(session_id), self.ttl)
+        pipe.expire(self._messages_key(session_id), self.ttl)
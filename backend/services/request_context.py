@@ -0,0 +1,64 @@
+import random
+import time
+import uuid
+
+from config import TRACE_SAMPLE_RATE
+from metrics import REQUEST_SECONDS, request_id_var, trace_logger, trace_var
+
+class RequestContextMiddleware:
+    """ASGI middleware giving every request an ID, latency metrics and a sampled trace.
+
+    The request ID is taken from the X-Request-ID header or generated, and
+    returned in the response headers. Latency is measured until the last
+    body chunk is sent, so streamed responses are timed in full. A sample
+    of requests collect their stage timings and log them as one trace line.
+    """
+
+    def __init__(self, app, sample_rate: float = TRACE_SAMPLE_RATE):
+        """Initialize the middleware.
+
+        Args:
+            app: ASGI application to wrap
+            sample_rate: Fraction of requests whose trace is logged
+        """
+        self.app = app
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers", []))
+        request_id = headers.get(b"x-request-id", b"").decode("latin-1")[:64] or uuid.uuid4().hex
+        trace = [] if random.random() < self.sample_rate else None
+        request_id_token = request_id_var.set(request_id)
+        trace_token = trace_var.set(trace)
+
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_request_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-request-id", request_id.encode("latin-1"))
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            elapsed = time.perf_counter() - started
+            # Label by route template so session IDs do not explode cardinality
+            route = getattr(scope.get("route"), "path", "unmatched")
+            REQUEST_SECONDS.labels(scope["method"], route, str(status)).observe(elapsed)
+            if trace is not None:
+                stages = " ".join(f"{stage}={seconds * 1000:.1f}ms" for stage, seconds in trace)
+                trace_logger.info(
+                    f"request_id={request_id} {scope['method']} {route} status={status} "
+                    f"total={elapsed * 1000:.1f}ms {stages}"
+                )
+            request_id_var.reset(request_id_token)
+            trace_var.reset(trace_token)
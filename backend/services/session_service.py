@@ -1,13 +1,103 @@
-import json
+import asyncio
+import threading
 import uuid
 import time
-from typing import Dict, Any, List
+from collections import OrderedDict, deque
+from typing import Callable, Dict, Any, List
+from config import SESSION_BACKEND, SESSION_EXPIRY, SESSION_MAX_COUNT, SESSION_MAX_MESSAGES
 
-class SessionService:
-    def __init__(self):
-        """Initialize the session service with an in-memory store instead of Redis."""
-        self.sessions = {}  # In-memory store
-        self.session_expiry = 3600  # Session expiry in seconds (1 hour)
+class BaseSessionService:
+    """Interface shared by the session backends."""
+    
+    # True for backends whose calls wait on the network
+    blocking_io = False
+    
+    async def acall(self, func: Callable[..., Any], *args) -> Any:
+        """Run session calls from a coroutine.
+        
+        For backends with blocking_io the call runs on a worker thread, so
+        a round trip does not stall the event loop; otherwise it runs
+        inline.
+        
+        Args:
+            func: Function making the session calls, e.g. a bound method
+            *args: Arguments for func
+            
+        Returns:
+            Result of func
+        """
+        if self.blocking_io:
+            return await asyncio.to_thread(func, *args)
+        return func(*args)
+    
+    def create_session(self) -> str:
+        """Create a new chat session and return its ID."""
+        raise NotImplementedError
+    
+    def get_session(self, session_id: str) -> Dict[str, Any]:
+        """Get session data by ID, raising ValueError if missing or expired."""
+        raise NotImplementedError
+    
+    def update_session(self, session_id: str, data: Dict[str, Any]) -> None:
+        """Update session data, raising ValueError if the session is missing."""
+        raise NotImplementedError
+    
+    def add_message(self, session_id: str, message: Dict[str, Any]) -> None:
+        """Append a message to the session history."""
+        raise NotImplementedError
+    
+    def session_exists(self, session_id: str) -> bool:
+        """Check if a session exists and hasn't expired."""
+        raise NotImplementedError
+    
+    def get_chat_history(self, session_id: str) -> List[Dict[str, Any]]:
+        """Get all messages for a session."""
+        raise NotImplementedError
+    
+    def get_message_history(self, session_id: str) -> list:
+        """Get all messages for a session."""
+        return self.get_chat_history(session_id)
+    
+    def clear_session(self, session_id: str) -> None:
+        """Remove a session entirely."""
+        raise NotImplementedError
+    
+    def sweep_expired(self) -> int:
+        """Remove expired sessions and return how many were removed.
+        
+        Backends with native expiry can leave this as a no-op.
+        """
+        return 0
+
+class SessionService(BaseSessionService):
+    """In-memory session store with bounded memory.
+    
+    Sessions are kept in an OrderedDict ordered by last update, which is also
+    their expiry order, so expired sessions can be drained from the front
+    by sweep_expired() without scanning the rest. The number of sessions
+    and the number of messages per session are both capped.
+    """
+    
+    def __init__(self, session_expiry: int = SESSION_EXPIRY,
+                 max_sessions: int = SESSION_MAX_COUNT,
+                 max_messages: int = SESSION_MAX_MESSAGES):
+        """Initialize the session service with an in-memory store instead of Redis.
+        
+        Args:
+            session_expiry: Seconds of inactivity before a session expires
+            max_sessions: Maximum number of live sessions; the least recently
+                          updated session is evicted beyond this
+            max_messages: Maximum number of messages kept per session; the
+                          oldest messages are dropped beyond this
+        """
+        self.sessions = OrderedDict()  # In-memory store, oldest update first
+        self.session_expiry = session_expiry
+        self.max_sessions = max_sessions
+        self.max_messages = max_messages
+        self._lock = threading.RLock()
+        
+        self.expired_count = 0
+        self.evicted_count = 0
     
     def create_session(self) -> str:
         """Create a new chat session.
@@ -16,11 +106,18 @@ class SessionService:
             str: A unique session identifier
         """
         session_id = str(uuid.uuid4())
-        self.sessions[session_id] = {
-            "created_at": time.time(),
-            "updated_at": time.time(),
-            "messages": []
-        }
+        now = time.time()
+        
+        with self._lock:
+            while len(self.sessions) >= self.max_sessions:
+                self.sessions.popitem(last=False)
+                self.evicted_count += 1
+            
+            self.sessions[session_id] = {
+                "created_at": now,
+                "updated_at": now,
+                "messages": deque(maxlen=self.max_messages)
+            }
         return session_id
     
     def get_session(self, session_id: str) -> Dict[str, Any]:
@@ -35,17 +132,19 @@ class SessionService:
         Raises:
             ValueError: If session does not exist or has expired
         """
-        if session_id not in self.sessions:
-            raise ValueError(f"Session {session_id} not found")
-            
-        session = self.sessions[session_id]
-        
-        # Check if session has expired
-        if time.time() - session["updated_at"] > self.session_expiry:
-            del self.sessions[session_id]
-            raise ValueError(f"Session {session_id} has expired")
+        with self._lock:
+            if session_id not in self.sessions:
+                raise ValueError(f"Session {session_id} not found")
+                
+            session = self.sessions[session_id]
             
-        return session
+            # Check if session has expired
+            if self._is_expired(session, time.time()):
+                del self.sessions[session_id]
+                self.expired_count += 1
+                raise ValueError(f"Session {session_id} has expired")
+                
+            return session
     
     def update_session(self, session_id: str, data: Dict[str, Any]) -> None:
         """Update session data.
@@ -57,11 +156,16 @@ class SessionService:
         Raises:
             ValueError: If session does not exist
         """
-        if session_id not in self.sessions:
-            raise ValueError(f"Session {session_id} not found")
+        with self._lock:
+            if session_id not in self.sessions:
+                raise ValueError(f"Session {session_id} not found")
             
-        self.sessions[session_id].update(data)
-        self.sessions[session_id]["updated_at"] = time.time()
+            data = dict(data)
+            if "messages" in data:
+                data["messages"] = deque(data["messages"], maxlen=self.max_messages)
+                
+            self.sessions[session_id].update(data)
+            self._touch(session_id)
     
     def add_message(self, session_id: str, message: Dict[str, Any]) -> None:
         """Add a message to the session history.
@@ -73,28 +177,10 @@ class SessionService:
         Raises:
             ValueError: If session does not exist
         """
-        session = self.get_session(session_id)
-        
-        if "messages" not in session:
-            session["messages"] = []
-            
-        session["messages"].append(message)
-        self.update_session(session_id, {"messages": session["messages"]})
-    
-    def get_message_history(self, session_id: str) -> list:
-        """Get all messages for a session.
-        
-        Args:
-            session_id: The unique session identifier
-            
-        Returns:
-            List of message objects
-            
-        Raises:
-            ValueError: If session does not exist
-        """
-        session = self.get_session(session_id)
-        return session.get("messages", [])
+        with self._lock:
+            session = self.get_session(session_id)
+            session["messages"].append(message)
+            self._touch(session_id)
     
     def session_exists(self, session_id: str) -> bool:
         """Check if a session exists and hasn't expired.
@@ -105,14 +191,10 @@ class SessionService:
         Returns:
             True if session exists and is valid, False otherwise
         """
-        if session_id not in self.sessions:
-            return False
-
-        session = self.sessions[session_id]
-        if time.time() - session["updated_at"] > self.session_expiry:
-            del self.sessions[session_id]
+        try:
+            self.get_session(session_id)
+        except ValueError:
             return False
-
         return True
     
     def get_chat_history(self, session_id: str) -> List[Dict[str, Any]]:
@@ -127,10 +209,65 @@ class SessionService:
         Raises:
             ValueError: If session does not exist
         """
-        session = self.get_session(session_id)
-        return session.get("messages", [])
+        with self._lock:
+            return list(self.get_session(session_id)["messages"])
     
     def clear_session(self, session_id: str) -> None:
         """Remove a session entirely."""
-        if session_id in self.sessions:
-            del self.sessions[session_id]
+        with self._lock:
+            self.sessions.pop(session_id, None)
+    
+    def sweep_expired(self) -> int:
+        """Remove every expired session.
+        
+        Sessions are ordered by last update, so this stops at the first
+        session that is still live.
+        
+        Returns:
+            Number of sessions removed
+        """
+        now = time.time()
+        removed = 0
+        with self._lock:
+            while self.sessions:
+                session_id, session = next(iter(self.sessions.items()))
+                if not self._is_expired(session, now):
+                    break
+                del self.sessions[session_id]
+                removed += 1
+            self.expired_count += removed
+        return removed
+    
+    def stats(self) -> Dict[str, int]:
+        """Get session store counters.
+        
+        Returns:
+            Dictionary of live, expired and evicted session counts
+        """
+        with self._lock:
+            return {
+                "sessions": len(self.sessions),
+                "max_sessions": self.max_sessions,
+                "expired": self.expired_count,
+                "evicted": self.evicted_count
+            }
+    
+    def _touch(self, session_id: str):
+        """Mark a session as updated now. Must be called with the lock held."""
+        self.sessions[session_id]["updated_at"] = time.time()
+        self.sessions.move_to_end(session_id)
+    
+    def _is_expired(self, session: Dict[str, Any], now: float) -> bool:
+        """Check whether a session has been idle longer than the expiry."""
+        return now - session["updated_at"] > self.session_expiry
+
+def create_session_service() -> BaseSessionService:
+    """Build the session backend selected by SESSION_BACKEND.
+    
+    Returns:
+        A Redis-backed service for "redis", otherwise the in-memory one
+    """
+    if SESSION_BACKEND == "redis":
+        from services.redis_session_service import RedisSessionService
+        return RedisSessionService()
+    return SessionService()
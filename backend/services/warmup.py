@@ -0,0 +1,73 @@
+import threading
+import time
+from typing import Any, Dict, Optional
+
+class WarmupState:
+    """Progress of the background corpus warm-up."""
+    
+    WARMING = "warming"
+    READY = "ready"
+    FAILED = "failed"
+    
+    def __init__(self):
+        """Initialize the warm-up state."""
+        self.status = self.WARMING
+        self.articles_processed = 0
+        self.articles_indexed = 0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.error: Optional[str] = None
+        self._lock = threading.Lock()
+    
+    @property
+    def ready(self) -> bool:
+        return self.status == self.READY
+    
+    def start(self):
+        """Mark the warm-up as started."""
+        with self._lock:
+            self.status = self.WARMING
+            self.started_at = time.time()
+    
+    def progress(self, articles_processed: int, articles_indexed: int):
+        """Record progress, called after every ingested batch.
+        
+        Args:
+            articles_processed: Articles read from the log so far
+            articles_indexed: Articles embedded and written so far
+        """
+        with self._lock:
+            self.articles_processed = articles_processed
+            self.articles_indexed = articles_indexed
+    
+    def finish(self, error: Optional[Exception] = None):
+        """Mark the warm-up as finished.
+        
+        Args:
+            error: Exception that aborted the warm-up, if any
+        """
+        with self._lock:
+            self.finished_at = time.time()
+            if error is None:
+                self.status = self.READY
+            else:
+                self.status = self.FAILED
+                self.error = str(error)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the warm-up state for status endpoints.
+        
+        Returns:
+            Dictionary of status, progress counters and timings
+        """
+        with self._lock:
+            elapsed = None
+            if self.started_at is not None:
+                elapsed = (self.finished_at or time.time()) - self.started_at
+            return {
+                "status": self.status,
+                "articles_processed": self.articles_processed,
+                "articles_indexed": self.articles_indexed,
+                "elapsed_seconds": elapsed,
+                "error": self.error
+            }
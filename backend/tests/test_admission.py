@@ -0,0 +1,89 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from services.admission import AdmissionController, Overloaded, _acquire
+
+
+def test_timed_out_acquires_never_leak_slots():
+    async def main():
+        semaphore = asyncio.Semaphore(1)
+        loop = asyncio.get_running_loop()
+        for _ in range(200):
+            await semaphore.acquire()
+            # Free the slot right as the timeout fires
+            loop.call_later(0.001, semaphore.release)
+            if await _acquire(semaphore, 0.001):
+                semaphore.release()
+        return semaphore
+
+    semaphore = asyncio.run(main())
+    assert not semaphore.locked()
+    assert semaphore._value == 1
+
+
+def test_queued_chat_is_shed_at_the_deadline_and_capacity_recovers():
+    async def main():
+        admission = AdmissionController(max_concurrency=1, queue_size=4,
+                                        queue_timeout=0.05, session_rate=0)
+        ticket = await admission.admit_chat("a")
+        with pytest.raises(Overloaded) as shed:
+            await admission.admit_chat("b")
+        ticket.release()
+        await asyncio.sleep(0)
+        again = await asyncio.wait_for(admission.admit_chat("c"), 1)
+        stats = admission.stats()
+        again.release()
+        return shed.value, stats
+
+    shed, stats = asyncio.run(main())
+
+    assert shed.status_code == 503
+    assert stats["chat_in_flight"] == 1
+    assert stats["chat_waiting"] == 0
+    assert stats["shed"] == {"chat:deadline": 1}
+
+
+def test_ingestion_shares_the_embedding_limit_with_chat():
+    events = []
+
+    def ingest(admission):
+        with admission.ingest_upstream("embedding"):
+            events.append("ingest")
+
+    async def main():
+        admission = AdmissionController(embedding_limit=1, session_rate=0)
+        async with admission.upstream("embedding"):
+            worker = asyncio.create_task(asyncio.to_thread(ingest, admission))
+            await asyncio.sleep(0.2)
+            events.append("chat done")
+        await asyncio.wait_for(worker, 2)
+
+    asyncio.run(main())
+
+    assert events == ["chat done", "ingest"]
+
+
+def test_ingestion_yields_while_chat_is_queued():
+    admission = AdmissionController(session_rate=0, ingest_yield_max=0.2)
+    admission.chat_waiting = 1
+
+    started = time.monotonic()
+    with admission.ingest_upstream("embedding"):
+        waited = time.monotonic() - started
+
+    assert waited >= 0.2
+
+
+def test_ingestion_without_an_event_loop_is_not_blocked():
+    admission = AdmissionController(embedding_limit=1, session_rate=0)
+    done = threading.Event()
+
+    def ingest():
+        with admission.ingest_upstream("embedding"), admission.ingest_upstream("embedding"):
+            done.set()
+
+    threading.Thread(target=ingest).start()
+    assert done.wait(1)
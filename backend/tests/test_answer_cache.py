@@ -0,0 +1,58 @@
+import numpy as np
+
+from rag.chunking import merge_search_results
+from rag.context import pack_passages
+from services.answer_cache import SemanticAnswerCache
+
+
+def candidates(order, distances):
+    """Search results over three articles, ranked in the given order."""
+    chunks = {
+        "a#0": ("Rates rise again.", {"article_id": "a", "title": "Rates", "fingerprint": "fa"}),
+        "b#0": ("Markets fall.", {"article_id": "b", "title": "Markets", "fingerprint": "fb"}),
+        "c#0": ("Bonds rally.", {"article_id": "c", "title": "Bonds", "fingerprint": "fc"}),
+    }
+    return {
+        "ids": [order],
+        "documents": [[chunks[doc_id][0] for doc_id in order]],
+        "metadatas": [[chunks[doc_id][1] for doc_id in order]],
+        "distances": [distances],
+    }
+
+
+def packed(order, distances):
+    return pack_passages(merge_search_results(candidates(order, distances), 3), 1000)
+
+
+def test_paraphrased_queries_with_same_packed_context_hit():
+    cache = SemanticAnswerCache(threshold=0.9)
+    first = np.array([1.0, 0.1, 0.0])
+    paraphrase = np.array([1.0, 0.15, 0.02])
+
+    # The paraphrase ranks the candidates differently, with other scores
+    cache.store(first, SemanticAnswerCache.context_key(
+        packed(["a#0", "b#0", "c#0"], [0.1, 0.2, 0.3])), "answer")
+    key = SemanticAnswerCache.context_key(packed(["b#0", "c#0", "a#0"], [0.12, 0.18, 0.35]))
+
+    assert cache.lookup(paraphrase, key) == "answer"
+    assert cache.stats()["hits"] == 1
+
+
+def test_different_packed_context_misses():
+    cache = SemanticAnswerCache(threshold=0.9)
+    query = np.array([1.0, 0.0])
+
+    cache.store(query, SemanticAnswerCache.context_key(packed(["a#0", "b#0"], [0.1, 0.2])), "answer")
+
+    assert cache.lookup(query, SemanticAnswerCache.context_key(packed(["a#0", "c#0"], [0.1, 0.2]))) is None
+
+
+def test_changed_chunk_invalidates_answer():
+    cache = SemanticAnswerCache(threshold=0.9)
+    query = np.array([1.0, 0.0])
+    key = SemanticAnswerCache.context_key(packed(["a#0", "b#0"], [0.1, 0.2]))
+    cache.store(query, key, "answer")
+
+    cache.invalidate_documents(["b#0"])
+
+    assert cache.lookup(query, key) is None
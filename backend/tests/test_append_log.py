@@ -0,0 +1,121 @@
+from rag.append_log import AppendLog
+
+
+class Replica:
+    """Minimal store replaying an AppendLog into a dictionary."""
+
+    def __init__(self, path):
+        self.log = AppendLog(path)
+        self.values = {}
+        self.resets = 0
+
+    def refresh(self):
+        self.log.replay(self._apply, self._reset)
+
+    def _apply(self, record, offset):
+        self.values[record["key"]] = record["value"]
+
+    def _reset(self):
+        self.values = {}
+        self.resets += 1
+
+
+def test_replay_applies_only_new_records(tmp_path):
+    path = str(tmp_path / "log.jsonl")
+    writer, reader = AppendLog(path), Replica(path)
+
+    with writer.lock():
+        writer.append([{"key": "a", "value": 1}])
+    reader.refresh()
+    with writer.lock():
+        writer.append([{"key": "b", "value": 2}])
+    reader.refresh()
+
+    assert reader.values == {"a": 1, "b": 2}
+    assert reader.resets == 0
+
+
+def test_partial_line_is_left_for_the_next_replay(tmp_path):
+    path = tmp_path / "log.jsonl"
+    reader = Replica(str(path))
+
+    path.write_bytes(b'{"key": "a", "value": 1}\n{"key": "b", ')
+    reader.refresh()
+    assert reader.values == {"a": 1}
+
+    with open(path, 'ab') as f:
+        f.write(b'"value": 2}\n')
+    reader.refresh()
+    assert reader.values == {"a": 1, "b": 2}
+
+
+def test_rewrite_then_longer_append_replays_from_start(tmp_path):
+    path = str(tmp_path / "log.jsonl")
+    writer, reader = Replica(path), Replica(path)
+
+    with writer.log.lock():
+        writer.log.append([{"key": f"k{i}", "value": i} for i in range(10)])
+    reader.refresh()
+    assert len(reader.values) == 10
+
+    # Compact down to one record, then grow past the old size
+    with writer.log.lock():
+        writer.log.rewrite([{"key": "k9", "value": 9}])
+        writer.log.append([{"key": f"n{i}", "value": i} for i in range(20)])
+    assert reader.log.offset < (tmp_path / "log.jsonl").stat().st_size
+
+    reader.refresh()
+    assert reader.resets == 1
+    assert "k0" not in reader.values
+    assert reader.values["k9"] == 9
+    assert reader.values["n19"] == 19
+    assert len(reader.values) == 21
+
+
+def test_rewrite_bumps_generation(tmp_path):
+    path = str(tmp_path / "log.jsonl")
+    log = AppendLog(path)
+
+    with log.lock():
+        log.append([{"key": "a", "value": 1}])
+        log.rewrite([{"key": "a", "value": 1}])
+        log.rewrite([{"key": "a", "value": 2}])
+
+    with open(path, 'rb') as f:
+        assert log._read_generation(f) == 2
+        assert [record for record, _ in AppendLog.read(f)] == [{"key": "a", "value": 2}]
+
+
+def test_open_refuses_a_rewritten_log(tmp_path):
+    path = str(tmp_path / "log.jsonl")
+    writer, reader = AppendLog(path), Replica(path)
+
+    with writer.lock():
+        writer.append([{"key": "a", "value": 1}])
+    reader.refresh()
+    f = reader.log.open()
+    assert f is not None
+    f.close()
+
+    with writer.lock():
+        writer.rewrite([{"key": "a", "value": 1}])
+    assert reader.log.open() is None
+
+    reader.refresh()
+    f = reader.log.open()
+    assert f is not None
+    f.close()
+
+
+def test_appended_records_already_applied_are_skipped(tmp_path):
+    path = str(tmp_path / "log.jsonl")
+    writer = Replica(path)
+
+    with writer.log.lock():
+        writer.refresh()
+        writer.values["a"] = 1
+        writer.log.append([{"key": "a", "value": 1}], replayed=True)
+    writer.values.clear()
+    writer.refresh()
+
+    assert writer.values == {}
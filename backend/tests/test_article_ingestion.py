@@ -0,0 +1,134 @@
+import hashlib
+
+import numpy as np
+import pytest
+
+from rag.article_ingestion import ArticleIngestion
+from rag.article_store import ArticleStore
+from rag.chunking import parent_id
+from rag.dedupe import DuplicateDetector
+from rag.fetcher import ContentFetcher
+from rag.fingerprints import article_id
+from rag.numpy_store import NumpyVectorStore
+
+STORY = (
+    "The central bank held interest rates steady on Thursday, citing slowing "
+    "inflation and a cooling labour market, and signalled that cuts could "
+    "follow later in the year if price pressures continue to ease."
+)
+OTHER = (
+    "The home side came from two goals down to draw the derby, with a late "
+    "header from the captain sending the crowd into raptures at the final whistle."
+)
+
+
+class HashEmbedder:
+    """Embeds texts to vectors derived from their hash, counting the texts."""
+
+    def __init__(self):
+        self.embedded = []
+
+    def _get_embeddings(self, texts):
+        self.embedded.extend(texts)
+        return [
+            np.frombuffer(hashlib.sha256(text.encode("utf-8")).digest(), dtype=np.uint8)[:8] / 255.0
+            for text in texts
+        ]
+
+
+def article(source, content, slug="story", title="Headline"):
+    return {
+        "source": source,
+        "url": f"https://{source}.example/{slug}",
+        "title": title,
+        "content": content,
+        "published": "2024-05-02T10:00:00Z",
+    }
+
+
+@pytest.fixture
+def make_ingestion(tmp_path):
+    fetchers = []
+
+    def make(dedupe=False):
+        fetcher = ContentFetcher()
+        fetchers.append(fetcher)
+        detector = None
+        if dedupe:
+            detector = DuplicateDetector(str(tmp_path / "dedupe.jsonl"), num_perm=64, bands=16, threshold=0.7)
+        return ArticleIngestion(
+            embedding_model=HashEmbedder(),
+            vector_store=NumpyVectorStore(str(tmp_path / "index")),
+            data_path=str(tmp_path / "articles.json"),
+            fetcher=fetcher,
+            article_store=ArticleStore(str(tmp_path / "articles.jsonl")),
+            duplicate_detector=detector
+        )
+
+    yield make
+    for fetcher in fetchers:
+        fetcher.close()
+
+
+def indexed_articles(ingestion):
+    return {parent_id(doc_id) for doc_id in ingestion.vector_store.get_ids()}
+
+
+def test_pruning_a_canonical_article_promotes_a_surviving_copy(make_ingestion):
+    ingestion = make_ingestion(dedupe=True)
+    original = article("wire", STORY)
+    other = article("wire", OTHER, slug="match")
+    copy = article("paper", STORY + " Markets rose.")
+    ingestion.ingest_articles([original, other])
+    ingestion.ingest_articles([copy])
+    assert indexed_articles(ingestion) == {article_id(original), article_id(other)}
+
+    # The wire drops the story; the paper still publishes it
+    ingestion.ingest_articles([other], prune_missing=True)
+
+    assert indexed_articles(ingestion) == {article_id(copy), article_id(other)}
+    stored = ingestion.vector_store.get_documents([f"{article_id(copy)}#0"])
+    assert stored[f"{article_id(copy)}#0"][1]["source"] == "paper"
+
+
+def test_pruned_copies_from_the_same_source_are_not_promoted(make_ingestion):
+    ingestion = make_ingestion(dedupe=True)
+    original = article("wire", STORY)
+    other = article("wire", OTHER, slug="match")
+    copy = article("wire", STORY + " Markets rose.", slug="story-updated")
+    ingestion.ingest_articles([original, copy, other])
+    assert indexed_articles(ingestion) == {article_id(original), article_id(other)}
+
+    ingestion.ingest_articles([other], prune_missing=True)
+
+    assert indexed_articles(ingestion) == {article_id(other)}
+
+
+def test_reingesting_is_idempotent_and_replaces_changed_articles(make_ingestion):
+    ingestion = make_ingestion()
+    long_story = " ".join(f"Sentence {i} of the long report on the budget." for i in range(120))
+    first = article("wire", long_story)
+    second = article("wire", OTHER, slug="match")
+
+    assert ingestion.ingest_articles([first, second]) == 2
+    ids = sorted(ingestion.vector_store.get_ids())
+    first_chunks = [doc_id for doc_id in ids if parent_id(doc_id) == article_id(first)]
+    assert len(first_chunks) > 1
+    assert f"{article_id(second)}#0" in ids
+    embedded = len(ingestion.embedding_model.embedded)
+
+    # Same articles again: stable IDs and unchanged fingerprints, no work
+    assert ingestion.ingest_articles([first, second]) == 0
+    assert sorted(ingestion.vector_store.get_ids()) == ids
+    assert len(ingestion.embedding_model.embedded) == embedded
+
+    # A shorter edit keeps the ID and drops the chunks it no longer has
+    edited = {**first, "content": STORY}
+    assert ingestion.ingest_articles([edited, second]) == 1
+    assert sorted(ingestion.vector_store.get_ids()) == sorted([
+        f"{article_id(first)}#0", f"{article_id(second)}#0"
+    ])
+    assert ingestion.vector_store.get_collection_count() == 2
+    assert len(ingestion.embedding_model.embedded) == embedded + 1
+    document, _ = ingestion.vector_store.get_documents([f"{article_id(first)}#0"])[f"{article_id(first)}#0"]
+    assert document == STORY
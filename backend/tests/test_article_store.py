@@ -0,0 +1,40 @@
+from rag.article_store import ArticleStore
+from rag.fingerprints import article_id
+
+
+def article(n, content="body"):
+    return {"title": f"Story {n}", "content": f"{content} {n}", "url": f"https://example.com/{n}"}
+
+
+def test_reader_follows_compaction_by_another_instance(tmp_path):
+    path = str(tmp_path / "articles.jsonl")
+    writer = ArticleStore(path)
+    reader = ArticleStore(path)
+
+    for version in range(3):
+        writer.append([article(n, f"version {version}") for n in range(20)])
+    assert reader.count() == 20
+
+    writer.compact()
+    writer.append([article(n) for n in range(20, 80)])
+
+    assert reader.count() == 80
+    assert reader.stats() == writer.stats()
+    assert reader.get(article_id(article(5)))["content"] == "version 2 5"
+    assert reader.get(article_id(article(70)))["content"] == "body 70"
+
+    contents = [record["content"] for record in reader.iter_articles()]
+    assert contents == [f"version 2 {n}" for n in range(20)] + [f"body {n}" for n in range(20, 80)]
+
+
+def test_append_changed_skips_unchanged_articles(tmp_path):
+    store = ArticleStore(str(tmp_path / "articles.jsonl"))
+
+    assert store.append_changed([article(1), article(2)]) == 2
+    assert store.append_changed([article(1), article(2)]) == 0
+    assert store.append_changed([article(1), article(2, "edited")]) == 1
+
+    stats = store.stats()
+    assert stats["articles"] == 2
+    assert stats["records"] == 3
+    assert store.get(article_id(article(2)))["content"] == "edited 2"
@@ -0,0 +1,181 @@
+import asyncio
+import gc
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pytest
+
+from rag import batching
+from rag.batching import EmbeddingBatcher, QueryCoalescer, TransientEmbeddingError
+from rag.embedding_cache import EmbeddingCache
+from rag.embeddings import EmbeddingModel
+
+
+def embed_lengths(texts):
+    return [np.full(2, len(text)) for text in texts]
+
+
+def test_split_respects_count_and_byte_budgets():
+    batcher = EmbeddingBatcher(embed_lengths, max_batch_size=3, max_batch_bytes=10)
+
+    assert batcher.split(["a"] * 7) == [[0, 1, 2], [3, 4, 5], [6]]
+    # "é" is two bytes in UTF-8
+    assert batcher.split(["ééé", "éé", "abc", "de"]) == [[0, 1], [2, 3]]
+    # A text over the byte budget is sent on its own
+    assert batcher.split(["ab", "x" * 25, "cd"]) == [[0], [1], [2]]
+    assert batcher.split([]) == []
+
+
+def test_embed_reassembles_concurrent_batches_in_input_order():
+    batches = []
+
+    def send(texts):
+        batches.append(texts)
+        return embed_lengths(texts)
+
+    batcher = EmbeddingBatcher(send, max_batch_size=2, max_workers=3)
+    texts = ["a", "bb", "ccc", "dddd", "eeeee"]
+
+    embeddings = batcher.embed(texts)
+
+    assert [int(embedding[0]) for embedding in embeddings] == [1, 2, 3, 4, 5]
+    assert sorted(map(tuple, batches)) == [("a", "bb"), ("ccc", "dddd"), ("eeeee",)]
+
+
+def test_transient_errors_are_retried_after_the_requested_delay(monkeypatch):
+    delays = []
+    monkeypatch.setattr(batching.time, "sleep", delays.append)
+    failures = [TransientEmbeddingError("429", retry_after=2), TransientEmbeddingError("503")]
+
+    def send(texts):
+        if failures:
+            raise failures.pop(0)
+        return embed_lengths(texts)
+
+    batcher = EmbeddingBatcher(send, backoff_base=0.5)
+
+    assert [int(embedding[0]) for embedding in batcher.embed(["abc"])] == [3]
+    assert delays[0] == 2
+    # Without Retry-After the second retry waits a jittered 0..2 * base
+    assert 0 <= delays[1] <= 1.0
+
+
+def test_retries_give_up_after_max_retries(monkeypatch):
+    monkeypatch.setattr(batching.time, "sleep", lambda delay: None)
+    calls = []
+
+    def send(texts):
+        calls.append(texts)
+        raise TransientEmbeddingError("503")
+
+    batcher = EmbeddingBatcher(send, max_retries=2)
+
+    with pytest.raises(TransientEmbeddingError):
+        batcher.embed(["abc"])
+    assert len(calls) == 3
+
+
+def test_backoff_delay():
+    batcher = EmbeddingBatcher(embed_lengths, backoff_base=0.5, backoff_max=4)
+
+    assert batcher.backoff_delay(0, retry_after=3) == 3
+    assert batcher.backoff_delay(0, retry_after=60) == 4
+    for attempt in range(6):
+        assert 0 <= batcher.backoff_delay(attempt) <= min(0.5 * 2 ** attempt, 4)
+
+
+class FlakyEmbeddingHandler(BaseHTTPRequestHandler):
+    """Answers 429, then 503, then embeddings of the input lengths."""
+
+    def do_POST(self):
+        texts = json.loads(self.rfile.read(int(self.headers["Content-Length"])))["input"]
+        self.server.statuses.append(self.server.replies[0] if self.server.replies else 200)
+        if self.server.replies:
+            self.send_response(self.server.replies.pop(0))
+            self.send_header("Retry-After", "0")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = json.dumps({"data": [
+            {"index": i, "embedding": [len(text), 0]} for i, text in enumerate(texts)
+        ]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def flaky_server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), FlakyEmbeddingHandler)
+    httpd.replies = [429, 503]
+    httpd.statuses = []
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_model_retries_429_and_503_responses(flaky_server, monkeypatch, use_async):
+    monkeypatch.setenv("JINA_API_KEY", "test")
+    model = EmbeddingModel(cache=EmbeddingCache())
+    model.api_url = f"http://127.0.0.1:{flaky_server.server_address[1]}/v1/embeddings"
+
+    if use_async:
+        async def main():
+            try:
+                return await model.batcher.aembed(["ab", "abc"])
+            finally:
+                await model.aclose()
+        embeddings = asyncio.run(main())
+    else:
+        embeddings = model.batcher.embed(["ab", "abc"])
+
+    assert [int(embedding[0]) for embedding in embeddings] == [2, 3]
+    assert flaky_server.statuses == [429, 503, 200]
+
+
+def test_concurrent_queries_share_one_request():
+    calls = []
+
+    async def send(texts):
+        calls.append(texts)
+        # Give the garbage collector a chance to drop an unreferenced task
+        gc.collect()
+        await asyncio.sleep(0.01)
+        return [np.full(2, len(text)) for text in texts]
+
+    async def main():
+        coalescer = QueryCoalescer(send, window=0.01, max_batch_size=8)
+        return await asyncio.gather(*[coalescer.embed(text) for text in ["a", "bb", "a", "ccc"]])
+
+    results = asyncio.run(main())
+
+    assert [int(result[0]) for result in results] == [1, 2, 1, 3]
+    assert calls == [["a", "bb", "ccc"]]
+
+
+@pytest.mark.parametrize("failure", [RuntimeError("upstream down"), "short"])
+def test_every_waiter_gets_the_batch_error(failure):
+    async def send(texts):
+        if failure == "short":
+            return [np.zeros(2)]
+        raise failure
+
+    async def main():
+        coalescer = QueryCoalescer(send, window=0.01, max_batch_size=8)
+        return await asyncio.wait_for(
+            asyncio.gather(*[coalescer.embed(text) for text in ["a", "b", "c"]], return_exceptions=True),
+            timeout=1
+        )
+
+    results = asyncio.run(main())
+
+    assert len(results) == 3
+    assert all(isinstance(result, Exception) for result in results)
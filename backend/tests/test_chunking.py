@@ -0,0 +1,77 @@
+from rag.chunking import chunk_id, chunk_text, merge_search_results, parent_id, split_sentences
+from rag.tokens import estimate_tokens
+
+
+def test_split_sentences_treats_paragraph_breaks_as_boundaries():
+    text = 'Rates held. "Cuts may follow," she said. The U.S. economy\ngrew 2.5% in Q1.\n\nnew paragraph'
+
+    assert split_sentences(text) == [
+        "Rates held.",
+        '"Cuts may follow," she said.',
+        "The U.S. economy grew 2.5% in Q1.",
+        "new paragraph",
+    ]
+
+
+def test_chunks_respect_the_budget_and_overlap_by_whole_sentences():
+    sentences = [f"Sentence number {i} talks about the budget." for i in range(40)]
+    text = " ".join(sentences)
+
+    chunks = chunk_text(text, max_tokens=60, overlap_tokens=15)
+
+    assert len(chunks) > 1
+    assert chunks[0][1] == 0
+    for chunk, overlap_chars in chunks:
+        assert estimate_tokens(chunk) <= 60
+    for (previous, _), (chunk, overlap_chars) in zip(chunks, chunks[1:]):
+        prefix = chunk[:overlap_chars]
+        assert prefix and previous.endswith(prefix.rstrip())
+        assert estimate_tokens(prefix.rstrip()) <= 15
+    # Removing the overlaps restores the text
+    assert " ".join([chunks[0][0]] + [chunk[overlap:] for chunk, overlap in chunks[1:]]) == text
+
+
+def test_sentence_longer_than_a_chunk_is_split_at_words():
+    text = " ".join(["word"] * 100) + "."
+
+    chunks = chunk_text(text, max_tokens=20, overlap_tokens=5)
+
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= 20 for chunk, _ in chunks)
+
+
+def test_chunk_ids_round_trip():
+    assert chunk_id("doc_abc", 3) == "doc_abc#3"
+    assert parent_id("doc_abc#3") == "doc_abc"
+    assert parent_id("doc_legacy") == "doc_legacy"
+
+
+def results(rows):
+    return {
+        "ids": [[row[0] for row in rows]],
+        "documents": [[row[1] for row in rows]],
+        "metadatas": [[row[2] for row in rows]],
+        "distances": [[row[3] for row in rows]],
+    }
+
+
+def test_merge_stitches_adjacent_chunks_and_orders_articles_by_best_chunk():
+    search_results = results([
+        ("b#0", "Match report.", {"article_id": "b", "chunk_index": 0}, 0.1),
+        ("a#1", "Two. Three.", {"article_id": "a", "chunk_index": 1, "overlap_chars": 5}, 0.2),
+        ("a#0", "One. Two.", {"article_id": "a", "chunk_index": 0}, 0.3),
+        ("a#3", "Five.", {"article_id": "a", "chunk_index": 3, "overlap_chars": 0}, 0.4),
+        ("c#0", "Dropped.", {"article_id": "c", "chunk_index": 0}, 0.5),
+    ])
+
+    passages = merge_search_results(search_results, max_articles=2)
+
+    assert [passage["article_id"] for passage in passages] == ["b", "a"]
+    assert passages[1]["text"] == "One. Two. Three. ... Five."
+    assert passages[1]["distance"] == 0.2
+
+
+def test_merge_reads_the_article_from_legacy_ids():
+    passages = merge_search_results(results([("doc_x", "Whole article.", None, 0.1)]), 3)
+
+    assert passages == [{"article_id": "doc_x", "metadata": {}, "distance": 0.1, "text": "Whole article."}]
@@ -0,0 +1,56 @@
+from rag.context import pack_passages, trim_to_tokens
+from rag.tokens import estimate_tokens
+
+# Each sentence is 40 characters, 10 estimated tokens
+SENTENCE = "The committee met to review the budget. "
+
+
+def passage(article_id, sentences, title="Title"):
+    return {
+        "article_id": article_id,
+        "metadata": {"title": title},
+        "distance": 0.1,
+        "text": (SENTENCE * sentences).strip(),
+    }
+
+
+def cost(packed):
+    return sum(estimate_tokens(p["metadata"]["title"]) + estimate_tokens(p["text"]) for p in packed)
+
+
+def test_passages_that_fit_are_kept_whole():
+    passages = [passage("a", 2), passage("b", 3)]
+
+    packed = pack_passages(passages, budget=200)
+
+    assert packed == passages
+
+
+def test_overflowing_passage_is_trimmed_at_a_sentence_boundary():
+    passages = [passage("a", 4), passage("b", 10)]
+
+    packed = pack_passages(passages, budget=100, min_tokens=20)
+
+    assert [p["article_id"] for p in packed] == ["a", "b"]
+    assert packed[0] is passages[0]
+    assert packed[1]["text"].endswith("budget.")
+    assert packed[1]["text"] != passages[1]["text"]
+    assert cost(packed) <= 100
+    # The original passage is left untouched
+    assert passages[1]["text"] == (SENTENCE * 10).strip()
+
+
+def test_passage_with_too_little_room_is_skipped_for_a_shorter_one():
+    passages = [passage("a", 8), passage("b", 5), passage("c", 1)]
+
+    packed = pack_passages(passages, budget=100, min_tokens=32)
+
+    assert [p["article_id"] for p in packed] == ["a", "c"]
+    assert cost(packed) <= 100
+
+
+def test_trim_to_tokens_keeps_whole_sentences():
+    text = (SENTENCE * 3).strip()
+
+    assert trim_to_tokens(text, 25) == (SENTENCE * 2).strip()
+    assert trim_to_tokens(text, 5) == ""
@@ -0,0 +1,101 @@
+from rag.dedupe import DuplicateDetector
+
+STORY = (
+    "The central bank held interest rates steady on Thursday, citing slowing "
+    "inflation and a cooling labour market, and signalled that cuts could "
+    "follow later in the year if price pressures continue to ease."
+)
+OTHER = (
+    "The home side came from two goals down to draw the derby, with a late "
+    "header from the captain sending the crowd into raptures at the final whistle."
+)
+
+
+def article(source, content, title="Headline"):
+    return {"source": source, "url": f"https://{source}.example/story", "title": title, "content": content}
+
+
+def make(path):
+    return DuplicateDetector(str(path), num_perm=64, bands=16, threshold=0.7)
+
+
+def test_near_duplicates_join_the_first_cluster(tmp_path):
+    detector = make(tmp_path / "dedupe.jsonl")
+
+    assignments = detector.assign([
+        ("a", article("wire", STORY)),
+        ("b", article("paper", STORY + " Markets rose.")),
+        ("c", article("sport", OTHER)),
+    ])
+
+    assert assignments == {"a": "a", "b": "a", "c": "c"}
+    assert [member["id"] for member in detector.alternates("a")] == ["b"]
+    assert detector.alternates("c") == []
+    assert detector.stats() == {"articles": 3, "clusters": 2}
+    # Known articles keep their cluster
+    assert detector.assign([("b", article("paper", OTHER))]) == {"b": "a"}
+
+
+def test_clusters_are_shared_through_the_log(tmp_path):
+    path = tmp_path / "dedupe.jsonl"
+    writer = make(path)
+    reader = make(path)
+
+    writer.assign([("a", article("wire", STORY))])
+
+    assert reader.assign([("b", article("paper", STORY))]) == {"b": "a"}
+    assert [member["id"] for member in writer.alternates("a")] == []
+    writer.refresh()
+    assert [member["id"] for member in writer.alternates("a")] == ["b"]
+
+
+def test_removing_a_canonical_article_dissolves_its_cluster(tmp_path):
+    detector = make(tmp_path / "dedupe.jsonl")
+    detector.assign([
+        ("a", article("wire", STORY)),
+        ("b", article("paper", STORY)),
+        ("c", article("blog", STORY)),
+    ])
+
+    orphans = detector.remove(["a", "c"])
+
+    assert [member["id"] for member in orphans] == ["b"]
+    assert detector.stats() == {"articles": 0, "clusters": 0}
+    # The removed signature no longer attracts copies of the story
+    assert detector.assign([("b", article("paper", STORY)), ("d", article("site", STORY))]) == {
+        "b": "b", "d": "b"
+    }
+
+
+def test_compaction_drops_removed_articles(tmp_path):
+    path = tmp_path / "dedupe.jsonl"
+    detector = make(path)
+    detector.assign([("a", article("wire", STORY)), ("b", article("paper", STORY))])
+    detector.assign([("c", article("sport", OTHER))])
+    detector.remove(["c"])
+
+    assert detector.compact() == 2
+    lines = path.read_text().splitlines()
+    assert len(lines) == 3  # header, canonical and member
+
+    reopened = make(path)
+    assert reopened.stats() == {"articles": 2, "clusters": 1}
+    assert [member["id"] for member in reopened.alternates("a")] == ["b"]
+    assert reopened.assign([("d", article("site", STORY))]) == {"d": "a"}
+    assert reopened.assign([("e", article("club", OTHER))]) == {"e": "e"}
+
+
+def test_removals_compact_the_log_once_most_records_are_dead(tmp_path):
+    path = tmp_path / "dedupe.jsonl"
+    detector = make(path)
+    ids = [f"s{i}" for i in range(4)]
+    stories = [STORY, OTHER, "Storms closed the coastal road overnight.", "A new museum opened downtown today."]
+    assert detector.assign([(aid, article(aid, story)) for aid, story in zip(ids, stories)]) == {
+        aid: aid for aid in ids
+    }
+
+    detector.remove(ids[:3])
+
+    # Four assignments and three tombstones collapse to one live record
+    assert len(path.read_text().splitlines()) == 2
+    assert make(path).stats() == {"articles": 1, "clusters": 1}
@@ -0,0 +1,117 @@
+import json
+
+import pytest
+
+from rag.feed_scheduler import FeedScheduler, load_feed_registry, read_feed_stats
+from rag.fetcher import ContentFetcher
+
+URL = "https://wire.example/rss"
+
+
+class ScriptedIngestion:
+    """Returns the scripted feed polls in order; an exception is raised."""
+
+    def __init__(self, polls):
+        self.polls = list(polls)
+        self.skipped = []
+        self.fetcher = ContentFetcher()
+
+    def fetch_feed(self, url, skip_guids=None):
+        self.skipped.append(set(skip_guids or ()))
+        result = self.polls.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def ingest_articles(self, articles):
+        return len(articles)
+
+
+def entries(*guids):
+    return [{"guid": guid, "title": guid, "content": "", "published": ""} for guid in guids]
+
+
+@pytest.fixture
+def make_scheduler(tmp_path):
+    schedulers = []
+
+    def make(polls, interval=100, max_interval=400):
+        ingestion = ScriptedIngestion(polls)
+        scheduler = FeedScheduler(
+            ingestion,
+            [{"url": URL, "interval": interval, "max_interval": max_interval}],
+            state_path=str(tmp_path / "feed_state.json"),
+            backoff_factor=2,
+            jitter=0
+        )
+        schedulers.append(scheduler)
+        return scheduler
+
+    yield make
+    for scheduler in schedulers:
+        scheduler.ingestion.fetcher.close()
+
+
+def test_quiet_feeds_back_off_and_snap_back_on_new_entries(make_scheduler):
+    scheduler = make_scheduler([entries("a"), [], None, [], entries("b")])
+
+    intervals = []
+    for _ in range(5):
+        scheduler.poll(URL)
+        intervals.append(scheduler.state[URL]["current_interval"])
+
+    assert intervals == [100, 200, 400, 400, 100]
+    assert scheduler.ingestion.skipped[-1] == {"a"}
+    assert scheduler.state[URL]["seen_guids"] == ["a", "b"]
+    assert scheduler.state[URL]["new_entries_total"] == 2
+
+
+def test_failed_polls_back_off_and_record_the_error(make_scheduler):
+    scheduler = make_scheduler([RuntimeError("HTTP 500"), entries("a")])
+
+    assert scheduler.poll(URL) == 0
+    assert scheduler.state[URL]["current_interval"] == 200
+    assert scheduler.state[URL]["errors"] == 1
+    assert scheduler.state[URL]["last_error"] == "HTTP 500"
+
+    assert scheduler.poll(URL) == 1
+    assert scheduler.state[URL]["current_interval"] == 100
+    assert scheduler.state[URL]["last_error"] is None
+
+
+def test_run_pending_polls_due_feeds_and_reschedules_them(make_scheduler):
+    scheduler = make_scheduler([entries("a")])
+
+    assert scheduler.run_pending() == 1
+    # Next poll is an interval away
+    assert scheduler.run_pending() == 0
+    assert scheduler.state[URL]["polls"] == 1
+
+
+def test_state_survives_a_restart(make_scheduler, tmp_path):
+    scheduler = make_scheduler([entries("a"), []])
+    scheduler.poll(URL)
+    scheduler.poll(URL)
+
+    restarted = make_scheduler([entries("b")])
+
+    assert restarted.state[URL]["current_interval"] == 200
+    assert restarted.run_pending() == 0
+    restarted.poll(URL)
+    assert restarted.ingestion.skipped == [{"a"}]
+
+    stats = read_feed_stats(str(tmp_path / "feed_state.json"))
+    assert stats[URL]["polls"] == 3
+    assert "seen_guids" not in stats[URL]
+    assert stats[URL]["seconds_since_success"] >= 0
+
+
+def test_load_feed_registry(tmp_path):
+    path = tmp_path / "feeds.json"
+    path.write_text(json.dumps([URL, {"url": "https://b.example/rss", "interval": 60}]))
+
+    assert load_feed_registry(str(path), 900) == [
+        {"url": URL, "interval": 900, "max_interval": 7200},
+        {"url": "https://b.example/rss", "interval": 60, "max_interval": 480},
+    ]
+    assert load_feed_registry(str(tmp_path / "missing.json"), 900) == []
@@ -0,0 +1,119 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from rag.fetcher import ContentFetcher
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Serves /page/<n> with an ETag and /slow/<n> after a delay."""
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append((self.path, self.headers.get("If-None-Match")))
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+        try:
+            if self.path.startswith("/slow/"):
+                time.sleep(server.delay)
+            etag = f'"{self.path}"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            body = f"<html><body><p>Story at {self.path}</p></body></html>".encode()
+            self.send_response(200)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with server.lock:
+                server.active -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    httpd.lock = threading.Lock()
+    httpd.requests = []
+    httpd.active = 0
+    httpd.max_active = 0
+    httpd.delay = 0.2
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def make_fetcher():
+    fetchers = []
+
+    def make(**kwargs):
+        fetcher = ContentFetcher(parse_workers=1, **kwargs)
+        fetchers.append(fetcher)
+        return fetcher
+
+    yield make
+    for fetcher in fetchers:
+        fetcher.close()
+
+
+def url(server, path):
+    return f"http://127.0.0.1:{server.server_address[1]}{path}"
+
+
+def test_not_modified_page_reuses_extracted_text(server, make_fetcher):
+    fetcher = make_fetcher()
+    page = url(server, "/page/1")
+
+    first = fetcher.fetch_articles([page], budget=30)
+    second = fetcher.fetch_articles([page], budget=30)
+
+    assert first == {page: "Story at /page/1"}
+    assert second == first
+    assert server.requests == [("/page/1", None), ("/page/1", '"/page/1"')]
+
+
+def test_per_host_limit(server, make_fetcher):
+    fetcher = make_fetcher(max_workers=8, per_host_limit=2)
+    pages = [url(server, f"/slow/{i}") for i in range(6)]
+
+    contents = fetcher.fetch_articles(pages, budget=30)
+
+    assert set(contents) == set(pages)
+    assert server.max_active == 2
+
+
+def test_budget_bounds_wall_time(server, make_fetcher):
+    server.delay = 2
+    fetcher = make_fetcher(max_workers=4, per_host_limit=4)
+    pages = [url(server, f"/slow/{i}") for i in range(2)]
+
+    started = time.monotonic()
+    contents = fetcher.fetch_articles(pages, budget=0.5)
+
+    assert contents == {}
+    assert time.monotonic() - started < 1.5
+
+
+def test_wait_for_busy_host_is_bounded_by_the_deadline(server, make_fetcher):
+    fetcher = make_fetcher(per_host_limit=1)
+    page = url(server, "/page/1")
+    fetcher._host_limit(page).acquire()
+
+    started = time.monotonic()
+    result = fetcher._fetch_quietly(page, time.monotonic() + 0.3)
+
+    assert result is None
+    assert time.monotonic() - started < 1
+    assert server.requests == []
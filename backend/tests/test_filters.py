@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+from rag.filters import build_where, matches_where
+from rag.numpy_store import NumpyVectorStore
+
+DAY = 86400.0
+
+# Undated articles are stored with a timestamp of 0
+ROWS = {
+    "a": {"source": "wire", "published_ts": 10 * DAY, "title": "Rates"},
+    "b": {"source": "wire", "published_ts": 20 * DAY, "title": "Budget"},
+    "c": {"source": "paper", "published_ts": 30 * DAY, "title": "Rates"},
+    "d": {"source": "paper", "published_ts": 0, "title": "Derby"},
+    "e": {"source": "blog", "published_ts": 25 * DAY, "title": "Storms"},
+}
+
+
+def test_build_where_shapes():
+    assert build_where() is None
+    assert build_where(sources=[]) is None
+    assert build_where(sources=["wire"]) == {"source": {"$in": ["wire"]}}
+    assert build_where(published_after=5.0) == {"published_ts": {"$gte": 5.0}}
+    # An upper bound alone must not let undated articles through
+    assert build_where(published_before=5.0) == {
+        "$and": [{"published_ts": {"$lte": 5.0}}, {"published_ts": {"$gt": 0}}]
+    }
+    assert build_where(["wire", "paper"], 1.0, 2.0) == {
+        "$and": [
+            {"source": {"$in": ["wire", "paper"]}},
+            {"published_ts": {"$gte": 1.0}},
+            {"published_ts": {"$lte": 2.0}},
+        ]
+    }
+
+
+def test_build_where_emits_chroma_valid_filters():
+    # Chroma requires one field or operator per dict and at least two $and clauses
+    for where in (
+        build_where(["wire"]),
+        build_where(published_after=1.0),
+        build_where(published_before=1.0),
+        build_where(["wire"], published_before=1.0),
+        build_where(["wire"], 1.0, 2.0),
+    ):
+        assert len(where) == 1
+        if "$and" in where:
+            assert len(where["$and"]) >= 2
+            assert all(len(clause) == 1 for clause in where["$and"])
+
+
+def test_matches_where_operators():
+    metadata = {"source": "wire", "published_ts": 10.0}
+
+    assert matches_where(metadata, None)
+    assert matches_where(metadata, {"source": "wire"})
+    assert matches_where(metadata, {"source": {"$ne": "paper"}})
+    assert matches_where(metadata, {"source": {"$nin": ["paper", "blog"]}})
+    assert matches_where(metadata, {"published_ts": {"$gt": 5, "$lt": 20}})
+    assert matches_where(metadata, {"$or": [{"source": "paper"}, {"published_ts": {"$lte": 10}}]})
+    assert not matches_where(metadata, {"$and": [{"source": "wire"}, {"published_ts": {"$gt": 10}}]})
+    # A missing field never satisfies a comparison
+    assert not matches_where({"source": "wire"}, {"published_ts": {"$gte": 0}})
+    with pytest.raises(ValueError):
+        matches_where(metadata, {"source": {"$like": "w%"}})
+
+
+FILTERS = [
+    build_where(["wire"]),
+    build_where(["paper", "blog"]),
+    build_where(["missing"]),
+    build_where(published_after=20 * DAY),
+    build_where(published_before=25 * DAY),
+    build_where(["paper"], published_before=40 * DAY),
+    build_where(["wire", "paper"], 15 * DAY, 30 * DAY),
+    {"source": {"$ne": "wire"}},
+    {"source": {"$nin": ["wire", "blog"]}},
+    {"published_ts": {"$lt": 25 * DAY}},
+    {"title": "Rates"},
+    {"title": {"$in": ["Derby", "Storms"]}},
+    {"$or": [{"source": "blog"}, {"published_ts": {"$lte": 10 * DAY}}]},
+    {"$and": [{"title": {"$ne": "Rates"}}, {"$or": [{"source": "paper"}, {"source": "blog"}]}]},
+]
+
+
+@pytest.mark.parametrize("where", FILTERS)
+def test_vector_store_filtering_matches_matches_where(tmp_path, where):
+    store = NumpyVectorStore(str(tmp_path))
+    ids = list(ROWS)
+    store.upsert_documents(
+        documents=[f"text of {doc_id}" for doc_id in ids],
+        embeddings=np.random.default_rng(0).normal(size=(len(ids), 8)),
+        metadatas=[ROWS[doc_id] for doc_id in ids],
+        ids=ids
+    )
+    expected = {doc_id for doc_id, metadata in ROWS.items() if matches_where(metadata, where)}
+
+    # Search uses the column arrays, get_ids evaluates matches_where row by row
+    found = store.search(np.ones(8), top_k=len(ids), where=where)
+    assert set(found["ids"][0]) == expected
+    assert set(store.get_ids(where)) == expected
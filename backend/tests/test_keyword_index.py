@@ -0,0 +1,34 @@
+from rag.keyword_index import KeywordIndex
+
+
+def test_reader_follows_compaction_by_another_instance(tmp_path):
+    path = str(tmp_path / "keywords.jsonl")
+    writer = KeywordIndex(path)
+    reader = KeywordIndex(path)
+
+    writer.upsert([f"old{i}" for i in range(30)], [f"markets rally story {i}" for i in range(30)])
+    assert reader.count() == 30
+
+    writer.delete([f"old{i}" for i in range(25)])
+    writer.compact()
+    writer.upsert([f"new{i}" for i in range(40)], [f"election results update {i}" for i in range(40)])
+
+    assert reader.count() == writer.count() == 45
+    assert not reader.contains("old3")
+    assert reader.contains("new39")
+
+    markets = [doc_id for doc_id, _ in reader.search("markets rally", top_k=50)]
+    assert sorted(markets) == sorted(f"old{i}" for i in range(25, 30))
+    assert reader.search("election 7", top_k=1)[0][0] == "new7"
+    assert reader.search("election 7") == writer.search("election 7")
+
+
+def test_upsert_replaces_earlier_version(tmp_path):
+    index = KeywordIndex(str(tmp_path / "keywords.jsonl"))
+
+    index.upsert(["a"], ["central bank raises rates"])
+    index.upsert(["a"], ["football final tonight"])
+
+    assert index.count() == 1
+    assert index.search("rates") == []
+    assert index.search("football")[0][0] == "a"
@@ -0,0 +1,116 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from rag import llm
+from rag.llm import LLMService
+
+
+class Chunk:
+    def __init__(self, text=None):
+        self._text = text
+
+    @property
+    def text(self):
+        if self._text is None:
+            raise ValueError("The response has no text parts")
+        return self._text
+
+
+class Model:
+    """Records the request and streams the given chunks."""
+
+    def __init__(self, name, system_instruction, chunks=()):
+        self.name = name
+        self.system_instruction = system_instruction
+        self.chunks = chunks
+
+    async def generate_content_async(self, contents, stream=False):
+        async def stream():
+            for chunk in self.chunks:
+                yield chunk
+        return stream()
+
+
+def make_service(chunks=()):
+    # The Gemini SDK is only needed to build real models
+    service = LLMService.__new__(LLMService)
+    service.model_name = "test-model"
+    service.genai = SimpleNamespace(
+        GenerativeModel=lambda name, system_instruction: Model(name, system_instruction, chunks)
+    )
+    return service
+
+
+def message(role, tokens):
+    return {"role": role, "content": "x" * (4 * tokens)}
+
+
+def test_history_window_keeps_the_newest_messages_within_budget(monkeypatch):
+    monkeypatch.setattr(llm, "HISTORY_TOKEN_BUDGET", 10)
+    history = [message("user", 6), message("assistant", 3), message("user", 4), message("assistant", 3)]
+
+    window, dropped = make_service()._window_history(history)
+
+    assert window == history[1:]
+    assert dropped == history[:1]
+
+
+def test_history_window_stops_at_the_first_message_over_budget(monkeypatch):
+    monkeypatch.setattr(llm, "HISTORY_TOKEN_BUDGET", 10)
+    history = [message("user", 1), message("assistant", 20), message("user", 2)]
+
+    window, dropped = make_service()._window_history(history)
+
+    assert window == history[2:]
+    assert dropped == history[:2]
+
+
+def test_contents_start_with_the_user_and_merge_repeated_roles(monkeypatch):
+    monkeypatch.setattr(llm, "HISTORY_TOKEN_BUDGET", 1000)
+    history = [
+        {"role": "assistant", "content": "Welcome"},
+        {"role": "user", "content": "First"},
+        {"role": "user", "content": "Second"},
+        {"role": "system", "content": "ignored"},
+        {"role": "assistant", "content": "Answer"},
+        {"role": "assistant", "content": "More"},
+    ]
+
+    model, contents = make_service()._build_request("Query", ["Title\n\nText"], history)
+
+    assert contents == [
+        {"role": "user", "parts": ["First", "Second"]},
+        {"role": "model", "parts": ["Answer", "More"]},
+        {"role": "user", "parts": ["Query"]},
+    ]
+    assert "Article: Title\n\nText" in model.system_instruction
+
+
+def test_dropped_questions_are_summarized(monkeypatch):
+    monkeypatch.setattr(llm, "HISTORY_TOKEN_BUDGET", 5)
+    history = [
+        {"role": "user", "content": "What happened to rates?"},
+        {"role": "assistant", "content": "x" * 100},
+        {"role": "user", "content": "And now?"},
+    ]
+
+    model, contents = make_service()._build_request("Query", [], history)
+
+    assert contents == [{"role": "user", "parts": ["And now?", "Query"]}]
+    assert "- What happened to rates?" in model.system_instruction
+    assert "And now?" not in model.system_instruction
+
+
+@pytest.mark.parametrize("chunks", [
+    [Chunk("Rates "), Chunk(), Chunk("held.")],
+    [Chunk("Rates "), Chunk("held."), Chunk()],
+])
+def test_stream_skips_chunks_without_text(chunks):
+    service = make_service(chunks)
+
+    async def main():
+        return [text async for text in service.astream_response("Query", [])]
+
+    assert asyncio.run(main()) == ["Rates ", "held."]
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+from rag.numpy_store import NumpyVectorStore
+
+
+def add(store, ids, vectors):
+    store.upsert_documents(
+        documents=[f"text of {doc_id}" for doc_id in ids],
+        embeddings=vectors,
+        metadatas=[{"source": "test"} for _ in ids],
+        ids=ids
+    )
+
+
+def test_reader_follows_compaction_by_another_instance(tmp_path):
+    rng = np.random.default_rng(0)
+    writer = NumpyVectorStore(str(tmp_path))
+    reader = NumpyVectorStore(str(tmp_path))
+
+    old_ids = [f"a{i}" for i in range(65)]
+    old_vectors = rng.normal(size=(65, 16))
+    add(writer, old_ids, old_vectors)
+    assert reader.get_collection_count() == 65
+
+    # Deleting most rows compacts the log; appending makes it longer again
+    writer.delete_documents(old_ids[:60])
+    new_ids = [f"b{i}" for i in range(60)]
+    new_vectors = rng.normal(size=(60, 16))
+    add(writer, new_ids, new_vectors)
+
+    assert reader.get_collection_count() == writer.get_collection_count() == 65
+    assert sorted(reader.get_ids()) == sorted(writer.get_ids())
+
+    deleted = reader.search(old_vectors[7], top_k=5)
+    assert "a7" not in deleted["ids"][0]
+
+    found = reader.search(new_vectors[0], top_k=1)
+    assert found["ids"][0] == ["b0"]
+    assert found["distances"][0][0] < 1e-5
+
+    kept = reader.search(old_vectors[62], top_k=1)
+    assert kept["ids"][0] == ["a62"]
+    assert kept["documents"][0] == ["text of a62"]
+
+
+def test_quantized_reader_follows_compaction(tmp_path):
+    rng = np.random.default_rng(1)
+    writer = NumpyVectorStore(str(tmp_path))
+    reader = NumpyVectorStore(str(tmp_path), quantization="int8")
+
+    add(writer, [f"a{i}" for i in range(40)], rng.normal(size=(40, 16)))
+    reader.refresh()
+    writer.compact()
+    vectors = rng.normal(size=(50, 16))
+    add(writer, [f"b{i}" for i in range(50)], vectors)
+
+    assert reader.search(vectors[3], top_k=1)["ids"][0] == ["b3"]
+    assert reader.get_collection_count() == 90
+
+
+@pytest.mark.parametrize("options", [
+    {"quantization": "int8"},
+    {"quantization": "float16"},
+    {"quantization": "int8", "truncate_dim": 32},
+    {"quantization": "none", "truncate_dim": 32},
+])
+def test_compact_scan_recalls_the_exact_top_k_after_rescoring(tmp_path, options):
+    rng = np.random.default_rng(2)
+    # Like Matryoshka embeddings, the leading dimensions carry most of the variance
+    spectrum = np.exp(-np.arange(64) / 16)
+    vectors = rng.normal(size=(2000, 64)) * spectrum
+    queries = vectors[rng.choice(2000, 20, replace=False)] + rng.normal(scale=0.3, size=(20, 64)) * spectrum
+    exact = NumpyVectorStore(str(tmp_path))
+    add(exact, [f"d{i}" for i in range(2000)], vectors)
+    compact = NumpyVectorStore(str(tmp_path), **options)
+
+    expected = exact.search_batch(queries, top_k=10)
+    found = compact.search_batch(queries, top_k=10)
+
+    hits = sum(len(set(a) & set(b)) for a, b in zip(expected["ids"], found["ids"]))
+    assert hits / (20 * 10) >= 0.95
+    # Rescored results carry full-precision distances
+    for query in range(20):
+        exact_distance = dict(zip(expected["ids"][query], expected["distances"][query]))
+        distances = found["distances"][query]
+        assert distances == sorted(distances)
+        for doc_id, distance in zip(found["ids"][query], distances):
+            if doc_id in exact_distance:
+                assert distance == pytest.approx(exact_distance[doc_id], abs=1e-5)
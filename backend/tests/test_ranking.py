@@ -0,0 +1,90 @@
+from rag.ranking import blend_recency, mmr_select
+
+DAY = 86400.0
+NOW = 1000 * DAY
+
+
+def results(rows):
+    return {
+        "ids": [[row[0] for row in rows]],
+        "documents": [[f"text of {row[0]}" for row in rows]],
+        "metadatas": [[{"published_ts": row[1]} for row in rows]],
+        "distances": [[row[2] for row in rows]],
+    }
+
+
+def test_recency_lifts_fresh_results_over_slightly_closer_stale_ones():
+    search_results = results([
+        ("stale", NOW - 30 * DAY, 0.10),
+        ("fresh", NOW - 1 * DAY, 0.15),
+        ("far", NOW, 0.90),
+    ])
+
+    blended = blend_recency(search_results, weight=0.3, half_life=7 * DAY, now=NOW)
+
+    assert blended["ids"][0] == ["fresh", "stale", "far"]
+    # Every per-result list follows the new order
+    assert blended["documents"][0] == ["text of fresh", "text of stale", "text of far"]
+    assert blended["distances"][0] == [0.15, 0.10, 0.90]
+
+
+def test_undated_results_get_no_freshness_credit():
+    search_results = results([
+        ("undated", 0, 0.10),
+        ("dated", NOW - 7 * DAY, 0.10),
+    ])
+
+    blended = blend_recency(search_results, weight=0.5, half_life=7 * DAY, now=NOW)
+
+    assert blended["ids"][0] == ["dated", "undated"]
+
+
+def test_zero_weight_keeps_the_similarity_order():
+    search_results = results([
+        ("stale", NOW - 300 * DAY, 0.10),
+        ("fresh", NOW, 0.20),
+    ])
+
+    assert blend_recency(search_results, weight=0, half_life=DAY, now=NOW) is search_results
+    empty = {"ids": [[]], "documents": [[]], "metadatas": [[]], "distances": [[]]}
+    assert blend_recency(empty, weight=0.5, half_life=DAY) is empty
+
+
+def embedded(rows):
+    return {
+        "ids": [[row[0] for row in rows]],
+        "documents": [[f"text of {row[0]}" for row in rows]],
+        "metadatas": [[{} for _ in rows]],
+        "distances": [[0.1 * i for i in range(len(rows))]],
+        "embeddings": [[row[1] for row in rows]],
+    }
+
+
+def test_mmr_drops_a_near_duplicate_for_a_diverse_result():
+    search_results = embedded([
+        ("story", [1.0, 0.0, 0.0]),
+        ("copy", [0.99, 0.05, 0.0]),
+        ("other", [0.0, 1.0, 0.0]),
+    ])
+
+    selected = mmr_select(search_results, k=2, lambda_=0.5)
+
+    assert selected["ids"][0] == ["story", "other"]
+    assert selected["distances"][0] == [0.0, 0.2]
+
+
+def test_mmr_with_lambda_one_keeps_the_incoming_order():
+    search_results = embedded([
+        ("story", [1.0, 0.0, 0.0]),
+        ("copy", [1.0, 0.0, 0.0]),
+        ("other", [0.0, 1.0, 0.0]),
+    ])
+
+    assert mmr_select(search_results, k=3, lambda_=1.0)["ids"][0] == ["story", "copy", "other"]
+
+
+def test_mmr_without_embeddings_truncates():
+    search_results = results([("a", NOW, 0.1), ("b", NOW, 0.2), ("c", NOW, 0.3)])
+
+    assert mmr_select(search_results, k=2, lambda_=0.5)["ids"][0] == ["a", "b"]
+    assert mmr_select(search_results, k=5, lambda_=0.5)["ids"][0] == ["a", "b", "c"]
@@ -0,0 +1,78 @@
+import fakeredis
+import pytest
+
+from services.redis_session_service import RedisSessionService
+
+
+@pytest.fixture
+def client():
+    return fakeredis.FakeRedis(decode_responses=True)
+
+
+def test_create_add_and_get_history(client):
+    service = RedisSessionService(client=client, ttl=60)
+    session_id = service.create_session()
+
+    service.add_message(session_id, {"role": "user", "content": "hello"})
+    service.add_message(session_id, {"role": "assistant", "content": "hi"})
+
+    assert service.session_exists(session_id)
+    assert service.get_chat_history(session_id) == [
+        {"role": "user", "content": "hello"},
+        {"role": "assistant", "content": "hi"},
+    ]
+    session = service.get_session(session_id)
+    assert session["messages"] == service.get_chat_history(session_id)
+    assert session["updated_at"] >= session["created_at"]
+
+
+def test_history_is_trimmed_to_the_cap(client):
+    service = RedisSessionService(client=client, ttl=60, max_messages=3)
+    session_id = service.create_session()
+
+    for i in range(5):
+        service.add_message(session_id, {"role": "user", "content": str(i)})
+
+    assert [m["content"] for m in service.get_chat_history(session_id)] == ["2", "3", "4"]
+    assert client.llen(f"session:{session_id}:messages") == 3
+
+    service.update_session(session_id, {"messages": [{"content": str(i)} for i in range(5)]})
+    assert [m["content"] for m in service.get_chat_history(session_id)] == ["2", "3", "4"]
+
+
+def test_add_message_refreshes_the_ttl(client):
+    service = RedisSessionService(client=client, ttl=60)
+    session_id = service.create_session()
+    client.expire(f"session:{session_id}", 5)
+
+    service.add_message(session_id, {"role": "user", "content": "hello"})
+
+    assert 55 < client.ttl(f"session:{session_id}") <= 60
+    assert 55 < client.ttl(f"session:{session_id}:messages") <= 60
+
+
+def test_add_message_to_expired_session_leaves_no_keys(client):
+    service = RedisSessionService(client=client, ttl=60)
+    session_id = service.create_session()
+    service.add_message(session_id, {"role": "user", "content": "hello"})
+    # The hash expires first; the message list outlives it
+    client.delete(f"session:{session_id}")
+
+    with pytest.raises(ValueError):
+        service.add_message(session_id, {"role": "user", "content": "again"})
+
+    assert not client.exists(f"session:{session_id}")
+    assert not client.exists(f"session:{session_id}:messages")
+    assert not service.session_exists(session_id)
+    with pytest.raises(ValueError):
+        service.get_chat_history(session_id)
+
+
+def test_clear_session(client):
+    service = RedisSessionService(client=client, ttl=60)
+    session_id = service.create_session()
+    service.add_message(session_id, {"role": "user", "content": "hello"})
+
+    service.clear_session(session_id)
+
+    assert client.keys("session:*") == []
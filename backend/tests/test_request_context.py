@@ -0,0 +1,95 @@
+import logging
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from metrics import count_errors, request_id_var, stage_timer, trace_var
+from services.request_context import RequestContextMiddleware
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def make_client(sample_rate):
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    def get_item(item_id: str):
+        with stage_timer("lookup"):
+            pass
+        return {"item_id": item_id, "request_id": request_id_var.get()}
+
+    app.add_middleware(RequestContextMiddleware, sample_rate=sample_rate)
+    return TestClient(app)
+
+
+def test_request_id_is_propagated_or_generated():
+    client = make_client(sample_rate=0)
+
+    given = client.get("/items/1", headers={"X-Request-ID": "abc123"})
+    generated = client.get("/items/2")
+
+    assert given.headers["x-request-id"] == "abc123"
+    assert given.json()["request_id"] == "abc123"
+    assert len(generated.headers["x-request-id"]) == 32
+    assert generated.json()["request_id"] == generated.headers["x-request-id"]
+    # The context does not leak out of the request
+    assert request_id_var.get() is None
+
+
+def test_latency_is_labelled_by_route_template():
+    client = make_client(sample_rate=0)
+    labels = {"method": "GET", "route": "/items/{item_id}", "status": "200"}
+    before = sample("newschat_http_request_seconds_count", **labels)
+    unmatched = sample("newschat_http_request_seconds_count", method="GET", route="unmatched", status="404")
+
+    client.get("/items/1")
+    client.get("/items/2")
+    client.get("/nowhere")
+
+    assert sample("newschat_http_request_seconds_count", **labels) == before + 2
+    assert sample("newschat_http_request_seconds_count", method="GET", route="unmatched", status="404") == \
+        unmatched + 1
+
+
+def test_sampled_requests_log_their_stage_timings(caplog):
+    client = make_client(sample_rate=1)
+
+    with caplog.at_level(logging.INFO, logger="newschat.trace"):
+        client.get("/items/1", headers={"X-Request-ID": "traced"})
+
+    [record] = [record for record in caplog.records if record.name == "newschat.trace"]
+    assert "request_id=traced GET /items/{item_id} status=200" in record.getMessage()
+    assert " lookup=" in record.getMessage()
+
+
+def test_stage_timer_records_into_the_active_trace():
+    before = sample("newschat_stage_seconds_count", stage="unit")
+    trace = []
+    token = trace_var.set(trace)
+    try:
+        with stage_timer("unit"):
+            pass
+    finally:
+        trace_var.reset(token)
+    with stage_timer("unit"):
+        pass
+
+    assert [stage for stage, _ in trace] == ["unit"]
+    assert trace[0][1] >= 0
+    assert sample("newschat_stage_seconds_count", stage="unit") == before + 2
+
+
+def test_count_errors_counts_and_reraises():
+    before = sample("newschat_upstream_errors_total", upstream="unit", kind="TimeoutError")
+
+    with pytest.raises(TimeoutError):
+        with count_errors("unit"):
+            raise TimeoutError()
+    with count_errors("unit"):
+        pass
+
+    assert sample("newschat_upstream_errors_total", upstream="unit", kind="TimeoutError") == before + 1
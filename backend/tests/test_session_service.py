@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+
+from services import session_service as session_module
+from services.session_service import SessionService
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(session_module.time, "time", clock)
+    return clock
+
+
+def test_least_recently_updated_session_is_evicted_at_the_cap(clock):
+    service = SessionService(max_sessions=2)
+    first = service.create_session()
+    clock.now += 1
+    second = service.create_session()
+    clock.now += 1
+    service.add_message(first, {"role": "user", "content": "still here"})
+
+    third = service.create_session()
+
+    assert service.session_exists(first)
+    assert not service.session_exists(second)
+    assert service.session_exists(third)
+    assert service.stats()["evicted"] == 1
+
+
+def test_messages_are_capped_per_session(clock):
+    service = SessionService(max_messages=3)
+    session_id = service.create_session()
+
+    for i in range(5):
+        service.add_message(session_id, {"role": "user", "content": str(i)})
+    service.update_session(session_id, {"messages": [{"content": str(i)} for i in range(6)]})
+    service.add_message(session_id, {"role": "user", "content": "6"})
+
+    assert [m["content"] for m in service.get_chat_history(session_id)] == ["4", "5", "6"]
+
+
+def test_sweep_removes_only_expired_sessions(clock):
+    service = SessionService(session_expiry=60)
+    idle = service.create_session()
+    clock.now += 30
+    active = service.create_session()
+    clock.now += 40
+
+    assert service.sweep_expired() == 1
+    assert list(service.sessions) == [active]
+    assert service.stats()["expired"] == 1
+
+    # Touching a session moves it to the back of the expiry order
+    service.add_message(active, {"role": "user", "content": "hi"})
+    clock.now += 59
+    assert service.sweep_expired() == 0
+    clock.now += 2
+    assert service.sweep_expired() == 1
+    assert service.sessions == {}
+    assert not service.session_exists(idle)
+
+
+def test_expired_session_is_rejected_before_the_sweep(clock):
+    service = SessionService(session_expiry=60)
+    session_id = service.create_session()
+    clock.now += 61
+
+    with pytest.raises(ValueError):
+        service.get_chat_history(session_id)
+    assert service.stats() == {"sessions": 0, "max_sessions": service.max_sessions, "expired": 1, "evicted": 0}
+
+
+def test_acall_runs_inline_for_the_memory_backend():
+    service = SessionService()
+
+    async def main():
+        session_id = await service.acall(service.create_session)
+        return await service.acall(service.session_exists, session_id)
+
+    assert asyncio.run(main())
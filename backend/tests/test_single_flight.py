@@ -0,0 +1,112 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from rag.numpy_store import NumpyVectorStore
+from services.chat_service import ChatService
+from services.session_service import SessionService
+
+
+class QueryEmbedder:
+    """Embeds every query to the same vector."""
+
+    async def aembed_query(self, text):
+        return np.array([1.0, 0.0, 0.0, 0.0])
+
+
+class CountingLLM:
+    """Answers after the given delays, one per call, or fails with error."""
+
+    def __init__(self, delays, error=None):
+        self.delays = list(delays)
+        self.error = error
+        self.calls = 0
+
+    async def agenerate_response(self, query, contexts, chat_history=None):
+        self.calls += 1
+        call = self.calls
+        await asyncio.sleep(self.delays[min(call, len(self.delays)) - 1])
+        if self.error is not None:
+            raise self.error
+        return f"answer {call}"
+
+
+@pytest.fixture
+def make_service(tmp_path):
+    store = NumpyVectorStore(str(tmp_path))
+    store.upsert_documents(
+        documents=["Rates were held steady."],
+        embeddings=[[1.0, 0.0, 0.0, 0.0]],
+        metadatas=[{"article_id": "a", "title": "Rates"}],
+        ids=["a#0"]
+    )
+
+    def make(llm):
+        return ChatService(
+            embedding_model=QueryEmbedder(),
+            vector_store=store,
+            llm_service=llm,
+            session_service=SessionService()
+        )
+
+    return make
+
+
+async def ask(service, message="What about rates?"):
+    session_id = service.session_service.create_session()
+    return await service.aprocess_message(session_id, message)
+
+
+async def until_called(llm, calls=1):
+    while llm.calls < calls:
+        await asyncio.sleep(0.01)
+
+
+def test_identical_concurrent_requests_share_one_generation(make_service):
+    llm = CountingLLM([0.1])
+    service = make_service(llm)
+
+    async def main():
+        return await asyncio.gather(*[ask(service) for _ in range(4)], ask(service, "Other?"))
+
+    answers = asyncio.run(main())
+
+    assert answers[:4] == ["answer 1"] * 4
+    assert llm.calls == 2
+    assert service._inflight == {}
+
+
+def test_waiters_get_the_leader_error(make_service):
+    llm = CountingLLM([0.1], error=RuntimeError("LLM down"))
+    service = make_service(llm)
+
+    async def main():
+        return await asyncio.gather(*[ask(service) for _ in range(3)], return_exceptions=True)
+
+    results = asyncio.run(main())
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert llm.calls == 1
+    assert service._inflight == {}
+
+
+def test_waiters_of_a_cancelled_leader_elect_one_new_leader(make_service):
+    llm = CountingLLM([10, 0.1])
+    service = make_service(llm)
+
+    async def main():
+        leader = asyncio.create_task(ask(service))
+        await until_called(llm)
+        waiters = [asyncio.create_task(ask(service)) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        leader.cancel()
+        answers = await asyncio.wait_for(asyncio.gather(*waiters), 2)
+        return leader, answers
+
+    leader, answers = asyncio.run(main())
+
+    assert leader.cancelled()
+    assert answers == ["answer 2"] * 3
+    assert llm.calls == 2
+    assert service._inflight == {}
@@ -0,0 +1,113 @@
+import asyncio
+import json
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import app as app_module
+from rag.fake_llm import FakeLLMService
+from rag.numpy_store import NumpyVectorStore
+from services.admission import AdmissionController
+from services.chat_service import ChatService
+from services.components import Components
+from services.session_service import SessionService
+
+
+class QueryEmbedder:
+    """Embeds every query to the same vector."""
+
+    async def aembed_query(self, text):
+        return np.array([1.0, 0.0, 0.0, 0.0])
+
+
+@pytest.fixture
+def components(tmp_path, monkeypatch):
+    store = NumpyVectorStore(str(tmp_path))
+    store.upsert_documents(
+        documents=["Rates were held steady.", "The match ended in a draw."],
+        embeddings=[[1.0, 0.1, 0.0, 0.0], [0.0, 1.0, 0.0, 0.0]],
+        metadatas=[
+            {"article_id": "a", "title": "Rates", "url": "https://example.com/a", "source": "wire"},
+            {"article_id": "b", "title": "Match", "url": "https://example.com/b", "source": "wire"},
+        ],
+        ids=["a#0", "b#0"]
+    )
+    session_service = SessionService()
+    admission = AdmissionController(session_rate=0)
+
+    components = Components()
+    components._instances.update({
+        "admission": admission,
+        "session_service": session_service,
+        "answer_cache": None,
+        "vector_store": store,
+        "chat_service": ChatService(
+            embedding_model=QueryEmbedder(),
+            vector_store=store,
+            llm_service=FakeLLMService(latency=0, token_delay=0),
+            session_service=session_service,
+            admission=admission
+        ),
+    })
+    monkeypatch.setattr(app_module, "components", components)
+    return components
+
+
+def parse_events(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_stream_emits_sources_then_tokens_then_done(components):
+    client = TestClient(app_module.app)
+    session_id = client.post("/sessions").json()["session_id"]
+
+    response = client.post(f"/sessions/{session_id}/messages/stream", json={"message": "rates"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = parse_events(response.text)
+    names = [name for name, _ in events]
+    assert names[0] == "sources"
+    assert names[-1] == "done"
+    assert set(names[1:-1]) == {"token"} and len(names) > 3
+
+    assert events[0][1][0]["url"] == "https://example.com/a"
+    answer = "".join(data for name, data in events if name == "token")
+    assert answer == events[-1][1]
+    assert client.get(f"/sessions/{session_id}").json()["history"][-1] == {
+        "role": "assistant", "content": answer
+    }
+    assert components.admission.stats()["chat_in_flight"] == 0
+
+
+def test_client_disconnect_releases_the_ticket(components):
+    admission = components.admission
+
+    async def main():
+        session_id = components.session_service.create_session()
+        response = await app_module.stream_message(
+            session_id, app_module.MessageRequest(message="rates")
+        )
+        events = response.body_iterator
+        first = await events.__anext__()
+        in_flight = admission.stats()["chat_in_flight"]
+
+        # Starlette closes the body iterator when the client goes away
+        await events.aclose()
+        await asyncio.sleep(0)
+        released = admission.stats()["chat_in_flight"]
+
+        # The background task releasing unstarted streams is then a no-op
+        await response.background()
+        await asyncio.sleep(0)
+        return first, in_flight, released, admission.stats()["chat_in_flight"]
+
+    first, in_flight, released, after = asyncio.run(main())
+
+    assert first.startswith("event: sources")
+    assert (in_flight, released, after) == (1, 0, 0)
@@ -1,7 +1,7 @@
 import React, { useState, useEffect, useRef } from 'react';
 import ChatMessage from './ChatMessage';
 import ChatInput from './ChatInput';
-import { getSessionHistory, sendMessage, clearSession } from '../services/api';
+import { getSessionHistory, streamMessage, clearSession } from '../services/api';
 
 function Chat({ sessionId, onResetSession }) {
   const [messages, setMessages] = useState([]);
@@ -45,14 +45,28 @@ function Chat({ sessionId, onResetSession }) {
       
       setIsLoading(true);
       
-      // Send message to API
-      const { response } = await sendMessage(sessionId, message);
-      
-      // Update with assistant response
-      setMessages((prevMessages) => [
-        ...prevMessages,
-        { role: 'assistant', content: response },
-      ]);
+      // Stream the response, growing the assistant message as tokens arrive
+      let started = false;
+      await streamMessage(sessionId, message, {
+        onToken: (token) => {
+          if (!started) {
+            started = true;
+            setIsLoading(false);
+            setMessages((prevMessages) => [
+              ...prevMessages,
+              { role: 'assistant', content: token },
+            ]);
+            return;
+          }
+          setMessages((prevMessages) => {
+            const last = prevMessages[prevMessages.length - 1];
+            return [
+              ...prevMessages.slice(0, -1),
+              { ...last, content: last.content + token },
+            ];
+          });
+        },
+      });
     } catch (error) {
       console.error('Error sending message:', error);
       
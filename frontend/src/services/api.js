@@ -32,6 +32,56 @@ export const sendMessage = async (sessionId, message) => {
   return response.data;
 };
 
+// Stream a response over Server-Sent Events. Calls onSources once with the
+// retrieved articles, onToken for every chunk, and resolves with the full text.
+export const streamMessage = async (sessionId, message, { onSources, onToken } = {}) => {
+  const response = await fetch(`${API_BASE_URL}/sessions/${sessionId}/messages/stream`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ message }),
+  });
+
+  if (!response.ok || !response.body) {
+    throw new Error(`Streaming request failed with status ${response.status}`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let fullText = '';
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    // Events are separated by a blank line
+    let boundary = buffer.indexOf('\n\n');
+    while (boundary !== -1) {
+      const rawEvent = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      boundary = buffer.indexOf('\n\n');
+
+      let event = 'message';
+      let data = '';
+      rawEvent.split('\n').forEach((line) => {
+        if (line.startsWith('event: ')) event = line.slice(7);
+        else if (line.startsWith('data: ')) data += line.slice(6);
+      });
+      const payload = data ? JSON.parse(data) : null;
+
+      if (event === 'sources' && onSources) onSources(payload);
+      else if (event === 'token') {
+        fullText += payload;
+        if (onToken) onToken(payload);
+      } else if (event === 'done') fullText = payload;
+      else if (event === 'error') throw new Error(payload);
+    }
+  }
+
+  return fullText;
+};
+
 export const getStatus = async () => {
   const response = await api.get('/status');
   return response.data;